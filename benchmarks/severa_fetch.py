@@ -0,0 +1,138 @@
+"""
+Benchmark the Severa fetches end to end against a recorded cassette.
+
+Record once against the live API (needs the usual Severa settings):
+
+    python -m benchmarks.severa_fetch --record --start 2024-01-01 --days 90
+
+and then replay offline, e.g. with 200 ms ± 100 ms of latency per request:
+
+    python -m benchmarks.severa_fetch --start 2024-01-01 --days 90 \\
+        --latency 0.15 --jitter 0.1
+
+Query parameters are part of the recorded requests, so replay with the same
+--start and --days that were used for recording. The fetches cut their spans at
+the current time, so replay freezes it to the time of the recording.
+
+Every round starts with empty process-wide caches, kept in memory only, so that
+the rounds time the fetches instead of cache hits and never wait for Mongo.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import statistics
+import time
+import typing
+from pathlib import Path
+from unittest import mock
+
+import arrow
+from loguru import logger
+
+from src.config import settings
+from src.logic.severa.base_client import Transport
+from src.logic.severa.cassette import record_transport, replay_transport
+from src.logic.severa.catalog import get_project_catalog
+from src.logic.severa.client import Client
+from src.logic.severa.dimensions import get_dimension_store
+from src.logic.severa.month_cache import get_month_cache
+from src.logic.severa.project_cache import get_project_cache
+from src.logic.severa.sales_cache import get_sales_cache
+from src.util.daterange import DateRange
+
+DEFAULT_CASSETTE = Path("benchmarks/cassettes/severa.json.gz")
+
+
+CACHES = [
+    get_dimension_store,
+    get_month_cache,
+    get_project_cache,
+    get_project_catalog,
+    get_sales_cache,
+]
+
+
+def reset_caches() -> None:
+    for get_cache in CACHES:
+        get_cache.cache_clear()
+
+
+def frozen_now(now: arrow.Arrow | None) -> typing.ContextManager:
+    if now is None:
+        return contextlib.nullcontext()
+
+    return mock.patch.object(arrow, "utcnow", lambda: now)
+
+
+def fetches(span: DateRange) -> dict:
+    return {
+        "fetch_hours": lambda client: client.fetch_hours(span),
+        "fetch_billing": lambda client: client.fetch_billing(span),
+        "fetch_sales": lambda client: client.fetch_sales(force_refresh=True),
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    http_transport = (
+        record_transport(args.cassette)
+        if args.record
+        else replay_transport(args.cassette, args.latency, args.jitter, args.seed)
+    )
+    rounds = 1 if args.record else args.rounds
+
+    if not args.record and http_transport.recorded is None:
+        logger.warning("The cassette has no recording time, replaying as of now.")
+
+    now = None if args.record else http_transport.recorded
+    start = args.start or (now or arrow.utcnow()).format("YYYY-MM-DD")
+    span = DateRange(arrow.get(start), args.days)
+
+    settings.mongo_base = None
+
+    async with Transport(http_transport) as transport:
+        for name, fetch in fetches(span).items():
+            timings = []
+
+            for _ in range(rounds):
+                reset_caches()
+                client = Client(transport)
+                client._client.PREFETCH_PAGES = args.prefetch
+
+                with frozen_now(now):
+                    t0 = time.perf_counter()
+                    result = await fetch(client)
+                    timings.append(time.perf_counter() - t0)
+
+            print(
+                f"{name:<15} rows={len(result):<7} "
+                f"median={statistics.median(timings):.3f}s "
+                f"min={min(timings):.3f}s max={max(timings):.3f}s"
+            )
+
+        print(transport.status())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cassette", type=Path, default=DEFAULT_CASSETTE)
+    parser.add_argument(
+        "--record", action="store_true", help="record from the live API"
+    )
+    parser.add_argument(
+        "--start", help="default: the day of the recording, or today when recording"
+    )
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--prefetch", type=int, default=2, help="pages ahead")
+    args = parser.parse_args()
+
+    logger.remove()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark parsing recorded Severa payloads with the full generated models versus
+the slim projections in src.logic.severa.projections.
+
+    python -m benchmarks.severa_parse --cassette benchmarks/cassettes/severa.json.gz
+
+The cassette is recorded with benchmarks.severa_fetch --record.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+from loguru import logger
+
+from src.logic.severa import projections
+from src.logic.severa.cassette import Cassette
+from src.logic.severa.stats import endpoint_template
+
+DEFAULT_CASSETTE = Path("benchmarks/cassettes/severa.json.gz")
+
+# Projection by the last part of the endpoint template
+PROJECTIONS = {
+    "users": projections.User,
+    "workcontracts": projections.WorkContract,
+    "workhours": projections.WorkHour,
+    "allocations": projections.ResourceAllocation,
+    "activities": projections.Activity,
+    "invoices": projections.Invoice,
+    "projectforecasts": projections.ProjectForecast,
+    "phaseswithhierarchy": projections.Phase,
+    "projects": projections.Project,
+    "salescases": projections.Project,
+}
+
+
+def payloads(path: Path) -> dict[type[projections.Slim], list[dict]]:
+    """
+    Recorded JSON objects by the projection they parse into.
+    """
+    result = defaultdict(list)
+
+    for key, interactions in Cassette(path).load().interactions.items():
+        template = endpoint_template(key.split(" ", 1)[1].split("?", 1)[0])
+
+        if (model := PROJECTIONS.get(template.rsplit("/", 1)[-1])) is None:
+            continue
+
+        for interaction in interactions:
+            if interaction["status"] == httpx.codes.OK:
+                body = json.loads(interaction["body"])
+                result[model] += body if isinstance(body, list) else [body]
+
+    return result
+
+
+def measure(parse, items: list[dict], rounds: int) -> tuple[float, int]:
+    """
+    Median seconds of parsing all the items, and the peak memory of the result.
+    """
+    timings = []
+
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        parse(items)
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    result = parse(items)  # noqa: F841
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return sorted(timings)[len(timings) // 2], peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cassette", type=Path, default=DEFAULT_CASSETTE)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    logger.remove()
+
+    print(
+        f"{'model':<20} {'items':>7} {'full ms':>9} {'full MB':>8} "
+        f"{'slim ms':>9} {'slim MB':>8} {'speedup':>8}"
+    )
+
+    for model, items in payloads(args.cassette).items():
+        full_model = projections.FULL_MODELS[model]
+
+        full_time, full_memory = measure(
+            lambda items, full_model=full_model: [full_model(**i) for i in items],
+            items,
+            args.rounds,
+        )
+        slim_time, slim_memory = measure(
+            lambda items, model=model: projections.parse_all(model, items),
+            items,
+            args.rounds,
+        )
+
+        print(
+            f"{model.__name__:<20} {len(items):>7} {full_time * 1000:>9.1f} "
+            f"{full_memory / 1e6:>8.2f} {slim_time * 1000:>9.1f} "
+            f"{slim_memory / 1e6:>8.2f} {full_time / max(slim_time, 1e-9):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
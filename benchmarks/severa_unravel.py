@@ -0,0 +1,131 @@
+"""
+Benchmark unraveling synthetic daily spans with the row-wise apply and explode
+versus the vectorized engine in src.util.unravel, and weekly totals of the
+unraveled rows versus the interval sums of src.util.intervals.
+
+    python -m benchmarks.severa_unravel --users 150 --days 540
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from workalendar.europe import Finland
+
+from src.util.intervals import aggregate
+from src.util.unravel import unravel
+
+
+def spans(users: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    A span of random length for every user and every week of `days`.
+    """
+    rng = np.random.default_rng(seed)
+    first = pd.Timestamp("2024-01-01", tz="UTC")
+    starts = pd.date_range(first, first + pd.Timedelta(days=days - 1), freq="7D")
+
+    data = pd.DataFrame(
+        {
+            "user": np.repeat([f"user-{i}" for i in range(users)], len(starts)),
+            "start_date": np.tile(starts, users),
+            "value": rng.uniform(1, 10, users * len(starts)),
+        }
+    )
+    data["end_date"] = data["start_date"] + pd.to_timedelta(
+        rng.integers(0, 60, len(data)), unit="D"
+    )
+
+    return data
+
+
+def apply_and_explode(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    The row-wise unravel the engine replaced.
+    """
+    calendar = Finland()
+    data = data.copy()
+
+    data["date"] = data.apply(
+        lambda x: pd.date_range(start=x["start_date"], end=x["end_date"]), axis=1
+    )
+    data["_num_workdays"] = data.apply(
+        lambda x: calendar.get_working_days_delta(
+            x["start_date"].date(), x["end_date"].date(), include_start=True
+        ),
+        axis=1,
+    )
+
+    unraveled = data.explode("date").reset_index(drop=True)
+    is_workday = unraveled["date"].map(calendar.is_working_day).map(int)
+    unraveled["value"] = unraveled["value"] / unraveled["_num_workdays"] * is_workday
+
+    return unraveled.drop("_num_workdays", axis=1)
+
+
+def vectorized(data: pd.DataFrame) -> pd.DataFrame:
+    return unravel(data, zero_on_holidays=True, scale_with_workdays=True)
+
+
+def weekly_unraveled(data: pd.DataFrame) -> pd.DataFrame:
+    unraveled = vectorized(data)
+    weeks = unraveled["date"].dt.tz_localize(None).dt.to_period("W")
+
+    return unraveled.groupby(["user", weeks])["value"].sum().reset_index()
+
+
+def weekly_intervals(data: pd.DataFrame) -> pd.DataFrame:
+    return aggregate(
+        data,
+        ["user"],
+        data["start_date"].min(),
+        data["end_date"].max(),
+        "W",
+        zero_on_holidays=True,
+        scale_with_workdays=True,
+    )
+
+
+def measure(function, data: pd.DataFrame, rounds: int) -> tuple[float, int]:
+    """
+    Median seconds of processing the data, and the number of rows produced.
+    """
+    timings = []
+
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        result = function(data)
+        timings.append(time.perf_counter() - t0)
+
+    return sorted(timings)[len(timings) // 2], len(result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=150)
+    parser.add_argument("--days", type=int, default=540)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    data = spans(args.users, args.days)
+
+    print(f"{'method':<20} {'spans':>7} {'rows':>9} {'ms':>9} {'speedup':>8}")
+
+    baseline = None
+    for name, function, is_baseline in (
+        ("apply + explode", apply_and_explode, True),
+        ("vectorized", vectorized, False),
+        ("weekly unraveled", weekly_unraveled, True),
+        ("weekly intervals", weekly_intervals, False),
+    ):
+        seconds, rows = measure(function, data, args.rounds)
+        baseline = seconds if is_baseline else baseline
+
+        print(
+            f"{name:<20} {len(data):>7} {rows:>9} {seconds * 1000:>9.1f} "
+            f"{baseline / max(seconds, 1e-9):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ from fastapi.staticfiles import StaticFiles
 from loguru import logger
 
 import src.config  # noqa: F401
+from src.logic.severa import base_client, stats
 from src.logic.slack.client import (
     send_weekly_slack_update,
     send_weekly_slack_update_debug,
@@ -28,6 +29,8 @@ async def lifespan(app: FastAPI):
             routes.Cronjob(*params)
             for params in [
                 (routes.save_sparse, "0 2 * * *", "database-save"),
+                (routes.sync_severa_mirror, "*/15 * * * *", "severa-sync"),
+                (routes.full_sync_severa_mirror, "30 3 * * SUN", "severa-full-sync"),
                 (send_weekly_slack_update, "0 5 * * MON", "weekly-slack-msg"),
                 # (
                 #     send_weekly_slack_update_debug,
@@ -38,13 +41,16 @@ async def lifespan(app: FastAPI):
         ]
     )
 
-    with anyio.CancelScope() as scope:
-        async with anyio.create_task_group() as tg:
-            tg.start_soon(jobs.start, app)
+    async with base_client.shared_transport() as severa_transport:
+        app.state.severa_transport = severa_transport
 
-            yield
+        with anyio.CancelScope() as scope:
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(jobs.start, app)
 
-            scope.cancel()
+                yield
+
+                scope.cancel()
 
 
 logger.remove()
@@ -69,7 +75,9 @@ async def log_requests(request: Request, call_next):
 
     start_time = time.monotonic()
 
-    with logger.contextualize(source=idem):
+    with logger.contextualize(source=idem), stats.job(
+        f"{request.method} /{stats.endpoint_template(request.url.path)}"
+    ):
         logger.info(
             f"Incoming request {request.method} {request.url.path} (query: {request.query_params}) from {request.client.host}:{request.client.port}."
         )
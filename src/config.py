@@ -20,10 +20,18 @@ class Settings(BaseSettings):
     # mongopassword: str
     # mongoport: str
     mongo_url: MongoDsn
+    # None keeps the persistent Severa caches (dimensions, projects) in memory
+    mongo_base: str | None = "kpi-dev-02"
     severa_client_id: str
     severa_client_secret: str
     severa_client_scope: str
     severa_base_url: AnyHttpUrl
+    severa_max_retries: int = 6
+    severa_retry_base_delay: float = 0.5
+    severa_retry_max_delay: float = 30.0
+    severa_circuit_failure_threshold: int = 5
+    severa_circuit_reset_seconds: float = 30.0
+    severa_validate_full_models: bool = False
     slack_token_bot: str
     openai_api_key: str
     openai_api_org: str
@@ -6,6 +6,10 @@ from pymongo import InsertOne, MongoClient, ReplaceOne
 
 from src.config import settings
 
+# Server selection timeout for the caches, which give up on an unavailable Mongo
+# quickly and go on without it
+CACHE_SERVER_SELECTION_TIMEOUT_MS = 2000
+
 
 class NotNanDict(dict):
     @staticmethod
@@ -23,8 +27,10 @@ class Base:
     Small wrapper to pymongo database.
     """
 
-    def __init__(self, base: str, collection: str):
-        self._client: MongoClient = MongoClient(str(settings.mongo_url))
+    def __init__(self, base: str, collection: str, **client_options):
+        self._client: MongoClient = MongoClient(
+            str(settings.mongo_url), **client_options
+        )
         self._coll = self._client[base][collection]
 
     def create_index(self, expiration: float):
@@ -94,6 +100,28 @@ class Base:
         )
         return result.convert_dtypes()
 
+    def find_documents(self, query=None, projection=None) -> list[dict]:
+        """
+        Documents as they are, for data that doesn't fit a DataFrame.
+        """
+        return list(self._coll.find(query or {}, projection=projection))
+
+    def replace_documents(self, documents: list[dict]) -> None:
+        """
+        Insert or replace documents by their '_id'.
+        """
+        if not documents:
+            return
+
+        result = self._coll.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in documents],
+            ordered=False,
+        )
+        logger.success(
+            f"[{self._coll.name}] Replaced {result.matched_count}, upserted "
+            f"{result.upserted_count} documents of {len(documents)}."
+        )
+
     def find_max_value(self, key: str):
         return next(self._coll.find({}).sort(key, -1).limit(1))[key]
 
@@ -0,0 +1,269 @@
+"""
+Dense KPI cube: one float array per metric id (e.g. 'workhours', 'absences',
+'billing', 'maximum', 'salesvalue'), indexed by the user and the day. The long
+data of processing.load_and_merge is summed into the cube once, and the
+consumers slice it by span, users and business unit and roll it up into weeks
+or months, instead of pivoting the long data again. Built cubes are shared by
+the requests of the process through KpiCubeCache.
+
+    cube = KpiCube.from_frame(data)
+    billing = cube.select(span, business_units=["TIE"]).rollup("W")["billing"]
+"""
+
+import asyncio
+import functools
+import time
+import typing
+
+import numpy as np
+import pandas as pd
+
+from src.util.daterange import DateRange
+from src.util.intervals import period_starts
+from src.util.unravel import utc_days
+
+# User information kept along the user axis, if the data has it
+USER_COLUMNS = ("first_name", "last_name", "business_unit_name")
+
+# Build the cubes again after this, as the data changes in Severa all the time
+CUBE_MAX_AGE_SECONDS = 10 * 60
+
+
+class KpiCube:
+    """
+    Values of shape (metrics, users, dates). The dates are days, or the starts
+    of the periods after rollup(). Selections slice the arrays, so a cube from
+    select() may share its values with the original.
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        metrics: pd.Index,
+        users: pd.DataFrame,
+        dates: pd.DatetimeIndex,
+    ):
+        self.values = values
+        self.metrics = metrics
+        self.users = users
+        self.dates = dates
+
+    @classmethod
+    def from_frame(
+        cls,
+        data: pd.DataFrame,
+        user_column: str = "user",
+        metric_column: str = "id",
+        value_column: str = "value",
+    ) -> "KpiCube":
+        """
+        Sum the values of the long data into a cube with a day for every date
+        from the first to the last one. Rows without a user, metric or date are
+        left out, as pivot_table() would.
+        """
+        data = data.dropna(subset=[user_column, metric_column, "date"])
+
+        metric_codes, metrics = pd.factorize(data[metric_column], sort=True)
+        user_codes, users = pd.factorize(data[user_column], sort=True)
+        days = utc_days(data["date"])
+
+        first = days.min() if len(days) else np.datetime64("NaT", "D")
+        offsets = (days - first).astype(int)
+        length = offsets.max() + 1 if len(offsets) else 0
+
+        values = np.zeros((len(metrics), len(users), length))
+        np.add.at(
+            values,
+            (metric_codes, user_codes, offsets),
+            np.nan_to_num(data[value_column].to_numpy(float, na_value=np.nan)),
+        )
+
+        user_info = (
+            data.groupby(user_column)[
+                [c for c in USER_COLUMNS if c in data.columns and c != user_column]
+            ]
+            .last()
+            .reindex(pd.Index(np.asarray(users), name=user_column))
+        )
+
+        return cls(
+            values,
+            pd.Index(np.asarray(metrics), name=metric_column),
+            user_info,
+            (
+                pd.date_range(first, periods=length, freq="D", tz="UTC", name="date")
+                if length
+                else pd.DatetimeIndex([], tz="UTC", name="date")
+            ),
+        )
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return self.values.shape
+
+    def __contains__(self, metric: str) -> bool:
+        return metric in self.metrics
+
+    def __getitem__(self, metric: str) -> np.ndarray:
+        """
+        The (users, dates) array of the metric.
+        """
+        return self.values[self.metrics.get_loc(metric)]
+
+    def select(
+        self,
+        span: DateRange | None = None,
+        users: typing.Iterable[str] | None = None,
+        business_units: typing.Iterable[str] | None = None,
+        metrics: typing.Iterable[str] | None = None,
+    ) -> "KpiCube":
+        """
+        The part of the cube with the dates in the span, the given users and
+        the users of the given business units, and the given metrics.
+        """
+        dates = slice(None)
+        if span is not None:
+            dates = slice(
+                self.dates.searchsorted(pd.Timestamp(span.start.datetime), "left"),
+                self.dates.searchsorted(pd.Timestamp(span.end.datetime), "right"),
+            )
+
+        selected = np.ones(len(self.users), dtype=bool)
+        if users is not None:
+            selected &= self.users.index.isin(list(users))
+        if business_units is not None:
+            selected &= (
+                self.users["business_unit_name"].isin(list(business_units)).to_numpy()
+            )
+
+        values = self.values
+        metric_index = self.metrics
+        if metrics is not None:
+            positions = self.metrics.get_indexer(list(metrics))
+            positions = positions[positions >= 0]
+            values, metric_index = values[positions], self.metrics[positions]
+
+        if not selected.all():
+            values = values[:, selected]
+
+        return KpiCube(
+            values[:, :, dates],
+            metric_index,
+            self.users[selected],
+            self.dates[dates],
+        )
+
+    def rollup(self, freq: str) -> "KpiCube":
+        """
+        The cube summed into periods of `freq`, e.g. "W" or "M", dated by the
+        start of the period.
+        """
+        if not len(self.dates):
+            return self
+
+        starts, labels = period_starts(
+            self.dates.tz_localize(None).to_numpy("datetime64[D]"), freq
+        )
+
+        return KpiCube(
+            np.add.reduceat(self.values, starts, axis=2),
+            self.metrics,
+            self.users,
+            labels.rename("date"),
+        )
+
+    def by_user(self) -> pd.DataFrame:
+        """
+        Totals of the metrics (columns) for each user (index).
+        """
+        return pd.DataFrame(
+            self.values.sum(axis=2).T, index=self.users.index, columns=self.metrics
+        )
+
+    def by_date(self) -> pd.DataFrame:
+        """
+        Totals of the metrics (columns) for each date (index).
+        """
+        return pd.DataFrame(
+            self.values.sum(axis=1).T, index=self.dates, columns=self.metrics
+        )
+
+    def frame(self) -> pd.DataFrame:
+        """
+        The non-zero values as long data, with the user information.
+        """
+        metric, user, date = np.nonzero(self.values)
+
+        return (
+            self.users.iloc[user]
+            .reset_index()
+            .assign(
+                **{
+                    self.metrics.name or "id": self.metrics[metric],
+                    "date": self.dates[date],
+                    "value": self.values[metric, user, date],
+                }
+            )
+        )
+
+
+class KpiCubeCache:
+    """
+    Cubes by key, e.g. the span, for the current data generation. Concurrent
+    requests for a cube wait for the same build, and a failed build is tried
+    again by the next request. invalidate() starts a new generation, e.g. when
+    new data has been synced or saved. The cubes must not be modified.
+    """
+
+    def __init__(self, max_age: float = CUBE_MAX_AGE_SECONDS) -> None:
+        self._max_age = max_age
+        self._entries: dict[tuple, tuple[float, asyncio.Task[KpiCube]]] = {}
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _is_valid(self, entry: tuple[float, asyncio.Task[KpiCube]] | None) -> bool:
+        if entry is None:
+            return False
+
+        built, task = entry
+
+        if task.done() and (task.cancelled() or task.exception() is not None):
+            return False
+
+        return time.monotonic() - built < self._max_age
+
+    async def get(
+        self,
+        key: typing.Hashable,
+        build: typing.Callable[[], typing.Awaitable[KpiCube]],
+    ) -> KpiCube:
+        key = (self.generation, key)
+
+        if not self._is_valid(entry := self._entries.get(key)):
+            # Drop the expired and failed cubes, so that old spans don't pile up
+            self._entries = {
+                other: other_entry
+                for other, other_entry in self._entries.items()
+                if self._is_valid(other_entry)
+            }
+            entry = self._entries[key] = (
+                time.monotonic(),
+                asyncio.create_task(build()),
+            )
+
+        # The build continues for the other waiters if this one is cancelled
+        return await asyncio.shield(entry[1])
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+
+@functools.cache
+def get_kpi_cube_cache() -> KpiCubeCache:
+    """
+    The KPI cube cache shared by the requests of the process.
+    """
+    return KpiCubeCache()
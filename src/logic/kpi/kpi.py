@@ -1,8 +1,12 @@
 import arrow
+import numpy as np
 import pandas as pd
 from loguru import logger
 
 from src.database.database import Base
+from src.logic.kpi.cube import KpiCube
+from src.logic.processing import load_kpi_cube
+from src.logic.severa.base_client import Transport
 from src.logic.severa.client import Client
 from src.util.daterange import DateRange
 from src.util.process import cull_before, sanitize_dates, unravel
@@ -13,11 +17,13 @@ from src.util.process import cull_before, sanitize_dates, unravel
 #     return data.to_dict(orient="records")
 
 
-async def hours(start: arrow.Arrow, end: arrow.Arrow) -> pd.DataFrame:
+async def hours(
+    start: arrow.Arrow, end: arrow.Arrow, transport: Transport | None = None
+) -> pd.DataFrame:
     today = arrow.utcnow()
     span = DateRange(start, end)
 
-    async with Client() as client:
+    async with Client(transport) as client:
         users = await client.users()
         hours = await client.fetch_hours(span)
 
@@ -44,61 +50,72 @@ async def hours(start: arrow.Arrow, end: arrow.Arrow) -> pd.DataFrame:
     return total_hours
 
 
-async def hours_totals(start: arrow.Arrow, end: arrow.Arrow) -> pd.DataFrame:
-    """ """
-    data = await hours(start, end)
+# Columns of hours_totals() by the metric ids of the KPI cube
+HOURS_TOTALS_COLUMNS = {
+    "absences": "absences",
+    "maximum": "maximum",
+    "saleswork": "saleswork",
+    "workhours_unproductive": "workhours, unproductive",
+    "workhours_productive": "workhours, productive",
+}
 
-    data.loc[data.id == "maximum", "productive"] = False
 
-    table = data.pivot_table(
-        "value",
-        index=["username"],
-        columns=["id", "productive"],
-        aggfunc="sum",
-        fill_value=0,
-        dropna=False,
-        margins=True,
+def totals_by_username(cube: KpiCube, totals: pd.DataFrame) -> pd.DataFrame:
+    """
+    The totals by user (index) summed by username, with an 'All' row.
+    """
+    totals = totals.groupby(cube.users["first_name"].rename("username")).sum()
+    totals.loc["All"] = totals.sum()
+
+    return totals
+
+
+async def hours_totals(
+    start: arrow.Arrow, end: arrow.Arrow, transport: Transport | None = None
+) -> pd.DataFrame:
+    """
+    Hours of the span by username and kind, from the KPI cube.
+    """
+    span = DateRange(start, end)
+    cube = (await load_kpi_cube(span, transport)).select(
+        span, metrics=HOURS_TOTALS_COLUMNS
+    )
+
+    totals = totals_by_username(cube, cube.by_user())
+
+    return totals[[i for i in HOURS_TOTALS_COLUMNS if i in totals.columns]].rename(
+        columns=HOURS_TOTALS_COLUMNS
+    )
+
+
+async def sales_margin_totals(
+    start: arrow.Arrow, end: arrow.Arrow, transport: Transport | None = None
+) -> pd.DataFrame:
+    """
+    Billing and cost of the span by username, from the KPI cube. The cost is the
+    realized hours (workhours and absences) up to today and the maximum hours
+    after it, at the hour cost of the user.
+    """
+    span = DateRange(start, end)
+    cube = (await load_kpi_cube(span, transport)).select(span)
+    realized = (cube.dates <= arrow.utcnow().datetime)[np.newaxis, :]
+
+    def metric(name: str) -> np.ndarray:
+        return cube[name] if name in cube else np.zeros(cube.shape[1:])
+
+    hours = np.where(
+        realized, metric("workhours") + metric("absences"), metric("maximum")
+    )
+    totals = pd.DataFrame(
+        {
+            "billing": metric("billing").sum(axis=1),
+            "cost": (hours * metric("hour_cost")).sum(axis=1),
+        },
+        index=cube.users.index,
     )
+    totals["All"] = totals.sum(axis=1)
 
-    add = table.loc[
-        :,
-        [
-            i
-            for i in [
-                ("absences", False),
-                ("maximum", False),
-                ("saleswork", False),
-                ("workhours", True),
-                ("workhours", False),
-            ]
-            if i in table.columns
-        ],
-    ].copy()
-    add["workhours, unproductive"] = add[("workhours", False)]
-    add["workhours, productive"] = add[("workhours", True)]
-    add = add.drop("workhours", axis=1)
-
-    logger.debug("\n" + str(table))
-    logger.debug(table.columns)
-
-    logger.debug("res:\n" + str(add))
-    logger.debug("res2:\n" + str(add.droplevel(1, axis="columns")))
-
-    return add.droplevel(1, axis="columns")
-
-
-async def sales_margin_totals(start: arrow.Arrow, end: arrow.Arrow) -> pd.DataFrame:
-    """ """
-    data = await sales_margin(start, end)
-    return data.pivot_table(
-        "value",
-        index=["username"],
-        columns="id",
-        aggfunc="sum",
-        fill_value=0,
-        dropna=False,
-        margins=True,
-    ).reset_index()
+    return totals_by_username(cube, totals).reset_index()
 
 
 def unravel_and_cull(  # noqa: PLR0913
@@ -128,11 +145,13 @@ def unravel_and_cull(  # noqa: PLR0913
     )
 
 
-async def sales_margin(start: arrow.Arrow, end: arrow.Arrow) -> pd.DataFrame:
+async def sales_margin(
+    start: arrow.Arrow, end: arrow.Arrow, transport: Transport | None = None
+) -> pd.DataFrame:
     today = arrow.utcnow()
     span_past, span_future = DateRange(start, end).cut(today)
 
-    async with Client() as client:
+    async with Client(transport) as client:
         users = await client.users()
         hours = await client.fetch_hours(span_past)
         billing = await client.fetch_billing(span_past)
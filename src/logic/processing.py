@@ -5,15 +5,21 @@ from functools import partial
 from typing import Any, Iterable, Self
 
 import arrow
+import numpy as np
 import pandas as pd
 from loguru import logger
 from pandas.api.types import CategoricalDtype
-from workalendar.europe import Finland
 
 import src.logic.processing_pandera
 import src.logic.severa.client
+import src.logic.severa.mirror
 from src.database.database import Base
+from src.logic.kpi.cube import KpiCube, get_kpi_cube_cache
+from src.logic.severa.base_client import Transport
+from src.logic.severa.sales_cache import get_sales_cache
 from src.util.daterange import DateRange
+from src.util.intervals import aggregate
+from src.util.unravel import row_mask, unravel
 
 
 class ProcessData:
@@ -26,6 +32,9 @@ class ProcessData:
         self.data = data
         self.unraveled = pd.DataFrame()
 
+        # Group columns and period of totals() while it runs
+        self._totals: tuple[list[str], str] | None = None
+
         self.min_date_in_data = partial(
             self._aggregate_date, aggregate=pd.DataFrame.min
         )
@@ -128,6 +137,32 @@ class ProcessData:
         """
         return ["value"]
 
+    def forecast_rows(
+        self, data: pd.DataFrame  # noqa: ARG002
+    ) -> Sequence[bool] | bool:
+        """
+        A boolean series for selecting the forecast rows of data, whose past
+        dates are culled. Defaults to none. Overridable.
+        """
+        return False
+
+    def _earliest_dates(self, date_span_start: datetime) -> pd.Series:
+        """
+        The earliest date cull_to_span() keeps for each row of the data: today
+        for forecasts with a span, the start of the span otherwise.
+        """
+        cutoff = arrow.utcnow().floor("day").datetime
+        missing = pd.Series(pd.NaT, index=self.data.index)
+        has_span = (
+            self.data.get("start_date", missing).notna()
+            | self.data.get("end_date", missing).notna()
+        ).to_numpy()
+        is_forecast = row_mask(self.forecast_rows(self.data), len(self.data)) & has_span
+
+        return pd.Series(date_span_start, index=self.data.index).where(
+            ~is_forecast, max(date_span_start, cutoff)
+        )
+
     def _cull_past_forecasts(
         self,
         cullable_rows_mask=True,
@@ -217,81 +252,48 @@ class ProcessData:
 
         unravel_mask = self.data_to_unravel()
 
+        if self._totals is not None:
+            by, freq = self._totals
+            self.unraveled = aggregate(
+                self.data,
+                [column for column in by if column in self.data.columns],
+                self._earliest_dates(date_span_start),
+                date_span_end,
+                freq,
+                self.columns_to_unravel(),
+                spans=unravel_mask,
+                zero_on_holidays=set_to_zero_if_on_holiday_mask,
+                scale_with_days=scale_with_number_of_days,
+                scale_with_workdays=scale_with_number_of_workdays,
+            )
+            return self
+
         if self.data.loc[unravel_mask, :].empty:
             self.unraveled = self.data
             return self
 
-        # Set '_date' column to a daily series
-        self.data.loc[unravel_mask, "_date"] = self.data.loc[unravel_mask, :].apply(
-            lambda x: pd.date_range(start=x["start_date"], end=x["end_date"], freq="D"),
-            axis=1,
-        )
-
-        # Calculate and save the number of working days in span
-        calendar = Finland()
-        self.data.loc[unravel_mask, "_num_days"] = self.data.loc[unravel_mask, :].apply(
-            lambda x: (x["end_date"] - x["start_date"]).days,
-            axis=1,
-        )
-        self.data.loc[unravel_mask, "_num_workdays"] = self.data.loc[
-            unravel_mask, :
-        ].apply(
-            lambda x: calendar.get_working_days_delta(
-                x["start_date"].date(), x["end_date"].date(), include_start=True
-            ),
-            axis=1,
-        )
-
-        self.data.loc[unravel_mask, "_pre_scale"] = 1
-        self.data.loc[unravel_mask, "_zero_if_holiday"] = False
-        self.data.loc[
-            unravel_mask & set_to_zero_if_on_holiday_mask, "_zero_if_holiday"
-        ] = True
-
-        scale_with_days_mask = unravel_mask & scale_with_number_of_days
-        scale_with_workdays_mask = unravel_mask & scale_with_number_of_workdays
-        self.data.loc[scale_with_days_mask, "_pre_scale"] = self.data.loc[
-            scale_with_days_mask, "_num_days"
-        ]
-
-        self.data.loc[scale_with_workdays_mask, "_pre_scale"] = self.data.loc[
-            scale_with_workdays_mask, "_num_workdays"
-        ]
-
-        # The actual unravel
-        unraveled = (
-            self.data.loc[unravel_mask, :].explode("_date").reset_index(drop=True)
-        )
-
-        unraveled["_is_workday"] = unraveled["_date"].map(calendar.is_working_day)
-        unraveled["date"] = unraveled["_date"]
-
-        # Scale values to workdays
-        for column in self.columns_to_unravel():
-            unraveled[column] = (
-                unraveled[column]
-                / unraveled["_pre_scale"]
-                * (~(unraveled["_zero_if_holiday"] & ~unraveled["_is_workday"])).map(
-                    int
-                )
-            )
-
-        # Reset
+        # Internal columns, such as '_id', are not carried over
         self.data = self.data.drop(
             [col for col in self.data.columns if col.startswith("_")], axis="columns"
         )
-
-        self.unraveled = pd.concat(
-            [
-                unraveled.drop(
-                    [col for col in unraveled.columns if col.startswith("_")],
-                    axis="columns",
-                ),
-                self.data[~unravel_mask],
-            ],
-            ignore_index=True,
+        rows = row_mask(unravel_mask, len(self.data))
+
+        def for_rows(mask: bool | pd.Series) -> np.ndarray:
+            return row_mask(mask, len(self.data))[rows]
+
+        # Days that cull_to_span() would remove are not unraveled at all
+        unraveled = unravel(
+            self.data.loc[rows, :],
+            value_columns=self.columns_to_unravel(),
+            zero_on_holidays=for_rows(set_to_zero_if_on_holiday_mask),
+            scale_with_days=for_rows(scale_with_number_of_days),
+            scale_with_workdays=for_rows(scale_with_number_of_workdays),
+            earliest=self._earliest_dates(date_span_start)[rows],
+            latest=date_span_end,
         )
 
+        self.unraveled = pd.concat([unraveled, self.data[~rows]], ignore_index=True)
+
         return self
 
     def merge_with(self, other: Self) -> Self:
@@ -310,6 +312,25 @@ class ProcessData:
         c = b.cull_to_span(date_span_start, date_span_end)
         return c
 
+    def totals(
+        self,
+        date_span_start: datetime,
+        date_span_end: datetime,
+        by: Sequence[str],
+        freq: str = "D",
+    ) -> Self:
+        """
+        Sums of the values of process() by the `by` columns (those in the data)
+        and the `freq` periods of 'date', e.g. "D", "W" or "M". The spans are
+        summed as intervals, without unraveling them into daily rows.
+        """
+        self._totals = (list(by), freq)
+
+        try:
+            return self.validate_data().unravel(date_span_start, date_span_end)
+        finally:
+            self._totals = None
+
 
 class ProcessHours(ProcessData):
     def validate_data(self) -> Self:
@@ -351,9 +372,12 @@ class ProcessHours(ProcessData):
         return (
             super()
             .cull_to_span(date_span_start, date_span_end)
-            ._cull_past_forecasts(self.unraveled.id.isin(["workhours", "saleswork"]))
+            ._cull_past_forecasts(self.forecast_rows(self.unraveled))
         )
 
+    def forecast_rows(self, data: pd.DataFrame) -> pd.Series:
+        return data.id.isin(["workhours", "saleswork"])
+
 
 class ProcessBilling(ProcessData):
     def validate_data(self) -> Self:
@@ -396,9 +420,12 @@ class ProcessBilling(ProcessData):
         return (
             super()
             .cull_to_span(date_span_start, date_span_end)
-            ._cull_past_forecasts(self.unraveled.id.isin(["billing"]))
+            ._cull_past_forecasts(self.forecast_rows(self.unraveled))
         )
 
+    def forecast_rows(self, data: pd.DataFrame) -> pd.Series:
+        return data.id.isin(["billing"])
+
 
 class ProcessSales(ProcessData):
     def validate_data(self) -> Self:
@@ -521,7 +548,17 @@ def concat(*data) -> pd.DataFrame:
     return left
 
 
-async def load_and_merge(span: DateRange, forecasts_from_database: bool = True):
+async def load_and_merge(
+    span: DateRange,
+    forecasts_from_database: bool = True,
+    transport: Transport | None = None,
+    realized_from_mirror: bool = True,
+    totals_by: Sequence[str] | None = None,
+):
+    """
+    Processed data of the span with the user and project information. With
+    `totals_by`, daily totals by those columns instead of the daily rows.
+    """
     if forecasts_from_database:
         span_severa, span_future = span.cut(arrow.utcnow())
     else:
@@ -529,7 +566,13 @@ async def load_and_merge(span: DateRange, forecasts_from_database: bool = True):
 
     forecasts_from_database = forecasts_from_database and bool(span_future)
 
-    async with src.logic.severa.client.Client() as client:
+    client_type = (
+        src.logic.severa.mirror.MirrorClient
+        if realized_from_mirror
+        else src.logic.severa.client.Client
+    )
+
+    async with client_type(transport) as client:
         async with asyncio.TaskGroup() as tg:
             logger.debug("Creating fetch tasks.")
             user_info_task = tg.create_task(client.fetch_all_user_information())
@@ -559,35 +602,31 @@ async def load_and_merge(span: DateRange, forecasts_from_database: bool = True):
     all_users_info = all_users_task.result()
     all_projects_info = all_projects_task.result()
 
-    users = ProcessUsers(rel_user_info).process(span.start.datetime, span.end.datetime)
+    def process(processor: type[ProcessData], data: pd.DataFrame) -> ProcessData:
+        if totals_by is None:
+            return processor(data).process(span.start.datetime, span.end.datetime)
+
+        return processor(data).totals(span.start.datetime, span.end.datetime, totals_by)
+
+    users = process(ProcessUsers, rel_user_info)
 
     dfs = [users]
     if span_severa:
-        hours = ProcessHours(hours_p.result()).process(
-            span.start.datetime, span.end.datetime
-        )
-        billing = ProcessBilling(billing_p.result()).process(
-            span.start.datetime, span.end.datetime
-        )
-        sales = ProcessSales(sales_p.result()).process(
-            span.start.datetime, span.end.datetime
-        )
+        hours = process(ProcessHours, hours_p.result())
+        billing = process(ProcessBilling, billing_p.result())
+        sales = process(ProcessSales, sales_p.result())
 
         dfs += [billing, hours, sales]
 
     if forecasts_from_database:
-        billing_f = ProcessBilling(billing_f_task).process(
-            span.start.datetime, span.end.datetime
-        )
+        billing_f = process(ProcessBilling, billing_f_task)
 
         logger.warning(hours_f_task)
-        hours_f = ProcessHours(
-            hours_f_task[hours_f_task.id != "maximum"].copy()
-        ).process(span.start.datetime, span.end.datetime)
-
-        sales_f = ProcessSales(sales_f_task).process(
-            span.start.datetime, span.end.datetime
+        hours_f = process(
+            ProcessHours, hours_f_task[hours_f_task.id != "maximum"].copy()
         )
+
+        sales_f = process(ProcessSales, sales_f_task)
         dfs += [billing_f, hours_f, sales_f]
 
     return merge_user_info_to(all_users_info, concat(*dfs)).merge(
@@ -595,41 +634,65 @@ async def load_and_merge(span: DateRange, forecasts_from_database: bool = True):
     )
 
 
+# Columns the daily totals for the KPIs are by, with those the merges need
+KPI_TOTALS_BY = ["user", "id", "project", "productive", "sold_by"]
+
+
+async def build_kpi_cube(
+    span: DateRange, transport: Transport | None = None
+) -> KpiCube:
+    """
+    Daily totals of the span in a KPI cube by user and id, with the workhours
+    also split into 'workhours_productive' and 'workhours_unproductive'.
+    """
+    data = await load_and_merge(span, transport=transport, totals_by=KPI_TOTALS_BY)
+
+    workhours = data[data.id == "workhours"]
+    productive = workhours.productive.fillna(False).astype(bool)
+
+    return KpiCube.from_frame(
+        pd.concat(
+            [
+                data,
+                workhours[productive].assign(id="workhours_productive"),
+                workhours[~productive].assign(id="workhours_unproductive"),
+            ],
+            ignore_index=True,
+        )
+    )
+
+
+async def load_kpi_cube(span: DateRange, transport: Transport | None = None) -> KpiCube:
+    """
+    The KPI cube of the span, built once per data generation and shared by the
+    requests of the process. The cube must not be modified.
+    """
+    return await get_kpi_cube_cache().get(
+        (span.start.datetime, span.end.datetime, get_sales_cache().generation),
+        partial(build_kpi_cube, span, transport),
+    )
+
+
 async def load_merge_pivot(
     span: DateRange, window: int = 30, contractor_user_ids: Iterable[str] = tuple()
 ) -> pd.DataFrame:
-    data_raw = await load_and_merge(span)
-
-    prod_work = data_raw[(data_raw.id == "workhours") & data_raw.productive].copy()
-    prod_work["id"] = "workhours_productive"
-    unprod_work = data_raw[(data_raw.id == "workhours") & ~data_raw.productive].copy()
-    unprod_work["id"] = "workhours_unproductive"
+    cube = await load_kpi_cube(span)
+    total_hours = cube["absences"] + cube["workhours"]
 
-    data_concat = pd.concat([data_raw, prod_work, unprod_work], ignore_index=True)
-
-    # Set the maximum (hours) of subcontractor users to 0; this is to not count them
-    # in uncounted_hours.
-    mask = data_concat["user"].isin(contractor_user_ids)
-    logger.warning(f"{mask.sum()} max vals delled")
-    if mask.any():
+    # The maximum (hours) of subcontractor users is not counted in uncounted_hours
+    contractors = cube.users.index.isin(list(contractor_user_ids))
+    if contractors.any():
         logger.warning(
-            f'{data_concat.loc[mask & (data_concat["id"] == "maximum"), "value"].sum()} hours delled',
+            f"{cube['maximum'][contractors].sum()} maximum hours of "
+            f"{contractors.sum()} contractors left out."
         )
-    data_concat.loc[mask & (data_concat["id"] == "maximum"), "value"] = 0
-
-    data_pivoted = data_concat.pivot_table(
-        values=["value"],
-        index=["date", "first_name"],
-        columns=["id"],
-        aggfunc="sum",
-        fill_value=0,
-    )
 
-    data_pivoted.columns = data_pivoted.columns.droplevel(0)
-    data_pivoted["total_hours"] = data_pivoted["absences"] + data_pivoted["workhours"]
-    data_pivoted["cost"] = data_pivoted["total_hours"] * data_pivoted["hour_cost"]
-    data_pivoted["margin"] = data_pivoted["billing"] - data_pivoted["cost"]
-    data_windowed = data_pivoted.groupby(["date"]).sum().rolling(window=window).sum()
+    data_daily = cube.by_date()
+    data_daily["maximum"] = cube["maximum"][~contractors].sum(axis=0)
+    data_daily["total_hours"] = total_hours.sum(axis=0)
+    data_daily["cost"] = (total_hours * cube["hour_cost"]).sum(axis=0)
+    data_daily["margin"] = data_daily["billing"] - data_daily["cost"]
+    data_windowed = data_daily.rolling(window=window).sum()
     data_windowed["margin%"] = data_windowed["margin"] / data_windowed["billing"]
     data_windowed["billing_rate"] = (
         data_windowed["workhours_productive"] / data_windowed["workhours"]
@@ -640,14 +703,14 @@ async def load_merge_pivot(
     return data_windowed
 
 
-async def load_merge_billing_forecast_history():
+async def load_merge_billing_forecast_history(transport: Transport | None = None):
     billing_forecast_history_raw = Base("kpi-dev-02", "billing").find({})
 
     billing_forecast_history = src.logic.processing_pandera.process_billing_forecasts(
         billing_forecast_history_raw
     )
 
-    async with src.logic.severa.client.Client() as client:
+    async with src.logic.severa.client.Client(transport) as client:
         async with asyncio.TaskGroup() as tg:
             all_users_task = tg.create_task(client.fetch_all_users())
 
@@ -657,11 +720,11 @@ async def load_merge_billing_forecast_history():
     return result[result["value"] > 0]
 
 
-async def load_merge_billing():
+async def load_merge_billing(transport: Transport | None = None):
     start = arrow.get("2023-06-21")
     end = arrow.utcnow().floor("day")
 
-    async with src.logic.severa.client.Client() as client:
+    async with src.logic.severa.client.Client(transport) as client:
         async with asyncio.TaskGroup() as tg:
             billing_task = tg.create_task(client.fetch_billing(DateRange(start, end)))
             all_users_task = tg.create_task(client.fetch_all_users())
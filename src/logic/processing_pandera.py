@@ -6,9 +6,11 @@ import arrow
 import pandas as pd
 import pandera as pa
 from pandera.typing import DataFrame, Series
-from workalendar.europe import Finland
 
 from src.util.daterange import DateRange
+from src.util.unravel import count_days, utc_days, utc_timestamps
+from src.util.unravel import unravel as unravel_spans
+from src.util.workdays import get_workday_calendar
 
 DateTimeUTCType = Annotated[pd.DatetimeTZDtype, "ns", "utc"]
 
@@ -124,13 +126,7 @@ def expand_start_and_end(
 
 @pa.check_types(lazy=True)
 def unravel(df: DataFrame[FullySpannedModel]) -> DataFrame[UnraveledSpanModel]:
-    dates_for_unraveling: Series[pd.DatetimeIndex] = df.apply(
-        lambda x: pd.date_range(start=x["start_date"], end=x["end_date"], freq="D"),
-        axis=1,
-    )
-
-    df["_date"] = dates_for_unraveling
-    unraveled = df.explode("_date").reset_index(drop=True)
+    unraveled = unravel_spans(df, value_columns=(), date_column="_date")
     unraveled["date"] = unraveled["_date"]
     return unraveled
 
@@ -139,25 +135,13 @@ def unravel(df: DataFrame[FullySpannedModel]) -> DataFrame[UnraveledSpanModel]:
 def calculate_weekday_statistics(
     df: DataFrame[UnraveledSpanModel],
 ) -> DataFrame[WeekdayCalculationOutputModel]:
-    calendar = Finland()
-
-    number_of_days = df.apply(
-        lambda x: (x["end_date"] - x["start_date"]).days,
-        axis=1,
-    )
-
-    number_of_workdays = df.apply(
-        lambda x: calendar.get_working_days_delta(
-            x["start_date"].date(), x["end_date"].date(), include_start=True
-        ),
-        axis=1,
-    )
-
-    is_workday = df["date"].map(calendar.is_working_day)
+    calendar = get_workday_calendar()
+    start = utc_timestamps(df["start_date"])
+    end = utc_timestamps(df["end_date"])
 
-    df["_is_workday"] = is_workday
-    df["_num_all_days"] = number_of_days
-    df["_num_work_days"] = number_of_workdays
+    df["_is_workday"] = calendar.is_working_day(utc_days(df["date"]))
+    df["_num_all_days"] = count_days(start, end)
+    df["_num_work_days"] = calendar.count(start, end)
 
     return df
 
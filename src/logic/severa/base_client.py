@@ -1,37 +1,215 @@
 import asyncio
+import collections
+import datetime
+import email.utils
+import functools
+import random
 import time
 import typing
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
 from types import TracebackType
 
-import anyio
 import arrow
 import httpx
 from loguru import logger
 
 from src.config import settings
 from src.logic.severa import models
+from src.logic.severa.stats import get_call_stats
 
 T = typing.TypeVar("T", bound="Client")
 JSON = dict[str, typing.Any]
 
+_END_OF_PAGES = object()
+
 
 class RateLimiter:
+    """
+    Token bucket limiting the rate of requests to Severa. Holds at most `amount`
+    tokens which are refilled at `amount / rate` tokens per second. The refill rate
+    is lowered after 429 responses and recovers gradually as requests succeed.
+    """
+
+    THROTTLE_FACTOR = 0.5
+    MINIMUM_RATE_FRACTION = 0.1
+    RECOVERY_STEP_FRACTION = 0.02
+    DEFAULT_RETRY_AFTER = 2.0
+
     def __init__(self, amount: int, rate: float):
-        self._amount = amount
-        self._rate = rate
-        self._timestamps = [0.0]
+        self._capacity = float(amount)
+        self._max_refill_rate = amount / rate
+        self._refill_rate = self._max_refill_rate
+        self._tokens = float(amount)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+
+    @property
+    def refill_rate(self) -> float:
+        return self._refill_rate
+
+    def _refill(self, now: float) -> None:
+        refill_start = max(self._last_refill, self._paused_until)
+
+        if now > refill_start:
+            self._tokens = min(
+                self._capacity,
+                self._tokens + (now - refill_start) * self._refill_rate,
+            )
+
+        self._last_refill = max(self._last_refill, now)
 
     async def wait(self) -> None:
         """
         Wait if there's need to limit the rate, otherwise return instantly.
         """
-        nth_last_ts = self._timestamps[-self._amount :][0]
-        time_since_nth_ping = time.monotonic() - nth_last_ts
+        now = time.monotonic()
+        self._refill(now)
+
+        # Reserve a token first, possibly going into debt, so that concurrent
+        # waiters queue up behind each other without a lock.
+        self._tokens -= 1.0
+
+        delay = max(self._paused_until - now, 0.0)
+        if self._tokens < 0:
+            delay += -self._tokens / self._refill_rate
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def throttle(self, retry_after: float | None = None) -> None:
+        """
+        Pause the bucket for `retry_after` seconds and lower the refill rate.
+        Called on 429 Too Many Requests.
+        """
+        now = time.monotonic()
+        self._refill(now)
+
+        self._refill_rate = max(
+            self._refill_rate * RateLimiter.THROTTLE_FACTOR,
+            self._max_refill_rate * RateLimiter.MINIMUM_RATE_FRACTION,
+        )
+        self._paused_until = max(
+            self._paused_until,
+            now
+            + (retry_after if retry_after is not None else self.DEFAULT_RETRY_AFTER),
+        )
+        self._tokens = min(self._tokens, 0.0)
+
+        logger.warning(
+            f"Rate limited, pausing until +{self._paused_until - now:.2f}s, "
+            f"refill rate lowered to {self._refill_rate:.2f}/s."
+        )
+
+    def pause_until(self, seconds: float) -> None:
+        """
+        Pause the bucket without lowering the refill rate, e.g. when the server
+        reports that the quota has been spent.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def recover(self) -> None:
+        """
+        Raise the refill rate back towards the maximum after a successful request.
+        """
+        if self._refill_rate < self._max_refill_rate:
+            self._refill(time.monotonic())
+            self._refill_rate = min(
+                self._max_refill_rate,
+                self._refill_rate
+                + self._max_refill_rate * RateLimiter.RECOVERY_STEP_FRACTION,
+            )
+
+    def update_from_response(self, response: httpx.Response) -> None:
+        """
+        Adjust the bucket from the rate limit headers of the response.
+        """
+        retry_after = parse_retry_after(response.headers)
+
+        if response.status_code == httpx.codes.TOO_MANY_REQUESTS:
+            self.throttle(retry_after)
+            return
+
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.strip() == "0":
+            self.pause_until(
+                retry_after
+                if retry_after is not None
+                else parse_seconds(response.headers.get("X-RateLimit-Reset"))
+                or self.DEFAULT_RETRY_AFTER
+            )
+
+        if response.is_success:
+            self.recover()
+
+
+def parse_seconds(value: str | None) -> float | None:
+    """
+    Parse a header value of delay-seconds, or None if it isn't one.
+    """
+    if value is None:
+        return None
 
-        if time_since_nth_ping < self._rate:
-            await asyncio.sleep(self._rate - time_since_nth_ping)
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
 
-        self._timestamps.append(time.monotonic())
+
+def parse_retry_after(headers: httpx.Headers) -> float | None:
+    """
+    Parse 'Retry-After' as either delay-seconds or an HTTP date into seconds.
+    """
+    value = headers.get("Retry-After")
+
+    if value is None:
+        return None
+
+    if (seconds := parse_seconds(value)) is not None:
+        return seconds
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max((arrow.get(retry_at) - arrow.utcnow()).total_seconds(), 0.0)
+
+
+@functools.cache
+def get_ratelimiter() -> RateLimiter:
+    """
+    The rate limiter shared by every client in the process.
+    """
+    return RateLimiter(10, 1.0)
+
+
+class Priority(IntEnum):
+    """
+    Request priority classes, from the most urgent to the least.
+    """
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+request_priority: ContextVar[Priority] = ContextVar(
+    "severa_request_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def priority(level: Priority) -> typing.Iterator[None]:
+    """
+    Send the Severa requests made in the context (and in tasks started from it)
+    with the given priority.
+    """
+    token = request_priority.set(level)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
 
 
 class Request:
@@ -39,113 +217,499 @@ class Request:
         self.endpoint = endpoint
         self.params = params
         self.headers = headers
+        self.priority = request_priority.get()
         self.queue = asyncio.Queue()
 
     async def response(self) -> httpx.Response:
         """
-        Wait for the response from HTTP GET sent in send().
+        Wait for the response from HTTP GET sent in send(). Raises the network
+        error if sending failed, and RuntimeError if the client was closed.
         """
-        return await self.queue.get()
+        result = await self.queue.get()
 
-    async def send(self, client: httpx.AsyncClient) -> None:
+        if isinstance(result, BaseException):
+            raise result
+
+        return result
+
+    async def send(self, client: httpx.AsyncClient) -> httpx.Response | None:
         """
-        Send the HTTP GET using client.
+        Send the HTTP GET using client. Returns the response also given to
+        response(), or None on network errors and if the client is closed.
         """
         if client.is_closed:
+            # Not a failure of Severa, so not a response for the circuit breaker
             logger.error(f"/{self.endpoint} -> Client is closed.")
-            await self.queue.put(httpx.Response(httpx.codes.INTERNAL_SERVER_ERROR))
-            return
+            await self.queue.put(RuntimeError("Severa client is closed."))
+            return None
 
         try:
-            response: httpx.Response = await client.get(
+            response = await client.get(
                 self.endpoint, params=self.params, headers=self.headers
             )
-        except httpx.WriteError as exc:
-            logger.error(f"/{self.endpoint} -> httpx.WriteError: {exc}")
-            await self.queue.put(httpx.Response(httpx.codes.INTERNAL_SERVER_ERROR))
+        except httpx.TransportError as exc:
+            logger.error(f"/{self.endpoint} -> {type(exc).__name__}: {exc}")
+            await self.queue.put(exc)
+            return None
+
+        await self.queue.put(response)
+        return response
+
+
+class CircuitOpenError(httpx.RequestError):
+    """
+    Raised without sending when the circuit breaker considers Severa to be down.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops requests to Severa after consecutive failures (network errors and 5xx
+    responses). Once open, requests fail fast for `reset_seconds`, after which a
+    single probe request is let through: success closes the circuit, failure
+    opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._state = CircuitBreaker.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def before_request(self) -> None:
+        """
+        Raise CircuitOpenError if the request shouldn't be sent.
+        """
+        if self._state == CircuitBreaker.CLOSED:
+            return
+
+        if self._state == CircuitBreaker.OPEN:
+            if time.monotonic() - self._opened_at < self._reset_seconds:
+                raise CircuitOpenError("Severa circuit breaker is open.")
+
+            logger.info("Severa circuit breaker half-open, sending a probe.")
+            self._state = CircuitBreaker.HALF_OPEN
+            self._probe_in_flight = False
+
+        # A probe that never reported back doesn't block the circuit for good
+        if (
+            self._probe_in_flight
+            and time.monotonic() - self._probe_started < self._reset_seconds
+        ):
+            raise CircuitOpenError("Severa circuit breaker is waiting for a probe.")
+
+        self._probe_in_flight = True
+        self._probe_started = time.monotonic()
+
+    def record_success(self) -> None:
+        if self._state != CircuitBreaker.CLOSED:
+            logger.success("Severa circuit breaker closed.")
+
+        self._state = CircuitBreaker.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+
+        if (
+            self._state == CircuitBreaker.HALF_OPEN
+            or self._failures >= self._failure_threshold
+        ):
+            if self._state != CircuitBreaker.OPEN:
+                logger.error(
+                    f"Severa circuit breaker opened after {self._failures} failures."
+                )
+
+            self._state = CircuitBreaker.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+
+def backoff_delay(retries: int) -> float:
+    """
+    Exponential backoff with full jitter for the nth retry.
+    """
+    ceiling = min(
+        settings.severa_retry_max_delay,
+        settings.severa_retry_base_delay * 2 ** max(retries - 1, 0),
+    )
+    return random.uniform(0.0, ceiling)
+
+
+class ConcurrencyLimiter:
+    """
+    AIMD (additive increase, multiplicative decrease) limit for the number of
+    requests in flight. The limit grows by about one per limit's worth of
+    successful requests, and is cut when Severa answers with 429/5xx or the
+    latency spikes above the running baseline.
+    """
+
+    DECREASE_FACTOR = 0.5
+    LATENCY_TOLERANCE = 2.0
+    LATENCY_SMOOTHING = 0.1
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32):
+        self._limit = float(initial)
+        self._minimum = minimum
+        self._maximum = maximum
+        self._in_flight = 0
+        self._latency_baseline: float | None = None
+        self._last_decrease = 0.0
+        self._slot_freed = asyncio.Event()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def latency_baseline(self) -> float | None:
+        return self._latency_baseline
+
+    async def acquire(self) -> None:
+        """
+        Wait until there's room for one more request in flight.
+        """
+        while self._in_flight >= self.limit:
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+
+        self._in_flight += 1
+
+    def release(self, latency: float, overloaded: bool = False) -> None:
+        """
+        Free the slot and adjust the limit by the outcome of the request.
+        """
+        self._in_flight -= 1
+
+        baseline = self._latency_baseline
+        spiked = (
+            baseline is not None
+            and latency > baseline * ConcurrencyLimiter.LATENCY_TOLERANCE
+        )
+
+        if overloaded or spiked:
+            self._decrease(baseline or latency)
         else:
-            await self.queue.put(response)
+            self._limit = min(self._maximum, self._limit + 1.0 / self._limit)
 
+        if not overloaded:
+            self._latency_baseline = (
+                latency
+                if baseline is None
+                else baseline
+                + ConcurrencyLimiter.LATENCY_SMOOTHING * (latency - baseline)
+            )
 
-class Client:
-    MAX_RETRIES = 6
-    HTTP_ERROR_429 = 429
+        self._slot_freed.set()
+
+    def _decrease(self, window: float) -> None:
+        # Responses to requests sent before the previous decrease don't count
+        now = time.monotonic()
+        if now - self._last_decrease < window:
+            return
 
-    def __init__(self: T) -> None:
+        self._last_decrease = now
+        previous_limit = self.limit
+        self._limit = max(
+            self._minimum, self._limit * ConcurrencyLimiter.DECREASE_FACTOR
+        )
+
+        if self.limit < previous_limit:
+            logger.warning(f"Severa concurrency limit lowered to {self.limit}.")
+
+
+class TokenManager:
+    """
+    Severa access token shared by all the transports in the process. The token is
+    refreshed in the background when it's about to expire, and concurrent callers
+    wait on a single in-flight refresh instead of each authenticating on their own.
+    """
+
+    REFRESH_MARGIN_SECONDS = 5 * 60
+
+    def __init__(self) -> None:
         self._client_id: str = settings.severa_client_id
         self._client_secret: str = settings.severa_client_secret
         self._client_scope: str = settings.severa_client_scope
 
-        self._client = httpx.AsyncClient(
-            base_url=str(settings.severa_base_url), http2=True, timeout=120.0
-        )
         self._auth: models.PublicAuthenticationOutputModel | None = None
-        self._request_limit = anyio.Semaphore(4)
-        self._ratelimit = RateLimiter(10, 1.0)
-        self._request_queue = asyncio.Queue()
-        self._requester_worker = None
+        self._headers: dict[str, str] = {}
+        self._access_expires = 0.0
+        self._refresh_expires = 0.0
+        self._generation = 0
+        self._refresh_task: asyncio.Task | None = None
 
-    async def _requester_worker_func(self) -> None:
+    @property
+    def generation(self) -> int:
         """
-        Worker coroutine to send HTTP requests in the queue with rate limiting.
+        Incremented each time a new token is received.
         """
-        while True:
-            request: Request = await self._request_queue.get()
+        return self._generation
 
-            await self._ratelimit.wait()
+    async def headers(self, client: httpx.AsyncClient) -> dict[str, str]:
+        """
+        Return the authorization headers. Awaits only if there's no valid token,
+        otherwise starts a background refresh if the token is about to expire.
+        """
+        now = time.time()
+
+        if self._auth is None or now >= self._access_expires:
+            await asyncio.shield(self._start_refresh(client))
+        elif now >= self._access_expires - TokenManager.REFRESH_MARGIN_SECONDS:
+            self._start_refresh(client)
+
+        return self._headers
 
-            asyncio.create_task(request.send(self._client))
+    async def invalidate(self, client: httpx.AsyncClient, generation: int) -> None:
+        """
+        Called on 401 with the generation of the rejected token. Re-authenticates
+        only once, even if many queued requests were rejected with the same token.
+        """
+        if generation == self._generation:
+            self._access_expires = 0.0
+            self._refresh_expires = 0.0
+            await asyncio.shield(self._start_refresh(client))
+        elif self._refresh_task is not None and not self._refresh_task.done():
+            await asyncio.shield(self._refresh_task)
+
+    def _start_refresh(self, client: httpx.AsyncClient) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh(client))
+            self._refresh_task.add_done_callback(self._log_refresh_failure)
+
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and (exc := task.exception()) is not None:
+            logger.error(f"Refreshing Severa access token failed: {exc!r}")
 
-    async def _authenticate(self) -> None:
+    async def _refresh(self, client: httpx.AsyncClient) -> None:
+        if self._auth is not None and time.time() < self._refresh_expires:
+            logger.debug("Refreshing auth")
+            await self._reauthenticate(client)
+        else:
+            logger.debug("Access and refresh expired, authing again")
+            await self._authenticate(client)
+
+    async def _authenticate(self, client: httpx.AsyncClient) -> None:
         payload = {
             "client_Id": self._client_id,
             "client_Secret": self._client_secret,
             "scope": self._client_scope,
         }
 
-        response = await self._client.post("token", json=payload)
+        response = await client.post("token", json=payload)
         response.raise_for_status()
 
-        self._auth = models.PublicAuthenticationOutputModel(**response.json())
+        self._set_auth(models.PublicAuthenticationOutputModel(**response.json()))
 
-    async def _reauthenticate(self: T) -> None:
+    async def _reauthenticate(self, client: httpx.AsyncClient) -> None:
         assert self._auth is not None
 
-        response = await self._client.post(
+        response = await client.post(
             "refreshtoken",
             headers={"client_Id": self._client_id},
             json=self._auth.refresh_token,
         )
-        response.raise_for_status()
-
-        self._auth = models.PublicAuthenticationOutputModel(**response.json())
 
-    async def auth(self):
-        if self._auth is None:
-            await self._authenticate()
-        else:
-            # Check auth expiration
-            access_expires = arrow.get(self._auth.access_token_expires_utc.isoformat())
-            refresh_expires = arrow.get(
-                self._auth.refresh_token_expires_utc.isoformat()
+        if response.is_error:
+            logger.warning(
+                f"Refreshing token failed with {response.status_code}, authing again"
             )
-            now = arrow.utcnow()
+            await self._authenticate(client)
+            return
 
-            if now > access_expires:
-                if now < refresh_expires:
-                    logger.debug("Refreshing auth")
-                    await self._reauthenticate()
-                else:
-                    logger.debug("Access and refresh expired, authing again")
-                    await self._authenticate()
+        self._set_auth(models.PublicAuthenticationOutputModel(**response.json()))
 
-        return {
+    def _set_auth(self, auth: models.PublicAuthenticationOutputModel) -> None:
+        """
+        Save the token and precompute the headers and expiration times, so that
+        they don't need to be parsed again on every request.
+        """
+        now = time.time()
+
+        self._auth = auth
+        self._headers = {
             "client_Id": self._client_id,
-            "Authorization": f"{self._auth.access_token_type} "
-            f"{self._auth.access_token}",
+            "Authorization": f"{auth.access_token_type} {auth.access_token}",
         }
+        self._access_expires = TokenManager._expiration(
+            now, auth.access_token_expires_in, auth.access_token_expires_utc
+        )
+        self._refresh_expires = TokenManager._expiration(
+            now, auth.refresh_token_expires_in, auth.refresh_token_expires_utc
+        )
+        self._generation += 1
 
-    async def __aenter__(self: T) -> T:
+    @staticmethod
+    def _expiration(
+        now: float, expires_in: int | None, expires_utc: datetime.datetime | None
+    ) -> float:
+        if expires_utc is not None:
+            if expires_utc.tzinfo is None:
+                expires_utc = expires_utc.replace(tzinfo=datetime.UTC)
+            return expires_utc.timestamp()
+
+        if expires_in is not None:
+            return now + expires_in
+
+        return now
+
+
+@functools.cache
+def get_token_manager() -> TokenManager:
+    """
+    The token manager shared by every transport in the process.
+    """
+    return TokenManager()
+
+
+class RequestQueue:
+    """
+    Queue of requests with a lane for each priority. Non-empty lanes are served by
+    weighted round robin, so that interactive requests go first but batch requests
+    still progress while interactive ones are waiting.
+    """
+
+    WEIGHTS: typing.ClassVar[dict[Priority, int]] = {
+        Priority.INTERACTIVE: 4,
+        Priority.BATCH: 1,
+    }
+
+    def __init__(self) -> None:
+        self._lanes: dict[Priority, collections.deque[Request]] = {
+            level: collections.deque() for level in Priority
+        }
+        self._credits = dict(RequestQueue.WEIGHTS)
+        self._not_empty = asyncio.Event()
+
+    def qsize(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def depths(self) -> dict[str, int]:
+        return {level.name.lower(): len(lane) for level, lane in self._lanes.items()}
+
+    async def put(self, request: Request) -> None:
+        self._lanes[request.priority].append(request)
+        self._not_empty.set()
+
+    async def get(self) -> Request:
+        while not self.qsize():
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        return self._next()
+
+    def _next(self) -> Request:
+        for level in Priority:
+            if self._lanes[level] and self._credits[level] > 0:
+                self._credits[level] -= 1
+                return self._lanes[level].popleft()
+
+        # Every waiting lane has used its share, start a new round
+        self._credits = dict(RequestQueue.WEIGHTS)
+        return self._next()
+
+
+class Transport:
+    """
+    Long-lived connection to Severa: a pooled HTTP/2 client, the requester worker,
+    and the access token. One transport is opened per process (see
+    shared_transport()) and shared by all the Client facades.
+    """
+
+    HTTP_ERROR_429 = 429
+    MAX_CONNECTIONS = 10
+    MAX_KEEPALIVE_CONNECTIONS = 5
+
+    def __init__(self, http_transport: httpx.AsyncBaseTransport | None = None) -> None:
+        """
+        `http_transport` replaces the default network transport of httpx, e.g.
+        with the record/replay transports in src.logic.severa.cassette.
+        """
+        self._client = httpx.AsyncClient(
+            base_url=str(settings.severa_base_url),
+            http2=True,
+            timeout=120.0,
+            transport=http_transport,
+            limits=httpx.Limits(
+                max_connections=Transport.MAX_CONNECTIONS,
+                max_keepalive_connections=Transport.MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        self._tokens = get_token_manager()
+        self._concurrency = ConcurrencyLimiter()
+        self._circuit = CircuitBreaker(
+            settings.severa_circuit_failure_threshold,
+            settings.severa_circuit_reset_seconds,
+        )
+        self._sending: set[asyncio.Task] = set()
+        self._ratelimit = get_ratelimiter()
+        self._stats = get_call_stats()
+        self._request_queue = RequestQueue()
+        self._requester_worker = None
+
+        self._inflight_pages: dict[tuple, asyncio.Task] = {}
+        self.coalesced_hits = 0
+        self.coalesced_misses = 0
+
+    async def _requester_worker_func(self) -> None:
+        """
+        Worker coroutine to send HTTP requests in the queue with rate limiting.
+        """
+        while True:
+            request: Request = await self._request_queue.get()
+
+            await self._concurrency.acquire()
+            await self._ratelimit.wait()
+
+            task = asyncio.create_task(self._send(request))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, request: Request) -> None:
+        t0 = time.monotonic()
+        overloaded = True
+
+        try:
+            response = await request.send(self._client)
+
+            if response is None:
+                # A network error, or the client was closed, which Severa didn't do
+                overloaded = not self._client.is_closed
+            else:
+                overloaded = (
+                    response.status_code == httpx.codes.TOO_MANY_REQUESTS
+                    or response.is_server_error
+                )
+        finally:
+            self._concurrency.release(time.monotonic() - t0, overloaded)
+
+    async def auth(self) -> dict[str, str]:
+        return await self._tokens.headers(self._client)
+
+    @property
+    def is_open(self) -> bool:
+        return self._requester_worker is not None and not self._client.is_closed
+
+    async def __aenter__(self) -> "Transport":
         await self._client.__aenter__()
 
         self._requester_worker = asyncio.create_task(self._requester_worker_func())
@@ -160,18 +724,51 @@ class Client:
     ) -> None:
         if self._requester_worker:
             self._requester_worker.cancel()
+            self._requester_worker = None
 
         await self._client.__aexit__(exc_type, exc_value, traceback)
 
     async def get_with_retries(self, endpoint: str, params, headers):
         retries = 0
 
-        while retries < Client.MAX_RETRIES:
+        while retries < settings.severa_max_retries:
+            if retries > 0:
+                await asyncio.sleep(backoff_delay(retries))
+
+            self._circuit.before_request()
+
             headers.update(await self.auth())
+            token_generation = self._tokens.generation
 
             request = Request(endpoint, params, headers)
             await self._request_queue.put(request)
-            response = await request.response()
+            t0 = time.monotonic()
+
+            try:
+                response = await request.response()
+            except httpx.TransportError as exc:
+                self._stats.record_call(
+                    endpoint, time.monotonic() - t0, retry=retries > 0, error=True
+                )
+                self._circuit.record_failure()
+                logger.warning(f"GET {endpoint} failed with {exc!r}, retrying.")
+                retries += 1
+                continue
+
+            self._stats.record_call(
+                endpoint,
+                response.elapsed.total_seconds(),
+                response.num_bytes_downloaded,
+                retry=retries > 0,
+                error=response.is_error,
+            )
+
+            if response.is_server_error:
+                self._circuit.record_failure()
+            else:
+                self._circuit.record_success()
+
+            self._ratelimit.update_from_response(response)
 
             try:
                 response.raise_for_status()
@@ -180,18 +777,15 @@ class Client:
 
                 match exc.response.status_code:
                     case httpx.codes.UNAUTHORIZED:
-                        await self._authenticate()
+                        await self._tokens.invalidate(self._client, token_generation)
                     case httpx.codes.TOO_MANY_REQUESTS:
-                        # Too Many Requests, shouldn't happen though
-                        logger.warning("Got 429, sleeping 2s.")
-                        await anyio.sleep(2.0)
-                        logger.warning("Sleeping done.")
+                        # The limiter has been throttled above, so the retry waits
+                        # in the worker until the bucket allows it.
+                        logger.warning("Got 429, retrying after rate limit pause.")
+                    case _ if exc.response.is_server_error:
+                        logger.warning(f"Got {exc.response.status_code}, retrying.")
                     case _:
                         raise
-
-            except (httpx.RequestError, httpx.HTTPError) as exc:
-                logger.exception(exc)
-                raise
             else:
                 logger.success(
                     f"{response.http_version} GET {endpoint} {'' if retries < 1 else f'[retry {retries}] '}in "
@@ -204,26 +798,306 @@ class Client:
         logger.error("Retry limit reached.")
         raise httpx.RequestError("Retry limit reached.")
 
-    async def get(self, endpoint: str, params=None, **kwargs):
-        next_page_available = True
-        headers = {}
+    @staticmethod
+    def _page_key(endpoint: str, params: dict[str, typing.Any]) -> tuple:
+        return (
+            endpoint,
+            tuple(
+                sorted(
+                    (
+                        key,
+                        (
+                            tuple(str(v) for v in value)
+                            if isinstance(value, list | tuple | set)
+                            else str(value)
+                        ),
+                    )
+                    for key, value in params.items()
+                )
+            ),
+        )
 
-        if params is None:
-            params = {}
+    async def _fetch_page(
+        self, endpoint: str, params: dict[str, typing.Any]
+    ) -> tuple[typing.Any, str | None]:
+        response = await self.get_with_retries(endpoint, params, {})
+        return response.json(), response.headers.get("NextPageToken")
 
-        params.update(**kwargs)
+    async def get_page(
+        self, endpoint: str, params: dict[str, typing.Any]
+    ) -> tuple[typing.Any, str | None]:
+        """
+        GET one page and return its decoded JSON and the next page token.
+        Concurrent calls with the same endpoint and params (including the page
+        token) share one request, and the same decoded JSON, so callers must not
+        modify the result.
+        """
+        key = Transport._page_key(endpoint, params)
 
-        while next_page_available:
-            response = await self.get_with_retries(endpoint, params, headers)
+        if (task := self._inflight_pages.get(key)) is not None:
+            self.coalesced_hits += 1
+            self._stats.record_coalesced(endpoint)
+            return await asyncio.shield(task)
 
-            yield response.json()
+        self.coalesced_misses += 1
 
-            if next_page_available := ("NextPageToken" in response.headers):
-                params.update({"pageToken": response.headers["NextPageToken"]})
-                pass
+        task = asyncio.create_task(self._fetch_page(endpoint, dict(params)))
+        self._inflight_pages[key] = task
 
-    async def get_all(self, endpoint: str, params=None, **kwargs) -> list[JSON]:
-        results = []
+        def forget(task: asyncio.Task) -> None:
+            self._inflight_pages.pop(key, None)
+            if not task.cancelled():
+                # Mark the exception retrieved in case all the waiters are gone
+                task.exception()
+
+        task.add_done_callback(forget)
+
+        return await asyncio.shield(task)
+
+    def status(self) -> dict[str, typing.Any]:
+        """
+        Current state of the transport, for monitoring.
+        """
+        return {
+            "queue_depth": self._request_queue.qsize(),
+            "queue_depth_by_priority": self._request_queue.depths(),
+            "inflight_pages": len(self._inflight_pages),
+            "coalesced_hits": self.coalesced_hits,
+            "coalesced_misses": self.coalesced_misses,
+            "rate_limit_refill_per_second": self._ratelimit.refill_rate,
+            "circuit_breaker": self._circuit.state,
+            "concurrency_limit": self._concurrency.limit,
+            "in_flight": self._concurrency.in_flight,
+            "latency_baseline_seconds": self._concurrency.latency_baseline,
+        }
+
+
+_shared_transport: Transport | None = None
+
+
+def get_shared_transport() -> Transport | None:
+    """
+    The process-wide transport, if one has been opened with shared_transport().
+    """
+    if _shared_transport is not None and _shared_transport.is_open:
+        return _shared_transport
+
+    return None
+
+
+@asynccontextmanager
+async def shared_transport() -> typing.AsyncIterator[Transport]:
+    """
+    Open the process-wide transport for the duration of the context. Used in the
+    FastAPI lifespan, so that all requests and cronjobs share connections, the
+    rate limiter and the access token.
+    """
+    global _shared_transport  # noqa: PLW0603
+
+    async with Transport() as transport:
+        _shared_transport = transport
+        try:
+            yield transport
+        finally:
+            _shared_transport = None
+
+
+class Client:
+    """
+    Lightweight facade for a Transport. Uses the given or the shared transport,
+    and opens (and closes) a private one only if neither is available.
+    """
+
+    PREFETCH_PAGES = 2
+    MAX_LIST_PARAM_LENGTH = 50
+
+    def __init__(self: T, transport: Transport | None = None) -> None:
+        self._transport = transport or get_shared_transport()
+        self._owns_transport = self._transport is None
+
+        if self._transport is None:
+            self._transport = Transport()
+
+    @property
+    def transport(self) -> Transport:
+        assert self._transport is not None
+        return self._transport
+
+    async def __aenter__(self: T) -> T:
+        if self._owns_transport:
+            await self.transport.__aenter__()
+
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None = None,
+        exc_value: BaseException | None = None,
+        traceback: TracebackType | None = None,
+    ) -> None:
+        if self._owns_transport:
+            await self.transport.__aexit__(exc_type, exc_value, traceback)
+
+    async def get_with_retries(self, endpoint: str, params, headers):
+        return await self.transport.get_with_retries(endpoint, params, headers)
+
+    async def _get_pages(self, endpoint: str, params: dict[str, typing.Any]):
+        """
+        Yield pages one by one, following 'NextPageToken' headers.
+        """
+        params = dict(params)
+
+        while True:
+            page, next_page_token = await self.transport.get_page(endpoint, params)
+
+            yield page
+
+            if next_page_token is None:
+                break
+
+            params.update({"pageToken": next_page_token})
+
+    async def _produce_pages(
+        self, endpoint: str, params: dict[str, typing.Any], pages: asyncio.Queue
+    ) -> None:
+        try:
+            async for page in self._get_pages(endpoint, params):
+                await pages.put((page, None))
+        except Exception as exc:
+            await pages.put((None, exc))
+        else:
+            await pages.put((_END_OF_PAGES, None))
+
+    @staticmethod
+    async def _consume_pages(pages: asyncio.Queue):
+        while True:
+            page, exc = await pages.get()
+
+            if exc is not None:
+                raise exc
+
+            if page is _END_OF_PAGES:
+                break
+
+            yield page
+
+    @staticmethod
+    def chunk_params(
+        params: dict[str, typing.Any], max_length: int
+    ) -> list[dict[str, typing.Any]]:
+        """
+        Split list-valued params longer than `max_length` into chunks. With more
+        than one long list, every combination of their chunks is returned.
+        """
+        chunks = [params]
+
+        for key, value in params.items():
+            if isinstance(value, list | tuple) and len(value) > max_length:
+                values = list(dict.fromkeys(value))
+                chunks = [
+                    {**chunk, key: values[i : i + max_length]}
+                    for chunk in chunks
+                    for i in range(0, len(values), max_length)
+                ]
+
+        return chunks
+
+    @staticmethod
+    def _unseen(page: typing.Any, seen: set[str]) -> typing.Any:
+        """
+        Drop the records of the page whose guid is in `seen`, and add the rest.
+        """
+        records = page if isinstance(page, list) else [page]
+        result = []
+
+        for record in records:
+            guid = record.get("guid") if isinstance(record, dict) else None
+
+            if guid is not None:
+                if guid in seen:
+                    continue
+
+                seen.add(guid)
+
+            result.append(record)
+
+        return result if isinstance(page, list) else next(iter(result), None)
+
+    async def _get_chunks(
+        self, endpoint: str, chunks: list[dict[str, typing.Any]], prefetch: int
+    ):
+        """
+        Fetch the page chains of all the chunks concurrently, and yield their
+        pages in chunk order without the records already yielded.
+        """
+        queues: list[asyncio.Queue] = [
+            asyncio.Queue(maxsize=max(prefetch, 1)) for _ in chunks
+        ]
+        producers = [
+            asyncio.create_task(self._produce_pages(endpoint, chunk, pages))
+            for chunk, pages in zip(chunks, queues, strict=True)
+        ]
+        seen: set[str] = set()
+
+        try:
+            for pages in queues:
+                async for page in Client._consume_pages(pages):
+                    if (page := Client._unseen(page, seen)) is not None:
+                        yield page
+        finally:
+            for producer in producers:
+                producer.cancel()
+
+    async def get(
+        self,
+        endpoint: str,
+        params=None,
+        prefetch: int | None = None,
+        **kwargs,
+    ):
+        """
+        Yield pages of JSON. Up to `prefetch` following pages are requested in the
+        background while the consumer processes the current one, by default
+        PREFETCH_PAGES.
+
+        List params longer than MAX_LIST_PARAM_LENGTH (e.g. 'userGuids') are split
+        into chunks fetched in parallel, and records are de-duplicated by guid.
+        """
+        params = {**(params or {}), **kwargs}
+        prefetch = self.PREFETCH_PAGES if prefetch is None else prefetch
+
+        if len(chunks := Client.chunk_params(params, self.MAX_LIST_PARAM_LENGTH)) > 1:
+            async for page in self._get_chunks(endpoint, chunks, prefetch):
+                yield page
+            return
+
+        if prefetch < 1:
+            async for page in self._get_pages(endpoint, params):
+                yield page
+            return
+
+        pages: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+        producer_task = asyncio.create_task(
+            self._produce_pages(endpoint, params, pages)
+        )
+
+        try:
+            async for page in Client._consume_pages(pages):
+                yield page
+        finally:
+            producer_task.cancel()
+
+    async def stream(self, endpoint: str, params=None, **kwargs):
+        """
+        Yield single records from all the pages, so that callers can process
+        them incrementally instead of collecting the whole result first.
+        """
         async for json in self.get(endpoint, params, **kwargs):
-            results += json if isinstance(json, list) else [json]
-        return results
+            if isinstance(json, list):
+                for record in json:
+                    yield record
+            else:
+                yield json
+
+    async def get_all(self, endpoint: str, params=None, **kwargs) -> list[JSON]:
+        return [record async for record in self.stream(endpoint, params, **kwargs)]
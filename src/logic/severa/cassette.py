@@ -0,0 +1,231 @@
+"""
+Record and replay HTTP interactions with Severa, for running the fetches offline.
+
+Recording wraps the real transport and saves every response (with its headers, so
+pagination via 'NextPageToken' works) into a gzipped JSON cassette. Replaying
+serves the responses from the cassette in the recorded order, optionally with
+artificial latency:
+
+    async with SeveraClient(Transport(replay_transport("hours.json.gz", 0.2))) as c:
+        await c.fetch_hours(DateRange(30))
+
+The fetches cut their spans at the current time, and the query parameters are part
+of the recorded requests. Replay with the current time frozen to the time of the
+recording (Cassette.recorded) so that the requests match on any day.
+"""
+
+import asyncio
+import gzip
+import json
+import random
+from collections import defaultdict, deque
+from pathlib import Path
+
+import arrow
+import httpx
+from loguru import logger
+
+from src.config import settings
+
+CASSETTE_VERSION = 1
+
+# Token values are not saved into cassettes
+SCRUBBED_TOKEN_FIELDS = {
+    "access_token": "cassette-access-token",
+    "refresh_token": "cassette-refresh-token",
+    "access_token_expires_utc": "2999-01-01T00:00:00Z",
+    "refresh_token_expires_utc": "2999-01-01T00:00:00Z",
+}
+SCRUBBED_HEADERS = {"authorization", "client_id", "set-cookie"}
+
+
+def interaction_key(request: httpx.Request) -> str:
+    """
+    Key for matching a request to the recorded ones: method, path relative to the
+    Severa base URL and the sorted query parameters.
+    """
+    base_path = httpx.URL(str(settings.severa_base_url)).path
+    path = request.url.path.removeprefix(base_path).lstrip("/")
+    query = "&".join(
+        f"{key}={value}" for key, value in sorted(request.url.params.multi_items())
+    )
+
+    return f"{request.method} {path}?{query}"
+
+
+class Cassette:
+    """
+    Recorded interactions by interaction_key(), in the order they were recorded.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.interactions: dict[str, list[dict]] = defaultdict(list)
+        self.recorded: arrow.Arrow | None = None
+
+    def load(self) -> "Cassette":
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            content = json.load(file)
+
+        if content.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version in {self.path}")
+
+        if content.get("recorded") is not None:
+            self.recorded = arrow.get(content["recorded"])
+
+        for interaction in content["interactions"]:
+            self.interactions[interaction["key"]].append(interaction)
+
+        return self
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with gzip.open(self.path, "wt", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": CASSETTE_VERSION,
+                    "recorded": self.recorded and self.recorded.isoformat(),
+                    "interactions": [
+                        interaction
+                        for interactions in self.interactions.values()
+                        for interaction in interactions
+                    ],
+                },
+                file,
+            )
+
+        logger.info(
+            f"Saved {sum(len(i) for i in self.interactions.values())} "
+            f"interactions to {self.path}."
+        )
+
+    def add(self, request: httpx.Request, response: httpx.Response) -> None:
+        body = response.text
+
+        if request.url.path.endswith(("/token", "/refreshtoken")):
+            body = json.dumps(response.json() | SCRUBBED_TOKEN_FIELDS)
+
+        self.interactions[interaction_key(request)].append(
+            {
+                "key": interaction_key(request),
+                "status": response.status_code,
+                "headers": [
+                    [name, value]
+                    for name, value in response.headers.multi_items()
+                    if name.lower() not in SCRUBBED_HEADERS
+                    and name.lower() not in {"content-encoding", "content-length"}
+                ],
+                "body": body,
+            }
+        )
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Send requests with the wrapped transport and record the responses. The
+    cassette is saved when the transport (i.e. its client) is closed.
+    """
+
+    def __init__(
+        self, path: str | Path, transport: httpx.AsyncBaseTransport | None = None
+    ):
+        self._cassette = Cassette(path)
+        self._cassette.recorded = arrow.utcnow()
+        self._transport = transport or httpx.AsyncHTTPTransport(http2=True)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self._transport.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+
+        recorded = httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            content=content,
+            request=request,
+            extensions=response.extensions,
+        )
+        self._cassette.add(request, recorded)
+
+        return httpx.Response(
+            response.status_code,
+            headers=[
+                (name, value)
+                for name, value in response.headers.multi_items()
+                if name.lower() != "content-encoding"
+            ],
+            stream=httpx.ByteStream(content),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        self._cassette.save()
+        await self._transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Serve responses from a cassette. Repeated identical requests get the recorded
+    responses in order, cycling when they run out. Each response is delayed by
+    `latency` seconds plus a uniformly random `jitter`, drawn from a seeded
+    generator so that runs are repeatable.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+    ):
+        self._cassette = Cassette(path).load()
+        self._latency = latency
+        self._jitter = jitter
+        self._random = random.Random(seed)
+        self._queues = {
+            key: deque(interactions)
+            for key, interactions in self._cassette.interactions.items()
+        }
+
+    @property
+    def recorded(self) -> arrow.Arrow | None:
+        """
+        When the cassette was recorded, None for cassettes without the time.
+        """
+        return self._cassette.recorded
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = interaction_key(request)
+        queue = self._queues.get(key)
+
+        if not queue:
+            logger.error(f"No recorded interaction for '{key}'.")
+            return httpx.Response(
+                httpx.codes.NOT_FOUND,
+                stream=httpx.ByteStream(b"Not recorded in cassette."),
+            )
+
+        interaction = queue[0]
+        queue.rotate(-1)
+
+        delay = self._latency + self._random.uniform(0.0, self._jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        return httpx.Response(
+            interaction["status"],
+            headers=interaction["headers"],
+            stream=httpx.ByteStream(interaction["body"].encode("utf-8")),
+            extensions={"http_version": b"HTTP/1.1"},
+        )
+
+
+def record_transport(path: str | Path) -> RecordingTransport:
+    return RecordingTransport(path)
+
+
+def replay_transport(
+    path: str | Path, latency: float = 0.0, jitter: float = 0.0, seed: int = 0
+) -> ReplayTransport:
+    return ReplayTransport(path, latency, jitter, seed)
@@ -0,0 +1,235 @@
+"""
+In-memory catalog of the projects and sales cases, stored column by column in
+NumPy arrays. Lookups by guid and order date span filters work on whole columns
+at a time, instead of looping over the pydantic models.
+
+    catalog = get_project_catalog()
+    catalog.update("project", projects)
+    owners = catalog.lookup(frame["project"], "owner", default="CACHE_MISS")
+    in_span = catalog.frame(catalog.ordered_in(span, group="project"))
+"""
+
+import functools
+import time
+import typing
+
+import numpy as np
+import pandas as pd
+
+from src.logic.severa import projections
+from src.util.daterange import DateRange
+
+# Column name -> the value of a project in that column
+COLUMNS: dict[str, typing.Callable[[projections.Project], typing.Any]] = {
+    "guid": lambda p: p.guid,
+    "name": lambda p: p.name,
+    "owner": lambda p: p.projectOwner.guid,
+    "sales_person": lambda p: p.salesPerson.guid if p.salesPerson else None,
+    "business_unit": lambda p: p.businessUnit.guid if p.businessUnit else None,
+    "status": lambda p: p.salesStatus.salesStatusTypeGuid if p.salesStatus else None,
+    "is_closed": lambda p: bool(p.isClosed),
+    "is_internal": lambda p: bool(p.isInternal),
+    "probability": lambda p: p.probability if p.probability is not None else np.nan,
+    "expected_value": lambda p: (
+        p.expectedValue.amount
+        if p.expectedValue and p.expectedValue.amount is not None
+        else np.nan
+    ),
+    "order_date": lambda p: p.expectedOrderDate or np.datetime64("NaT", "D"),
+}
+
+DTYPES = {
+    "is_closed": bool,
+    "is_internal": bool,
+    "probability": float,
+    "expected_value": float,
+    "order_date": "datetime64[D]",
+}
+
+# Columns with an index of positions by value
+INDEXED = ("owner", "business_unit", "status")
+
+
+class ProjectCatalog:
+    """
+    Projects by group, e.g. "project" for the ordered projects and "salescase"
+    for the open sales cases. A project may be in several groups, and has one
+    row with a membership mask per group. Updating a group replaces its
+    projects: the rows of the unchanged projects (by 'lastUpdatedDateTime') are
+    reused, and the columns and indexes are rebuilt only if something changed.
+    """
+
+    def __init__(self) -> None:
+        self._projects: dict[str, projections.Project] = {}
+        self._rows: dict[str, tuple] = {}
+        self._groups: dict[str, set[str]] = {}
+        self._refreshed: dict[str, float] = {}
+
+        self._columns: dict[str, np.ndarray] = {}
+        self._guid_index = pd.Index([], dtype=object)
+        self._indexes: dict[str, dict[typing.Any, np.ndarray]] = {}
+        self._members: dict[str, np.ndarray] = {}
+        self._order = np.array([], dtype=int)
+
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._guid_index)
+
+    def __contains__(self, guid: str) -> bool:
+        return guid in self._projects
+
+    def age(self, group: str) -> float:
+        """
+        Seconds since the group was updated, infinite if never.
+        """
+        if group not in self._refreshed:
+            return float("inf")
+
+        return time.monotonic() - self._refreshed[group]
+
+    def update(self, group: str, projects: typing.Iterable[projections.Project]) -> int:
+        """
+        Replace the projects of `group`. Returns the number of added, changed and
+        removed projects.
+        """
+        old = self._groups.get(group, set())
+        new: set[str] = set()
+        changed = 0
+
+        for project in projects:
+            new.add(project.guid)
+            previous = self._projects.get(project.guid)
+
+            if (
+                previous is None
+                or project.lastUpdatedDateTime is None
+                or previous.lastUpdatedDateTime != project.lastUpdatedDateTime
+                or project.guid not in old
+            ):
+                self._projects[project.guid] = project
+                self._rows[project.guid] = tuple(
+                    get(project) for get in COLUMNS.values()
+                )
+                changed += 1
+
+        for guid in old - new:
+            if not any(
+                guid in guids for g, guids in self._groups.items() if g != group
+            ):
+                del self._projects[guid]
+                del self._rows[guid]
+
+            changed += 1
+
+        self._groups[group] = new
+        self._refreshed[group] = time.monotonic()
+
+        if changed:
+            self._build()
+
+        return changed
+
+    def _build(self) -> None:
+        values = list(zip(*self._rows.values(), strict=True)) or [()] * len(COLUMNS)
+
+        self._columns = {
+            name: np.array(column, dtype=DTYPES.get(name, object))
+            for name, column in zip(COLUMNS, values, strict=True)
+        }
+        self._guid_index = pd.Index(self._columns["guid"], dtype=object)
+        self._members = {
+            group: self._guid_index.isin(list(guids))
+            for group, guids in self._groups.items()
+        }
+
+        self._indexes = {
+            name: {
+                value: np.asarray(positions)
+                for value, positions in pd.Series(self._columns[name])
+                .groupby(self._columns[name], dropna=True)
+                .indices.items()
+            }
+            for name in INDEXED
+        }
+
+        # Positions of the projects with an order date, sorted by the date
+        dates = self._columns["order_date"]
+        with_date = np.flatnonzero(~np.isnat(dates))
+        self._order = with_date[np.argsort(dates[with_date], kind="stable")]
+
+    def get(self, guid: str) -> projections.Project | None:
+        return self._projects.get(guid)
+
+    def projects(self, group: str) -> dict[str, projections.Project]:
+        return {guid: self._projects[guid] for guid in self._groups.get(group, ())}
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def members(self, group: str) -> np.ndarray:
+        """
+        Mask of the projects in `group`.
+        """
+        return self._members.get(group, np.zeros(len(self), dtype=bool))
+
+    def positions(self, name: str, value: typing.Any) -> np.ndarray:
+        """
+        Positions of the projects with `value` in the indexed column `name`.
+        """
+        return self._indexes[name].get(value, np.array([], dtype=int))
+
+    def lookup(
+        self, guids: typing.Iterable[str], name: str, default: typing.Any = None
+    ) -> np.ndarray:
+        """
+        Values of column `name` for each guid, or `default` for unknown guids.
+        """
+        positions = self._guid_index.get_indexer(pd.Index(list(guids), dtype=object))
+        column = self._columns[name]
+
+        if not len(column):
+            return np.full(len(positions), default, dtype=object)
+
+        return np.where(positions >= 0, column[positions], default)
+
+    def ordered_in(self, span: DateRange, group: str | None = None) -> np.ndarray:
+        """
+        Positions of the projects whose order date is in the span, by date.
+        """
+        if not span:
+            return np.array([], dtype=int)
+
+        dates = self._columns["order_date"][self._order]
+        start = np.searchsorted(dates, np.datetime64(span["startDate"]), "left")
+        end = np.searchsorted(dates, np.datetime64(span["endDate"]), "right")
+        positions = self._order[start:end]
+
+        if group is not None:
+            positions = positions[self.members(group)[positions]]
+
+        return positions
+
+    def frame(self, positions: np.ndarray | None = None) -> pd.DataFrame:
+        """
+        The catalog, or the rows at `positions`, as a DataFrame. The membership
+        of each group is in column 'in_<group>'.
+        """
+        columns = self._columns | {
+            f"in_{group}": members for group, members in self._members.items()
+        }
+
+        return pd.DataFrame(
+            {
+                name: column if positions is None else column[positions]
+                for name, column in columns.items()
+            }
+        )
+
+
+@functools.cache
+def get_project_catalog() -> ProjectCatalog:
+    """
+    The project catalog shared by the clients of the process.
+    """
+    return ProjectCatalog()
@@ -1,23 +1,49 @@
-import time
+import asyncio
+import functools
 import typing
 from enum import Enum
 from types import TracebackType
 
 import anyio
 import arrow
+import httpx
+import numpy as np
 import pandas as pd
 from loguru import logger
-from workalendar.europe import Finland
 
-from src.logic.severa import models
+from src.logic.severa import projections
+from src.logic.severa.base_client import CircuitOpenError, Transport
 from src.logic.severa.base_client import Client as BaseClient
+from src.logic.severa.catalog import ProjectCatalog, get_project_catalog
+from src.logic.severa.dimensions import get_dimension_store
+from src.logic.severa.frames import FrameBuilder
+from src.logic.severa.month_cache import get_month_cache
+from src.logic.severa.project_cache import get_project_cache
+from src.logic.severa.projections import parse, parse_all
+from src.logic.severa.sales_cache import CachedSales, get_sales_cache
 from src.util.daterange import DateRange
 from src.util.stable_hash import get_hash
+from src.util.unravel import utc_days
+from src.util.workdays import get_workday_calendar
 
 T = typing.TypeVar("T", bound="Client")
+K = typing.TypeVar("K")
+V = typing.TypeVar("V")
 
 SALES_CACHE_REFRESH_AFTER_SECONDS = 60 * 60  # Save sales for 1h
 PROJECTS_CACHE_REFRESH_AFTER_SECONDS = 60 * 60  # Save projects for 1h
+MONTH_FETCH_ATTEMPTS = 2
+
+# Short names of the business units that the KPIs and the UI group by
+BUSINESSUNIT_SHORTNAMES = {
+    "f6d9f1e8-afae-1a74-5bbd-54d840a3e40e": "TIE",
+    "2a82464c-50b8-0df1-1cfc-51f5ae1bf667": "BAD",
+    "12f817a4-1f54-8c34-9489-0ab1d58ccf48": "HAL",
+    "1a361efe-8738-1ecf-0c16-e2bf91e21e3e": "JOH",
+    "341f92f5-cc81-d933-dbf4-fc80849815ea": "LAH",
+    "4260f308-7383-841a-8b5f-a40976bc22ca": "SOV",
+    "6b49ead7-573f-f186-c508-1e8606b5e59a": "VIS",
+}
 
 
 class SalesStatus(Enum):
@@ -27,28 +53,188 @@ class SalesStatus(Enum):
     HYLATTY = "baaa8b0a-b77a-b10a-8372-7760a4b99d77"
 
 
-async def gather(f_args_list: typing.Iterable) -> list:
+async def gather(f_args_list: typing.Iterable | typing.AsyncIterable) -> list:
+    """
+    Run f(*args) concurrently for each (f, *args) and return the results. With an
+    async iterable, tasks are started as soon as their arguments arrive.
+    """
+
     async def save_result(result: list, f: typing.Callable, *args) -> None:
         result.append(await f(*args))
 
     results: list = []
     async with anyio.create_task_group() as tg:
-        for f, *args in f_args_list:
-            tg.start_soon(save_result, results, f, *args)
+        if isinstance(f_args_list, typing.AsyncIterable):
+            async for f, *args in f_args_list:
+                tg.start_soon(save_result, results, f, *args)
+        else:
+            for f, *args in f_args_list:
+                tg.start_soon(save_result, results, f, *args)
 
     return results
 
 
-class Client:
-    def __init__(self: T):
-        self._client = BaseClient()
-        self._users: dict[str, models.UserOutputModel] = {}
+class BatchLoader(typing.Generic[K, V]):
+    """
+    DataLoader-style batching: the keys requested with load() during one event
+    loop tick are collected and fetched with one call of `batch_fn`, which
+    returns the values by key. Keys missing from the result get `default`.
+    """
+
+    def __init__(
+        self,
+        batch_fn: typing.Callable[[list[K]], typing.Awaitable[dict[K, V]]],
+        default: V,
+        max_batch_size: int = 100,
+    ):
+        self._batch_fn = batch_fn
+        self._default = default
+        self._max_batch_size = max_batch_size
+        self._pending: dict[K, asyncio.Future[V]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, key: K) -> V:
+        if (future := self._pending.get(key)) is None:
+            loop = asyncio.get_running_loop()
+
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+
+            future = self._pending[key] = loop.create_future()
+
+        return await asyncio.shield(future)
 
-        self._sales_cache: pd.DataFrame | None = None
-        self._projects_cache: pd.DataFrame | None = None
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
 
-        self._sales_cache_refresh_time = 0.0
-        self._projects_cache_refresh_time = 0.0
+        for i in range(0, len(keys), self._max_batch_size):
+            batch = {key: pending[key] for key in keys[i : i + self._max_batch_size]}
+
+            task = asyncio.create_task(self._load_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, batch: dict[K, asyncio.Future[V]]) -> None:
+        try:
+            values = await self._batch_fn(list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+                    # Retrieved by the waiters, if any are left
+                    future.exception()
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(values.get(key, self._default))
+
+    @staticmethod
+    def per_key(
+        fetch: typing.Callable[[K], typing.Awaitable[V]], max_concurrency: int = 8
+    ) -> typing.Callable[[list[K]], typing.Awaitable[dict[K, V]]]:
+        """
+        Batch function for resources without a collection endpoint: fetch each
+        key separately, at most `max_concurrency` at a time.
+        """
+        limiter = anyio.CapacityLimiter(max_concurrency)
+
+        async def batch_fn(keys: list[K]) -> dict[K, V]:
+            values: dict[K, V] = {}
+
+            async def fetch_one(key: K) -> None:
+                async with limiter:
+                    values[key] = await fetch(key)
+
+            async with anyio.create_task_group() as tg:
+                for key in keys:
+                    tg.start_soon(fetch_one, key)
+
+            return values
+
+        return batch_fn
+
+
+def sliced_by_month(
+    fetch: typing.Callable[[T, DateRange], typing.Awaitable[pd.DataFrame]],
+) -> typing.Callable[[T, DateRange], typing.Awaitable[pd.DataFrame]]:
+    """
+    Decorate a `fetch(self, span)` method to fetch the months of the span
+    concurrently with Client.fetch_by_month().
+    """
+
+    @functools.wraps(fetch)
+    async def fetch_months(self: T, span: DateRange) -> pd.DataFrame:
+        return await self.fetch_by_month(
+            fetch.__name__, functools.partial(fetch, self), span
+        )
+
+    return fetch_months
+
+
+def drop_duplicate_guids(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drop the rows with an 'internal_guid' seen already, e.g. allocations that
+    overlap more than one month.
+    """
+    if "internal_guid" not in frame:
+        return frame
+
+    guids = frame["internal_guid"]
+    return frame[guids.isna() | ~guids.duplicated()].reset_index(drop=True)
+
+
+def workhours_frame(workhours_json: list[dict]) -> pd.DataFrame:
+    return (
+        FrameBuilder(
+            {
+                "user": ("user.guid", "string"),
+                "value": ("quantity", "float"),
+                "date": ("eventDate", "datetime"),
+                "project": ("project.guid", "string"),
+                "phase": ("phase.guid", "string"),
+                "productive": ("isProductive", "bool"),
+                "internal_guid": ("guid", "string"),
+            },
+            constants={"id": "workhours"},
+            model=projections.WorkHour,
+        )
+        .extend(workhours_json)
+        .build()
+    )
+
+
+def allocations_frame(allocations_json: list[dict]) -> pd.DataFrame:
+    frame = (
+        FrameBuilder(
+            {
+                "internal_guid": ("guid", "string"),
+                "productive": ("project.isInternal", "bool"),
+                "value": ("calculatedAllocationHours", "float"),
+                "user": ("user.guid", "string"),
+                "project": ("project.guid", "string"),
+                "phase": ("phase.guid", "string"),
+                "start_date": ("derivedStartDate", "datetime"),
+                "end_date": ("derivedEndDate", "datetime"),
+            },
+            constants={"id": "workhours"},
+            model=projections.ResourceAllocation,
+        )
+        .extend(allocations_json)
+        .build()
+    )
+    frame["productive"] = ~frame["productive"]
+
+    return frame
+
+
+class Client:
+    def __init__(self: T, transport: Transport | None = None):
+        self._client = BaseClient(transport)
+        self._users: dict[str, projections.User] = {}
+        self._loaders: dict[tuple, BatchLoader] = {}
+
+        self._sales: CachedSales | None = None
 
         # Aliases
         self.fetch_forecasted_absences = self.fetch_absences
@@ -66,20 +252,99 @@ class Client:
     ) -> None:
         await self._client.__aexit__(exc_type, exc_value, traceback)
 
-    async def users(self) -> list[models.UserOutputModel]:
+    def _loader(
+        self,
+        name: str,
+        batch_fn: typing.Callable[[list[str]], typing.Awaitable[dict[str, list]]],
+        *params: typing.Any,
+    ) -> BatchLoader[str, list]:
+        """
+        The batch loader for the sub-resource `name` with `params`, e.g. the
+        phases by project guid.
+        """
+        if (loader := self._loaders.get((name, *params))) is None:
+            loader = self._loaders[(name, *params)] = BatchLoader(batch_fn, [])
+
+        return loader
+
+    async def fetch_by_month(
+        self,
+        name: str,
+        fetch: typing.Callable[[DateRange], typing.Awaitable[pd.DataFrame]],
+        span: DateRange,
+    ) -> pd.DataFrame:
+        """
+        Fetch each month of the span concurrently and merge the results. Months
+        are retried separately, and cached by (`name`, business units, month) in
+        the process-wide month cache, so that the other requests and a retry of a
+        failed fetch only fetch the months they don't have.
+        """
+        months = span.months()
+
+        if len(months) <= 1:
+            return await fetch(span)
+
+        cache = get_month_cache()
+
+        async def fetch_month(month: DateRange) -> pd.DataFrame:
+            key = (
+                name,
+                tuple(self.businessunits),
+                month["startDate"],
+                month["endDate"],
+            )
+
+            if (frame := cache.get(key)) is not None:
+                return frame
+
+            for attempt in range(1, MONTH_FETCH_ATTEMPTS + 1):
+                try:
+                    frame = await fetch(month)
+                except CircuitOpenError:
+                    raise
+                except httpx.RequestError as exc:
+                    if attempt == MONTH_FETCH_ATTEMPTS:
+                        raise
+
+                    logger.warning(f"{name} failed for {month} with {exc!r}, retrying.")
+                else:
+                    break
+
+            cache.put(key, month, frame)
+            return frame
+
+        frames = await gather((fetch_month, month) for month in months)
+
+        return drop_duplicate_guids(pd.concat(frames, ignore_index=True))
+
+    async def users(self) -> list[projections.User]:
+        """
+        The active users of the business units of this client.
+        """
         if not self._users:
             self._users = {
-                user_json["guid"]: models.UserOutputModel(**user_json)
-                for user_json in await self._client.get_all(
-                    "users",
-                    businessUnitGuids=self.businessunits,
-                    isActive=True,
+                user.guid: user
+                for user in parse_all(
+                    projections.User,
+                    (
+                        user_json
+                        for user_json in await get_dimension_store().users(self._client)
+                        if user_json.get("isActive", True)
+                        and (user_json.get("businessUnit") or {}).get("guid")
+                        in self.businessunits
+                    ),
                 )
             }
 
         return list(self._users.values())
 
     async def fetch_all_users(self) -> pd.DataFrame:
+        store = get_dimension_store()
+        businessunit_names = {
+            unit["guid"]: unit["name"]
+            for unit in await store.businessunits(self._client)
+        }
+
         return pd.DataFrame(
             [
                 {
@@ -87,23 +352,27 @@ class Client:
                     "first_name": user_json["firstName"],
                     "last_name": user_json["lastName"],
                     "business_unit": user_json["businessUnit"]["guid"],
-                    "business_unit_name": user_json["businessUnit"]["name"],
+                    "business_unit_name": businessunit_names.get(
+                        user_json["businessUnit"]["guid"],
+                        user_json["businessUnit"]["name"],
+                    ),
                 }
-                for user_json in await self._client.get_all(
-                    "users",
-                    isActive=True,
-                )
+                for user_json in await store.users(self._client)
+                if user_json.get("isActive", True)
             ]
         )
 
-    async def user_by_guid(self, user_guid: str) -> models.UserOutputModel:
+    async def user_by_guid(self, user_guid: str) -> projections.User:
         if not self._users:
             await self.users()
 
         return self._users[user_guid]
 
-    async def project_by_guid(self, project_guid: str) -> models.ProjectOutputModel:
-        return (await self.fetch_projects_with_cache())[project_guid]
+    async def project_by_guid(self, project_guid: str) -> projections.Project:
+        if (project := (await self.project_catalog()).get(project_guid)) is None:
+            raise KeyError(project_guid)
+
+        return project
 
     @property
     def businessunits(self) -> list[str]:
@@ -113,16 +382,20 @@ class Client:
             "2a82464c-50b8-0df1-1cfc-51f5ae1bf667",
         ]
 
-    def businessunit_to_shortname(self, businessunit_guid: str) -> str:
-        return {
-            "f6d9f1e8-afae-1a74-5bbd-54d840a3e40e": "TIE",
-            "2a82464c-50b8-0df1-1cfc-51f5ae1bf667": "BAD",
-            "12f817a4-1f54-8c34-9489-0ab1d58ccf48": "HAL",
-            "1a361efe-8738-1ecf-0c16-e2bf91e21e3e": "JOH",
-            "341f92f5-cc81-d933-dbf4-fc80849815ea": "LAH",
-            "4260f308-7383-841a-8b5f-a40976bc22ca": "SOV",
-            "6b49ead7-573f-f186-c508-1e8606b5e59a": "VIS",
-        }.get(businessunit_guid, "MUU")
+    async def businessunit_to_shortname(self, businessunit_guid: str) -> str:
+        """
+        The short name from BUSINESSUNIT_SHORTNAMES. Other business units go by
+        their code in Severa, or "MUU" if they have none.
+        """
+        if (name := BUSINESSUNIT_SHORTNAMES.get(businessunit_guid)) is not None:
+            return name
+
+        codes = {
+            unit["guid"]: unit.get("code")
+            for unit in await get_dimension_store().businessunits(self._client)
+        }
+
+        return codes.get(businessunit_guid) or "MUU"
 
     #############################
     # Fetching user information #
@@ -130,8 +403,8 @@ class Client:
 
     def combine_single_user_information(
         self,
-        user: models.UserOutputModel,
-        work_contract: models.WorkContractOutputModel,
+        user: projections.User,
+        work_contract: projections.WorkContract,
     ):
         info = {
             "user": user.guid,
@@ -169,15 +442,19 @@ class Client:
             },
         ]
 
-    async def fetch_single_user_information(self, user: models.UserOutputModel):
-        work_contracts_json = await self._client.get_all(
-            f"users/{user.guid}/workcontracts"
-        )
+    async def fetch_single_user_information(self, user: projections.User):
+        async def fetch_work_contracts(user_guid: str) -> list:
+            return await get_dimension_store().work_contracts(self._client, user_guid)
+
+        # No collection endpoint for work contracts
+        work_contracts_json = await self._loader(
+            "workcontracts", BatchLoader.per_key(fetch_work_contracts)
+        ).load(user.guid)
 
         return sum(
             [
                 self.combine_single_user_information(
-                    user, models.WorkContractOutputModel(**work_contract_json)
+                    user, parse(projections.WorkContract, work_contract_json)
                 )
                 for work_contract_json in work_contracts_json
             ],
@@ -190,7 +467,7 @@ class Client:
         work hour costs etc.
         """
         # all_users = [
-        #     models.UserOutputModel(**user_json)
+        #     parse(projections.User, user_json)
         #     for user_json in await self._client.get_all(
         #         "users",
         #         isActive=True,
@@ -230,22 +507,25 @@ class Client:
             ]
         ).convert_dtypes()
 
-    async def fetch_absences(self, span: DateRange) -> pd.DataFrame:
-        start = span.start.format("YYYY-MM-DDTHH:mm:ssZZ")
-        end = span.end.format("YYYY-MM-DDTHH:mm:ssZZ")
+    async def _absences_json(
+        self, user_guids: list[str], span: DateRange
+    ) -> list[dict]:
+        return await self._client.get_all(
+            "activities",
+            {
+                "activityCategories": "Absences",
+                "startDateTime": span.start.format("YYYY-MM-DDTHH:mm:ssZZ"),
+                "endDateTime": span.end.format("YYYY-MM-DDTHH:mm:ssZZ"),
+                "userGuids": user_guids,
+            },
+        )
 
-        absences = [
-            models.ActivityModel(**json)
-            for json in await self._client.get_all(
-                "activities",
-                {
-                    "activityCategories": "Absences",
-                    "startDateTime": start,
-                    "endDateTime": end,
-                    "userGuids": [user.guid for user in await self.users()],
-                },
-            )
-        ]
+    @sliced_by_month
+    async def fetch_absences(self, span: DateRange) -> pd.DataFrame:
+        absences = parse_all(
+            projections.Activity,
+            await self._absences_json([user.guid for user in await self.users()], span),
+        )
 
         if not absences:
             return pd.DataFrame(
@@ -285,107 +565,57 @@ class Client:
             ]
         )
 
-        async def daily_hours_by_user_guid(guid: str) -> float:
-            return (await self.user_by_guid(guid)).workContract.dailyHours
-
         if not result.empty:
-            cal = Finland()
+            calendar = get_workday_calendar()
+            all_day = result.loc[result["is_all_day"], :]
+
+            daily_hours = {
+                guid: (await self.user_by_guid(guid)).workContract.dailyHours
+                for guid in all_day["user"].unique()
+            }
+            workdays = np.where(
+                all_day["date"].notna(),
+                calendar.is_working_day(utc_days(all_day["date"])),
+                calendar.count(
+                    utc_days(all_day["start_date"]), utc_days(all_day["end_date"])
+                ),
+            )
 
             # "AllDay" absences result in 24h durations, fix them after the fact
-            result.loc[result["is_all_day"], "value"] = [
-                (await daily_hours_by_user_guid(row["user"]))
-                * (
-                    cal.is_working_day(row["date"])
-                    if not pd.isna(row["date"])
-                    else cal.get_working_days_delta(
-                        row["start_date"].date(),
-                        row["end_date"].date(),
-                        include_start=True,
-                    )
-                )
-                for index, row in result.loc[result["is_all_day"], :].iterrows()
-            ]
+            result.loc[result["is_all_day"], "value"] = (
+                all_day["user"].map(daily_hours).to_numpy() * workdays
+            )
 
             # Discard holidays, weekends etc
             result = result[result.value > 0]
 
         return result.drop("is_all_day", axis=1).convert_dtypes()
 
-    async def fetch_realized_user_workhours(
-        self, user: models.UserOutputModel, span: DateRange
-    ) -> pd.DataFrame:
-        workhours_json = await self._client.get_all(
-            f"users/{user.guid}/workhours",
-            **span,
-        )
-
-        hours = (models.WorkHourOutputModel(**json) for json in workhours_json)
-
-        return pd.DataFrame(
-            [
-                {
-                    "user": user.guid,
-                    "value": hour.quantity,
-                    "date": pd.Timestamp(hour.eventDate, tz="utc"),
-                    "project": hour.project.guid,
-                    "phase": hour.phase.guid,
-                    "productive": hour.isProductive,
-                    "internal_guid": hour.guid,
-                    "id": "workhours",
-                }
-                for hour in hours
-            ]
-        )
+    async def _workhours_json(
+        self, user_guids: list[str], span: DateRange
+    ) -> list[dict]:
+        return await self._client.get_all("workhours", userGuids=user_guids, **span)
 
+    @sliced_by_month
     async def fetch_realized_workhours(self, span: DateRange) -> pd.DataFrame:
-        return pd.concat(
-            await gather(
-                [
-                    (self.fetch_realized_user_workhours, user, span)
-                    for user in await self.users()
-                ],
-            ),
-            ignore_index=True,
-        ).convert_dtypes()
+        user_guids = [user.guid for user in await self.users()]
 
-    async def fetch_forecasted_user_workhours(
-        self, user: models.UserOutputModel, span: DateRange
-    ) -> pd.DataFrame:
-        allocations = [
-            models.ResourceAllocationOutputModel(**allocation_json)
-            for allocation_json in await self._client.get_all(
-                f"users/{user.guid}/resourceallocations/allocations",
-                **span,  # type: ignore
-            )
-        ]
+        return workhours_frame(await self._workhours_json(user_guids, span))
 
-        return pd.DataFrame(
-            [
-                {
-                    "internal_guid": alloc.guid,
-                    "productive": not alloc.project.isInternal,
-                    "value": alloc.calculatedAllocationHours,
-                    "user": user.guid,
-                    "project": alloc.project.guid,
-                    "phase": alloc.phase.guid,
-                    "start_date": arrow.get(alloc.derivedStartDate).datetime,
-                    "end_date": arrow.get(alloc.derivedEndDate).datetime,
-                    "id": "workhours",
-                }
-                for alloc in allocations
-            ]
+    async def _allocations_json(
+        self, user_guids: list[str], span: DateRange
+    ) -> list[dict]:
+        return await self._client.get_all(
+            "resourceallocations/allocations",
+            userGuids=user_guids,
+            **span,  # type: ignore
         )
 
+    @sliced_by_month
     async def fetch_forecasted_workhours(self, span: DateRange) -> pd.DataFrame:
-        return pd.concat(
-            await gather(
-                [
-                    (self.fetch_forecasted_user_workhours, user, span)
-                    for user in await self.users()
-                ],
-            ),
-            ignore_index=True,
-        ).convert_dtypes()
+        user_guids = [user.guid for user in await self.users()]
+
+        return allocations_frame(await self._allocations_json(user_guids, span))
 
     async def fetch_forecasted_saleshours(
         self, span: DateRange  # noqa: ARG002
@@ -446,18 +676,33 @@ class Client:
         self, force_refresh=False, filtered_keywords: list[str] | None = None
     ) -> pd.DataFrame:
         """
-        Return future sales values (€) and work (hours).
+        Return future sales values (€) and work (hours). The result is shared by
+        all the clients: a stale result is returned immediately and refreshed in
+        the background. With `force_refresh`, wait for a new result instead.
         """
-        if (
-            not force_refresh
-            and self._sales_cache is not None
-            and (
-                time.monotonic() - self._sales_cache_refresh_time
-                < SALES_CACHE_REFRESH_AFTER_SECONDS
-            )
-        ):
-            return self._sales_cache
+        cache = get_sales_cache()
+        key = tuple(sorted(filtered_keywords or []))
+
+        async def fetch() -> tuple[pd.DataFrame, dict[str, list]]:
+            return await self._fetch_sales_result(filtered_keywords)
+
+        async def fetch_with_new_client() -> tuple[pd.DataFrame, dict[str, list]]:
+            # The background refresh may outlive this client
+            async with type(self)() as client:
+                return await client._fetch_sales_result(filtered_keywords)
+
+        self._sales = cache.peek(key)
 
+        if force_refresh or self._sales is None:
+            self._sales = await cache.refresh(key, fetch)
+        elif self._sales.age >= SALES_CACHE_REFRESH_AFTER_SECONDS:
+            cache.revalidate(key, fetch_with_new_client)
+
+        return self._sales.sales
+
+    async def _fetch_sales_result(
+        self, filtered_keywords: list[str] | None = None
+    ) -> tuple[pd.DataFrame, dict[str, list]]:
         self._invalid_sales: dict[str, list] = {
             "Arvioitu tilauspäivä puuttuu": [],
             "Myynnin arvo puuttuu": [],
@@ -470,15 +715,14 @@ class Client:
             "Arvioitu tilauspäivä on menneisyydessä": [],
         }
 
-        self._sales_cache = await self.force_fetch_all_sales(filtered_keywords)
-        self._sales_cache_refresh_time = time.monotonic()
-
-        return self._sales_cache
+        return await self.force_fetch_all_sales(filtered_keywords), self._invalid_sales
 
     async def force_fetch_all_sales(
         self, filtered_keywords: list[str] | None = None
     ) -> pd.DataFrame:
-        sales = await self._client.get_all(
+        # Phases of each sales case are fetched as soon as the case is streamed
+        # in, rather than after all the sales case pages have been downloaded.
+        sales_json = self._client.stream(
             "salescases",
             {
                 "businessUnitGuids": self.businessunits,
@@ -489,29 +733,52 @@ class Client:
                 ],
             },
         )
+        sales: list[projections.Project] = []
 
-        sales_dataframes = await gather(
-            (
-                (
-                    self.fetch_single_sale,
-                    models.ProjectOutputModel(**sale),
-                    filtered_keywords,
-                )
-                for sale in sales
-            ),
-        )
+        async def fetch_each_sale():
+            async for sale_json in sales_json:
+                sales.append(sale := parse(projections.Project, sale_json))
+                yield self.fetch_single_sale, sale, filtered_keywords
 
-        return pd.concat(sales_dataframes, ignore_index=True).convert_dtypes()
+        sales_rows = await gather(fetch_each_sale())
+        get_project_catalog().update("salescase", sales)
+        await get_project_cache().save()
+
+        return (
+            FrameBuilder(
+                {
+                    name: (name, kind)
+                    for name, kind in (
+                        ("user", "string"),
+                        ("id", "string"),
+                        ("project", "string"),
+                        ("sold_by", "string"),
+                        ("date", "datetime"),
+                        ("value", "float"),
+                        ("internal_guid", "string"),
+                        ("start_date", "datetime"),
+                        ("end_date", "datetime"),
+                        ("phase", "string"),
+                        ("productive", "bool"),
+                    )
+                }
+            )
+            .extend(row for rows in sales_rows for row in rows)
+            .build()
+        )
 
     async def fetch_single_sale(
         self,
-        sale: models.ProjectOutputModel,
+        sale: projections.Project,
         filtered_keywords: list[str] | None = None,
-    ) -> pd.DataFrame:
+    ) -> list[dict]:
+        """
+        Rows of the expected value and the expected work of the sale.
+        """
         if filtered_keywords and sale.keywords:
             if any(kw in [x.name for x in sale.keywords] for kw in filtered_keywords):
                 logger.trace(f"Filtered {sale.name} out because of keywords.")
-                return pd.DataFrame()
+                return []
 
         can_calculate_value = True
 
@@ -584,12 +851,21 @@ class Client:
                 }
             )
 
-        phases = [
-            models.PhaseModelWithHierarchyInfo(**phase_json)
-            for phase_json in await self._client.get_all(
-                f"projects/{sale.guid}/phaseswithhierarchy"
+        async def fetch_phases(project_guid: str) -> list:
+            return await self._client.get_all(
+                f"projects/{project_guid}/phaseswithhierarchy"
             )
-        ]
+
+        cache = get_project_cache()
+
+        if (phases_json := await cache.get("phaseswithhierarchy", sale)) is None:
+            # No collection endpoint returns the phase hierarchy
+            phases_json = await self._loader(
+                "phaseswithhierarchy", BatchLoader.per_key(fetch_phases)
+            ).load(sale.guid)
+            cache.put("phaseswithhierarchy", sale, phases_json)
+
+        phases = parse_all(projections.Phase, phases_json)
 
         expected_workhours = []
 
@@ -615,8 +891,8 @@ class Client:
                         {
                             "value": phase.workHoursEstimate * sale.probability / 100.0,
                             "user": sale.projectOwner.guid,
-                            "start_date": arrow.get(phase.startDate).datetime,
-                            "end_date": arrow.get(phase.deadline).datetime,
+                            "start_date": phase.startDate,
+                            "end_date": phase.deadline,
                             "project": phase.project.guid,
                             "phase": phase.guid,
                             "sold_by": sale.salesPerson.guid,
@@ -662,41 +938,31 @@ class Client:
                 }
             )
 
-        expected_value_df = pd.DataFrame(
-            {
-                "user": pd.Series(dtype=str),
-                "id": pd.Series(dtype=str),
-                "project": pd.Series(dtype=str),
-                "date": pd.Series(dtype="datetime64[ns, utc]"),
-                "value": pd.Series(dtype=float),
-                "internal_guid": pd.Series(dtype=str),
-            }
-        )
+        expected_value = []
 
         if can_calculate_value:
-            expected_value_df = pd.DataFrame(
-                [
-                    {
-                        "user": sale.projectOwner.guid,
-                        "id": "salesvalue",
-                        "project": sale.guid,
-                        "sold_by": sale.salesPerson.guid,
-                        "date": pd.Timestamp(sale.expectedOrderDate, tz="utc"),
-                        "value": sale.expectedValue.amount * sale.probability / 100.0,
-                        "internal_guid": sale.guid,
-                    }
-                ]
+            expected_value.append(
+                {
+                    "user": sale.projectOwner.guid,
+                    "id": "salesvalue",
+                    "project": sale.guid,
+                    "sold_by": sale.salesPerson.guid,
+                    "date": sale.expectedOrderDate,
+                    "value": sale.expectedValue.amount * sale.probability / 100.0,
+                    "internal_guid": sale.guid,
+                }
             )
 
-        expected_work_df = pd.DataFrame(expected_workhours)
-
-        return pd.concat(
-            [expected_value_df, expected_work_df], ignore_index=True
-        ).convert_dtypes()
+        return expected_value + expected_workhours
 
     def get_invalid_sales(self) -> pd.DataFrame:
+        """
+        Invalid sales found by the latest fetch_sales() of this client.
+        """
+        invalid_sales = self._sales.invalid_sales if self._sales is not None else {}
+
         result = pd.DataFrame(
-            [{**v, "id": k} for k, lst in self._invalid_sales.items() for v in lst]
+            [{**v, "id": k} for k, lst in invalid_sales.items() for v in lst]
         )
 
         id_col = result.apply(
@@ -732,7 +998,7 @@ class Client:
                 }
             )
 
-        projects_mapping = await self.fetch_projects_with_cache()
+        catalog = await self.project_catalog()
 
         span_past, span_future = span.cut(arrow.utcnow())
 
@@ -746,11 +1012,7 @@ class Client:
 
         result = pd.concat(await gather(awaitables), ignore_index=True)
 
-        result["user"] = result["project"].apply(
-            lambda x: projects_mapping[x].projectOwner.guid
-            if x in projects_mapping
-            else "CACHE_MISS"
-        )
+        result["user"] = catalog.lookup(result["project"], "owner", "CACHE_MISS")
         result["forecast_date"] = arrow.utcnow().floor("day").datetime
         result["_id"] = result.apply(
             lambda x: get_hash(
@@ -761,48 +1023,37 @@ class Client:
 
         return result.convert_dtypes()
 
+    def _invoices_json(self, span: DateRange) -> typing.AsyncIterator[dict]:
+        return self._client.stream(
+            "invoices",
+            {**span, "projectBusinessUnitGuids": self.businessunits},
+        )
+
+    @sliced_by_month
     async def fetch_realized_billing(self, span: DateRange) -> pd.DataFrame:
-        all_invoices = [
-            models.InvoiceOutputModel(**invoice_json)
-            for invoice_json in await self._client.get_all(
-                "invoices",
-                {**span, "projectBusinessUnitGuids": self.businessunits},
-            )
-        ]
+        builder = FrameBuilder(
+            {
+                "value": ("totalExcludingTax.amount", "float"),
+                "project": ("projects.0.guid", "string"),
+                "internal_guid": ("guid", "string"),
+                "date": ("date", "datetime"),
+                "status": ("status.guid", "string"),
+            },
+            constants={"id": "billing"},
+            model=projections.Invoice,
+        )
+        async for invoice_json in self._invoices_json(span):
+            builder.extend([invoice_json])
 
-        if not all_invoices:
+        if not builder:
             logger.warning(f"no invoices for span {span}")
-            return pd.DataFrame(
-                {
-                    "id": pd.Series(dtype=str),
-                    "internal_guid": pd.Series(dtype=str),
-                    "date": pd.Series(dtype="datetime64[ns, UTC]"),
-                    "project": pd.Series(dtype=str),
-                    "value": pd.Series(dtype=float),
-                    "status": pd.Series(dtype=str),
-                }
-            )
 
-        billing_df = pd.DataFrame(
-            [
-                {
-                    "value": invoice.totalExcludingTax.amount,
-                    "project": invoice.projects[0].guid,
-                    "internal_guid": invoice.guid,
-                    "date": pd.Timestamp(invoice.date, tz="utc"),
-                    "status": invoice.status.guid,
-                    "id": "billing",
-                }
-                for invoice in all_invoices
-            ]
-        )
-
-        return billing_df.convert_dtypes()
+        return builder.build()
 
     async def fetch_forecasted_billing(self, span: DateRange) -> pd.DataFrame:
         all_projects = (await self.fetch_projects_with_cache()).values()
 
-        forecasts: list[models.ProjectForecastOutputModel] = sum(
+        forecasts_json: list[dict] = sum(
             await gather(
                 (self.fetch_project_forecasts, project, span)
                 for project in all_projects
@@ -810,59 +1061,65 @@ class Client:
             ),
             start=[],
         )
+        await get_project_cache().save()
 
-        result = pd.DataFrame(
-            [
+        result = (
+            FrameBuilder(
                 {
-                    "id": "billing",
-                    "internal_guid": forecast.guid,
-                    "start_date": pd.Timestamp(
-                        arrow.get(forecast.year, forecast.month, 1)
-                        .floor("month")
-                        .datetime
-                    ),
-                    "end_date": pd.Timestamp(
-                        arrow.get(forecast.year, forecast.month, 1)
-                        .ceil("month")
-                        .datetime
-                    ),
-                    "project": forecast.project.guid,
-                    "value": forecast.billingForecast.amount
-                    if forecast.billingForecast is not None
-                    else 0.0,
-                    "billing": forecast.billingForecast.amount
-                    if forecast.billingForecast is not None
-                    else 0.0,
-                    "expense": forecast.expenseForecast.amount
-                    if forecast.expenseForecast is not None
-                    else 0.0,
-                    "revenue": forecast.revenueForecast.amount
-                    if forecast.revenueForecast is not None
-                    else 0.0,
-                    "labor_expense": forecast.laborExpenseForecast.amount
-                    if forecast.laborExpenseForecast is not None
-                    else 0.0,
-                }
-                for forecast in forecasts
-            ]
+                    "internal_guid": ("guid", "string"),
+                    "year": ("year", "float"),
+                    "month": ("month", "float"),
+                    "project": ("project.guid", "string"),
+                    "billing": ("billingForecast.amount", "float"),
+                    "expense": ("expenseForecast.amount", "float"),
+                    "revenue": ("revenueForecast.amount", "float"),
+                    "labor_expense": ("laborExpenseForecast.amount", "float"),
+                },
+                constants={"id": "billing"},
+                model=projections.ProjectForecast,
+            )
+            .extend(forecasts_json)
+            .build()
         )
 
-        forecast_sum = result[["billing", "expense", "revenue", "labor_expense"]].sum(
-            axis=1
+        amounts = ["billing", "expense", "revenue", "labor_expense"]
+        result[amounts] = result[amounts].fillna(0.0)
+        result["value"] = result["billing"]
+
+        start_date = pd.to_datetime(
+            pd.DataFrame({"year": result["year"], "month": result["month"], "day": 1})
+        ).dt.tz_localize("utc")
+        result["start_date"] = start_date
+        result["end_date"] = (
+            start_date + pd.offsets.MonthBegin(1) - pd.Timedelta(microseconds=1)
         )
+        result = result.drop(columns=["year", "month"])
+
+        forecast_sum = result[amounts].sum(axis=1)
         return result[(forecast_sum < 0) | (forecast_sum > 0)]
 
     async def fetch_project_forecasts(
-        self, project: models.ProjectOutputModel, span: DateRange
-    ) -> typing.Iterable[models.ProjectForecastOutputModel]:
+        self, project: projections.Project, span: DateRange
+    ) -> list[dict]:
         """
-        Get all the forecasts in span for one project.
+        Get the JSON of all the forecasts in span for one project. All the
+        forecasts of the project are fetched and cached until the project
+        changes, and filtered by month here.
         """
-        return [
-            models.ProjectForecastOutputModel(**forecast_json)
-            for forecast_json in await self._client.get_all(
-                f"projects/{project.guid}/projectforecasts", {**span}
+        cache = get_project_cache()
+
+        if (forecasts_json := await cache.get("projectforecasts", project)) is None:
+            forecasts_json = await self._client.get_all(
+                f"projects/{project.guid}/projectforecasts"
             )
+            cache.put("projectforecasts", project, forecasts_json)
+
+        def in_span(forecast_json: dict) -> bool:
+            month = arrow.get(forecast_json["year"], forecast_json["month"], 1)
+            return month <= span.end and month.ceil("month") >= span.start
+
+        return [
+            forecast_json for forecast_json in forecasts_json if in_span(forecast_json)
         ]
 
     ###########################
@@ -879,24 +1136,20 @@ class Client:
         )
 
     async def fetch_realized_salesvalue(self, span: DateRange) -> pd.DataFrame:
-        result = pd.DataFrame(
-            [
-                {
-                    "value": project.expectedValue.amount,
-                    "project": project.guid,
-                    "date": pd.Timestamp(project.expectedOrderDate, tz="utc"),
-                    "user": project.projectOwner.guid,
-                    "internal_guid": project.guid,
-                    "sold_by": project.salesPerson.guid,
-                    "id": "salesvalue",
-                }
-                for project in (await self.fetch_projects_with_cache()).values()
-                if project.expectedOrderDate is not None
-                and span.contains(arrow.get(project.expectedOrderDate.isoformat()))
-            ]
-        )
+        catalog = await self.project_catalog()
+        projects = catalog.frame(catalog.ordered_in(span, group="project"))
 
-        return result.convert_dtypes()
+        return pd.DataFrame(
+            {
+                "value": projects["expected_value"],
+                "project": projects["guid"],
+                "date": pd.to_datetime(projects["order_date"]).dt.tz_localize("utc"),
+                "user": projects["owner"],
+                "internal_guid": projects["guid"],
+                "sold_by": projects["sales_person"],
+                "id": "salesvalue",
+            }
+        ).convert_dtypes()
 
     async def fetch_salesvalue(self, span: DateRange) -> pd.DataFrame:
         span_past, span_future = span.cut(arrow.utcnow())
@@ -920,27 +1173,30 @@ class Client:
 
         return result.convert_dtypes()
 
-    async def fetch_projects_with_cache(self) -> dict[str, models.ProjectOutputModel]:
-        if self._projects_cache is not None and (
-            time.monotonic() - self._projects_cache_refresh_time
-            < PROJECTS_CACHE_REFRESH_AFTER_SECONDS
-        ):
-            return self._projects_cache
+    async def project_catalog(self) -> ProjectCatalog:
+        """
+        The shared project catalog, with the ordered projects refreshed if they
+        are older than PROJECTS_CACHE_REFRESH_AFTER_SECONDS.
+        """
+        catalog = get_project_catalog()
 
-        projects_json = await self._client.get_all(
-            "projects",
-            {
-                "businessUnitGuids": self.businessunits,
-                "salesStatusTypeGuids": SalesStatus.TILAUS.value,
-            },
-        )
+        if catalog.age("project") >= PROJECTS_CACHE_REFRESH_AFTER_SECONDS:
+            projects_json = await self._client.get_all(
+                "projects",
+                {
+                    "businessUnitGuids": self.businessunits,
+                    "salesStatusTypeGuids": SalesStatus.TILAUS.value,
+                },
+            )
+            changed = catalog.update(
+                "project", parse_all(projections.Project, projects_json)
+            )
+            logger.debug(f"Project catalog refreshed, {changed} projects changed.")
 
-        self._projects_cache = {
-            project_json["guid"]: models.ProjectOutputModel(**project_json)
-            for project_json in projects_json
-        }
+        return catalog
 
-        return self._projects_cache
+    async def fetch_projects_with_cache(self) -> dict[str, projections.Project]:
+        return (await self.project_catalog()).projects("project")
 
     async def fetch_projects_and_sales(self) -> pd.DataFrame:
         projects_json = await self._client.get_all(
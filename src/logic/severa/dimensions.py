@@ -0,0 +1,157 @@
+"""
+Shared store of the slowly changing Severa dimensions: users, business units
+and the work contracts of each user. Entries are kept as raw JSON for a TTL,
+served stale while they are refreshed in the background, and persisted to Mongo
+so that a restart doesn't have to fetch them all again. The Mongo I/O is done in
+a thread, off the event loop.
+"""
+
+import asyncio
+import functools
+import time
+import typing
+
+from loguru import logger
+from pymongo.errors import PyMongoError
+
+from src.config import settings
+from src.database.database import CACHE_SERVER_SELECTION_TIMEOUT_MS, Base
+from src.logic.severa.base_client import Client as BaseClient
+
+# Refresh the entries older than this in the background
+MAX_AGE_SECONDS = 6 * 60 * 60
+
+Fetch = typing.Callable[[BaseClient], typing.Awaitable[list[dict]]]
+
+
+class DimensionStore:
+    """
+    JSON items by key, e.g. 'users' or 'workcontracts/<user guid>'. Entries are
+    loaded from and saved to a Mongo collection, or only kept in memory if the
+    collection is None or unreachable.
+    """
+
+    def __init__(self, base: str | None = None, collection: str = "dimensions"):
+        self._base = base
+        self._collection = collection
+        self._database: Base | None = None
+        self._loading: asyncio.Task | None = None
+
+        self._entries: dict[str, dict[str, typing.Any]] = {}
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    def _db(self) -> Base | None:
+        if self._base is None:
+            return None
+
+        if self._database is None:
+            self._database = Base(
+                self._base,
+                self._collection,
+                serverSelectionTimeoutMS=CACHE_SERVER_SELECTION_TIMEOUT_MS,
+            )
+
+        return self._database
+
+    def _read(self) -> None:
+        if (db := self._db()) is None:
+            return
+
+        try:
+            documents = db.find_documents()
+        except PyMongoError as exc:
+            logger.warning(f"Dimensions not loaded: {exc!r}")
+            self._base = None
+            return
+
+        self._entries = {doc["_id"]: doc for doc in documents}
+        logger.debug(f"Loaded {len(self._entries)} dimension entries.")
+
+    async def _load(self) -> None:
+        if self._loading is None:
+            self._loading = asyncio.create_task(asyncio.to_thread(self._read))
+
+        await asyncio.shield(self._loading)
+
+    def _save(self, entry: dict[str, typing.Any]) -> None:
+        if (db := self._db()) is None:
+            return
+
+        try:
+            db.replace_documents([entry])
+        except PyMongoError as exc:
+            logger.warning(f"Dimension '{entry['_id']}' not saved: {exc!r}")
+
+    async def _refresh(self, key: str, fetch: Fetch, client: BaseClient | None) -> dict:
+        if client is None:
+            # The background refresh may outlive the client that started it
+            async with BaseClient() as new_client:
+                items = await fetch(new_client)
+        else:
+            items = await fetch(client)
+
+        entry = self._entries[key] = {
+            "_id": key,
+            "fetched": time.time(),
+            "items": items,
+        }
+        await asyncio.to_thread(self._save, entry)
+
+        return entry
+
+    def _start(self, key: str, fetch: Fetch, client: BaseClient | None) -> asyncio.Task:
+        if (task := self._refreshing.get(key)) is not None:
+            return task
+
+        def done(task: asyncio.Task) -> None:
+            self._refreshing.pop(key, None)
+
+            if not task.cancelled() and (exc := task.exception()) is not None:
+                logger.error(f"Dimension '{key}' refresh failed: {exc!r}")
+
+        task = self._refreshing[key] = asyncio.create_task(
+            self._refresh(key, fetch, client)
+        )
+        task.add_done_callback(done)
+
+        return task
+
+    async def get(self, key: str, fetch: Fetch, client: BaseClient) -> list[dict]:
+        """
+        The items of `key`. Missing items are fetched with `client`, and stale
+        ones are returned as they are and refreshed in the background.
+        """
+        await self._load()
+
+        if (entry := self._entries.get(key)) is None:
+            entry = await asyncio.shield(self._start(key, fetch, client))
+        elif time.time() - entry["fetched"] > MAX_AGE_SECONDS:
+            self._start(key, fetch, None)
+
+        return entry["items"]
+
+    async def users(self, client: BaseClient) -> list[dict]:
+        """
+        All the users, including the inactive ones and other business units.
+        """
+        return await self.get("users", lambda c: c.get_all("users"), client)
+
+    async def businessunits(self, client: BaseClient) -> list[dict]:
+        return await self.get(
+            "businessunits", lambda c: c.get_all("businessunits"), client
+        )
+
+    async def work_contracts(self, client: BaseClient, user_guid: str) -> list[dict]:
+        return await self.get(
+            f"workcontracts/{user_guid}",
+            lambda c: c.get_all(f"users/{user_guid}/workcontracts"),
+            client,
+        )
+
+
+@functools.cache
+def get_dimension_store() -> DimensionStore:
+    """
+    The dimension store shared by the clients of the process.
+    """
+    return DimensionStore(settings.mongo_base)
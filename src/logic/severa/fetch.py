@@ -5,13 +5,16 @@ from types import TracebackType
 
 import anyio
 import arrow
+import numpy as np
 import pandas as pd
 from loguru import logger
-from workalendar.europe import Finland
 
 from src.logic.severa import models
 from src.logic.severa.base_client import Client
+from src.logic.severa.dimensions import get_dimension_store
 from src.util.daterange import DateRange
+from src.util.unravel import utc_days
+from src.util.workdays import get_workday_calendar
 
 T = typing.TypeVar("T", bound="Client")
 
@@ -62,11 +65,10 @@ class Fetcher:
 
         self._users = [
             models.UserOutputModel(**user_json)
-            for user_json in await self._client.get_all(
-                "users",
-                businessUnitGuids=list(self.businessunits.values()),
-                isActive=True,
-            )
+            for user_json in await get_dimension_store().users(self._client)
+            if user_json.get("isActive", True)
+            and (user_json.get("businessUnit") or {}).get("guid")
+            in self.businessunits.values()
         ]
         return self._users
 
@@ -238,14 +240,12 @@ class Fetcher:
         Takes into account 1. persons' workcontracts, 2. weekends and holiday,
         3. planned abcenses (vacations etc).
         """
-        cal = Finland()
         dates_in_span = pd.date_range(
             span.start.date(), span.end.date(), freq="D", tz="utc"
         )
-        workday_mask = (
-            pd.Series(dates_in_span, index=dates_in_span)
-            .apply(cal.is_working_day)
-            .apply(int)
+        workday_mask = pd.Series(
+            get_workday_calendar().is_working_day(utc_days(dates_in_span)).astype(int),
+            index=dates_in_span,
         )
 
         user_allocables = []
@@ -647,9 +647,9 @@ class Fetcher:
         if not result.empty:
             result.loc[result["isAllDay"], "value"] = user.workContract.dailyHours
 
-            cal = Finland()
-            working_days = result.date.map(cal.is_working_day)
-            result = result[working_days]
+            # By the date of the absence as it is, not in UTC
+            days = np.array([date.date() for date in result.date], "datetime64[D]")
+            result = result[get_workday_calendar().is_working_day(days)]
 
         return result
 
@@ -785,7 +785,7 @@ class Fetcher:
                     if json["guid"] not in self.businessunits_by_guid
                     else self.businessunits_by_guid[json["guid"]],
                 }
-                for json in await self._client.get_all("businessunits")
+                for json in await get_dimension_store().businessunits(self._client)
             ]
         )
 
@@ -798,7 +798,7 @@ class Fetcher:
                     if json["businessUnit"]["guid"] not in self.businessunits_by_guid
                     else self.businessunits_by_guid[json["businessUnit"]["guid"]],
                 }
-                for json in await self._client.get_all("users")
+                for json in await get_dimension_store().users(self._client)
             ]
         )
 
@@ -0,0 +1,120 @@
+"""
+Build DataFrames column by column from decoded Severa JSON. Values are extracted
+by declared field paths into one list per column, and each column is converted
+to its dtype once, instead of building a dict and Timestamps for every row.
+
+    builder = FrameBuilder(
+        {
+            "user": ("user.guid", "string"),
+            "value": ("quantity", "float"),
+            "date": ("eventDate", "datetime"),
+        },
+        constants={"id": "workhours"},
+    )
+    builder.extend(page)
+    frame = builder.build()
+"""
+
+import typing
+
+import pandas as pd
+
+from src.config import settings
+from src.logic.severa import projections
+
+Kind = typing.Literal["string", "float", "bool", "datetime", "object"]
+
+DTYPES: dict[str, str | None] = {
+    "string": "string",
+    "float": "Float64",
+    "bool": "boolean",
+    "object": None,
+}
+
+
+def _getter(path: str) -> typing.Callable[[dict], typing.Any]:
+    keys = path.split(".")
+
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda item: item.get(key)
+
+    def get(item: typing.Any) -> typing.Any:
+        for key in keys:
+            if item is None:
+                return None
+
+            if isinstance(item, list):
+                # Numeric path parts index lists, e.g. 'projects.0.guid'
+                item = item[int(key)] if int(key) < len(item) else None
+            else:
+                item = item.get(key)
+
+        return item
+
+    return get
+
+
+def _column(
+    values: list, kind: Kind
+) -> pd.api.extensions.ExtensionArray | pd.DatetimeIndex:
+    if kind == "datetime":
+        return pd.to_datetime(values, utc=True)
+
+    return pd.array(values, dtype=DTYPES[kind])
+
+
+class FrameBuilder:
+    """
+    Columns are declared as name -> (dotted JSON path, kind). `constants` are
+    added as columns with the same value in every row. With `model`, the items
+    are also validated against it in the SEVERA_VALIDATE_FULL_MODELS debug mode.
+    """
+
+    def __init__(
+        self,
+        columns: dict[str, tuple[str, Kind]],
+        constants: dict[str, typing.Any] | None = None,
+        model: type[projections.Slim] | None = None,
+    ):
+        self._kinds = {name: kind for name, (_, kind) in columns.items()}
+        self._getters = {name: _getter(path) for name, (path, _) in columns.items()}
+        self._values: dict[str, list] = {name: [] for name in columns}
+        self._constants = constants or {}
+        self._model = model
+
+    def __len__(self) -> int:
+        return len(next(iter(self._values.values()), []))
+
+    def extend(self, items: typing.Iterable[dict]) -> "FrameBuilder":
+        items = items if isinstance(items, list) else list(items)
+
+        if self._model is not None and settings.severa_validate_full_models:
+            projections.parse_all(self._model, items)
+
+        for name, get in self._getters.items():
+            self._values[name].extend(map(get, items))
+
+        return self
+
+    def build(self) -> pd.DataFrame:
+        length = len(self)
+
+        frame = pd.DataFrame(
+            {
+                name: _column(values, self._kinds[name])
+                for name, values in self._values.items()
+            }
+        )
+
+        for name, value in self._constants.items():
+            frame[name] = pd.array(
+                [value] * length,
+                dtype=(
+                    "string"
+                    if isinstance(value, str)
+                    else "boolean" if isinstance(value, bool) else None
+                ),
+            )
+
+        return frame
@@ -0,0 +1,299 @@
+"""
+Local Mongo mirror of Severa facts. Work hours, invoices and absences are synced
+incrementally with Severa's 'changedSince' filter, using a watermark per entity
+type. Realized data is then read from the mirror instead of the live API.
+
+Every synced document is stamped with the id of its sync, so that a full sync can
+drop the documents it didn't return without listing the ones it did.
+"""
+
+import asyncio
+import functools
+import time
+import typing
+import uuid
+
+import arrow
+from loguru import logger
+from pymongo.errors import PyMongoError
+
+from src.database.database import CACHE_SERVER_SELECTION_TIMEOUT_MS, Base
+from src.logic.severa.base_client import Transport
+from src.logic.severa.client import Client
+from src.logic.severa.month_cache import get_month_cache
+from src.util.daterange import DateRange
+
+MIRROR_BASE = "severa-mirror"
+
+# Rewind the watermark a bit so that changes racing a sync aren't missed
+SYNC_OVERLAP_SECONDS = 5 * 60
+# Read from Severa instead if the mirror hasn't been synced within this time
+MAX_STALENESS_SECONDS = 60 * 60
+# Synced documents are written in batches of this size as they are fetched
+SYNC_BATCH_SIZE = 1000
+
+
+class MirroredEntity(typing.NamedTuple):
+    endpoint: str
+    # Datetime fields added for querying: stored field -> JSON field
+    date_fields: dict[str, str]
+
+
+ENTITIES = {
+    "workhours": MirroredEntity("workhours", {"_date": "eventDate"}),
+    "invoices": MirroredEntity("invoices", {"_date": "date"}),
+    "activities": MirroredEntity(
+        "activities", {"_start": "startDateTime", "_end": "endDateTime"}
+    ),
+}
+
+
+class MirrorStore:
+    """
+    One collection per entity with the Severa JSON by guid, and the watermarks.
+    The methods do blocking Mongo I/O, so async code runs them in a thread.
+    """
+
+    def __init__(self, base: str = MIRROR_BASE):
+        self._base = base
+        self._collections: dict[str, Base] = {}
+        self._sync_locks: dict[str, asyncio.Lock] = {}
+
+    def _db(self, collection: str) -> Base:
+        if (db := self._collections.get(collection)) is None:
+            db = self._collections[collection] = Base(
+                self._base,
+                collection,
+                serverSelectionTimeoutMS=CACHE_SERVER_SELECTION_TIMEOUT_MS,
+            )
+
+        return db
+
+    def sync_lock(self, name: str) -> asyncio.Lock:
+        """
+        Lock held while syncing `name`, so that e.g. the incremental and the full
+        sync don't race on the watermark.
+        """
+        return self._sync_locks.setdefault(name, asyncio.Lock())
+
+    def watermark(self, name: str) -> dict | None:
+        documents = self._db("watermarks").find_documents({"_id": name})
+        return documents[0] if documents else None
+
+    def is_fresh(self, name: str) -> bool:
+        try:
+            watermark = self.watermark(name)
+        except PyMongoError as exc:
+            logger.warning(f"Severa mirror unavailable: {exc!r}")
+            return False
+
+        return (
+            watermark is not None
+            and time.time() - watermark["synced"] < MAX_STALENESS_SECONDS
+        )
+
+    def save(self, name: str, documents: list[dict], sync_id: str) -> None:
+        """
+        Upsert a batch of synced documents, stamped with `sync_id`. The documents
+        aren't modified, they may be shared with other readers.
+        """
+        date_fields = ENTITIES[name].date_fields
+
+        documents = [
+            {
+                **document,
+                "_id": document["guid"],
+                "_sync": sync_id,
+                **{
+                    field: (
+                        arrow.get(document[source]).datetime
+                        if document.get(source)
+                        else None
+                    )
+                    for field, source in date_fields.items()
+                },
+            }
+            for document in documents
+        ]
+
+        self._db(name).replace_documents(documents)
+
+    def finish(
+        self,
+        name: str,
+        sync_id: str,
+        changed_since: arrow.Arrow,
+        full: bool = False,
+    ) -> None:
+        """
+        Move the watermark after all the batches of `sync_id` are saved. A full
+        sync also deletes the documents it didn't return, i.e. were deleted in
+        Severa.
+        """
+        if full:
+            self._db(name).delete({"_sync": {"$ne": sync_id}})
+
+        self._db("watermarks").replace_documents(
+            [
+                {
+                    "_id": name,
+                    "changed_since": changed_since.datetime,
+                    "synced": time.time(),
+                }
+            ]
+        )
+
+    def find(self, name: str, query: dict) -> list[dict]:
+        """
+        Documents as returned by Severa.
+        """
+        projection = {"_id": False, "_sync": False} | {
+            field: False for field in ENTITIES[name].date_fields
+        }
+
+        return self._db(name).find_documents(query, projection)
+
+
+@functools.cache
+def get_mirror_store() -> MirrorStore:
+    return MirrorStore()
+
+
+class MirrorClient(Client):
+    """
+    Severa client reading realized work hours, invoices and absences from the
+    mirror when it is fresh, and from Severa otherwise. Also syncs the mirror.
+    The freshness of each entity is checked once per client, i.e. per request.
+    """
+
+    def __init__(
+        self, transport: Transport | None = None, store: MirrorStore | None = None
+    ):
+        super().__init__(transport)
+        self._store = store or get_mirror_store()
+        self._freshness: dict[str, asyncio.Task[bool]] = {}
+
+    def _sync_params(self, name: str) -> dict[str, typing.Any]:
+        return {
+            "invoices": {"projectBusinessUnitGuids": self.businessunits},
+            "activities": {"activityCategories": "Absences"},
+        }.get(name, {})
+
+    async def _is_fresh(self, name: str) -> bool:
+        if (task := self._freshness.get(name)) is None:
+            task = self._freshness[name] = asyncio.create_task(
+                asyncio.to_thread(self._store.is_fresh, name)
+            )
+
+        return await asyncio.shield(task)
+
+    async def _find(self, name: str, query: dict) -> list[dict]:
+        return await asyncio.to_thread(self._store.find, name, query)
+
+    async def sync(self, name: str, full: bool = False) -> int:
+        """
+        Fetch the entities changed since the watermark. Without a watermark, or
+        if `full` is set, fetch all of them and drop the ones not returned. The
+        entities are saved in batches while they are fetched, and only one sync
+        of `name` runs at a time.
+        """
+        async with self._store.sync_lock(name):
+            return await self._sync(name, full)
+
+    async def _sync(self, name: str, full: bool) -> int:
+        t0 = time.monotonic()
+        started = arrow.utcnow().shift(seconds=-SYNC_OVERLAP_SECONDS)
+        sync_id = uuid.uuid4().hex
+
+        watermark = (
+            None if full else await asyncio.to_thread(self._store.watermark, name)
+        )
+        params = dict(self._sync_params(name))
+
+        if watermark is not None:
+            params["changedSince"] = arrow.get(watermark["changed_since"]).format(
+                "YYYY-MM-DDTHH:mm:ssZZ"
+            )
+
+        synced = 0
+        batch: list[dict] = []
+
+        async for document in self._client.stream(ENTITIES[name].endpoint, params):
+            batch.append(document)
+
+            if len(batch) >= SYNC_BATCH_SIZE:
+                await asyncio.to_thread(self._store.save, name, batch, sync_id)
+                synced += len(batch)
+                batch = []
+
+        if batch:
+            await asyncio.to_thread(self._store.save, name, batch, sync_id)
+            synced += len(batch)
+
+        await asyncio.to_thread(
+            self._store.finish, name, sync_id, started, watermark is None
+        )
+
+        logger.success(
+            f"Synced {synced} {name} changed since "
+            f"{params.get('changedSince', 'the beginning')} "
+            f"in {time.monotonic() - t0:.2f}s."
+        )
+        return synced
+
+    async def sync_all(self, full: bool = False) -> dict[str, int]:
+        synced = {}
+
+        for name in ENTITIES:
+            try:
+                synced[name] = await self.sync(name, full)
+            except Exception as e:
+                logger.error(f"Syncing {name} failed:")
+                logger.exception(e)
+
+        # The cached months may be missing the changes just synced
+        if any(synced.values()):
+            get_month_cache().clear()
+
+        return synced
+
+    async def _workhours_json(
+        self, user_guids: list[str], span: DateRange
+    ) -> list[dict]:
+        if not await self._is_fresh("workhours"):
+            return await super()._workhours_json(user_guids, span)
+
+        return await self._find(
+            "workhours",
+            {
+                "user.guid": {"$in": user_guids},
+                "_date": {"$gte": span.start.datetime, "$lte": span.end.datetime},
+            },
+        )
+
+    async def _invoices_json(self, span: DateRange) -> typing.AsyncIterator[dict]:
+        if not await self._is_fresh("invoices"):
+            async for invoice in super()._invoices_json(span):
+                yield invoice
+            return
+
+        for invoice in await self._find(
+            "invoices",
+            {"_date": {"$gte": span.start.datetime, "$lte": span.end.datetime}},
+        ):
+            yield invoice
+
+    async def _absences_json(
+        self, user_guids: list[str], span: DateRange
+    ) -> list[dict]:
+        if not await self._is_fresh("activities"):
+            return await super()._absences_json(user_guids, span)
+
+        return await self._find(
+            "activities",
+            {
+                "ownerUser.guid": {"$in": user_guids},
+                "_start": {"$lte": span.end.datetime},
+                "_end": {"$gte": span.start.datetime},
+            },
+        )
@@ -0,0 +1,75 @@
+"""
+Process-wide cache of the frames fetched month by month (see
+Client.fetch_by_month), shared by all the clients. Past months rarely change,
+so they are kept for longer than the months that are still going on. Syncing
+the Severa mirror clears the cache, as the synced changes may be in any month.
+"""
+
+import functools
+import time
+import typing
+
+import arrow
+import pandas as pd
+from loguru import logger
+
+from src.util.daterange import DateRange
+
+MonthKey = tuple[typing.Hashable, ...]
+
+# Maximum age of a cached month that has ended, and of one that hasn't
+PAST_MONTH_MAX_AGE_SECONDS = 60 * 60
+CURRENT_MONTH_MAX_AGE_SECONDS = 5 * 60
+
+
+class CachedMonth(typing.NamedTuple):
+    frame: pd.DataFrame
+    expires: float
+
+
+class MonthCache:
+    """
+    Frames by key, i.e. the fetch, its parameters and the month.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[MonthKey, CachedMonth] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: MonthKey) -> pd.DataFrame | None:
+        if (entry := self._entries.get(key)) is None:
+            return None
+
+        if entry.expires < time.monotonic():
+            del self._entries[key]
+            return None
+
+        return entry.frame
+
+    def put(self, key: MonthKey, month: DateRange, frame: pd.DataFrame) -> None:
+        now = time.monotonic()
+        max_age = (
+            PAST_MONTH_MAX_AGE_SECONDS
+            if month.end < arrow.utcnow()
+            else CURRENT_MONTH_MAX_AGE_SECONDS
+        )
+
+        # Drop the expired entries, so that old keys don't pile up
+        self._entries = {
+            key: entry for key, entry in self._entries.items() if entry.expires >= now
+        }
+        self._entries[key] = CachedMonth(frame, now + max_age)
+
+    def clear(self) -> None:
+        logger.info(f"Cleared {len(self._entries)} cached months.")
+        self._entries.clear()
+
+
+@functools.cache
+def get_month_cache() -> MonthCache:
+    """
+    The month cache shared by the clients of the process.
+    """
+    return MonthCache()
@@ -0,0 +1,167 @@
+"""
+Persistent cache of project sub-resources (forecasts, phases) keyed by the
+project's 'lastUpdatedDateTime', which comes with the project listings. Only the
+projects that have changed since the previous fetch need to be fetched again.
+The Mongo I/O is done in a thread, off the event loop.
+"""
+
+import asyncio
+import functools
+import time
+import typing
+
+from loguru import logger
+from pymongo.errors import PyMongoError
+
+from src.config import settings
+from src.database.database import CACHE_SERVER_SELECTION_TIMEOUT_MS, Base
+from src.logic.severa import projections
+
+# Refetch at least this often, in case a change doesn't touch the project itself
+MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+
+class ProjectCache:
+    """
+    Sub-resources by (resource, project guid). Entries are loaded from and saved
+    to a Mongo collection, or only kept in memory if the collection is None or
+    unreachable.
+    """
+
+    def __init__(self, base: str | None = None, collection: str = "project_cache"):
+        self._base = base
+        self._collection = collection
+        self._database: Base | None = None
+        self._loading: asyncio.Task | None = None
+
+        self._entries: dict[str, dict[str, typing.Any]] = {}
+        self._dirty: set[str] = set()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(resource: str, project_guid: str) -> str:
+        return f"{resource}/{project_guid}"
+
+    @staticmethod
+    def _version(project: projections.Project) -> str | None:
+        if project.lastUpdatedDateTime is None:
+            return None
+
+        return project.lastUpdatedDateTime.isoformat()
+
+    def _db(self) -> Base | None:
+        if self._base is None:
+            return None
+
+        if self._database is None:
+            self._database = Base(
+                self._base,
+                self._collection,
+                serverSelectionTimeoutMS=CACHE_SERVER_SELECTION_TIMEOUT_MS,
+            )
+
+        return self._database
+
+    def _read(self) -> None:
+        if (db := self._db()) is None:
+            return
+
+        try:
+            documents = db.find_documents()
+        except PyMongoError as exc:
+            logger.warning(f"Project cache not loaded: {exc!r}")
+            self._base = None
+            return
+
+        self._entries = {doc["_id"]: doc for doc in documents}
+        logger.debug(f"Loaded {len(self._entries)} project cache entries.")
+
+    async def _load(self) -> None:
+        if self._loading is None:
+            self._loading = asyncio.create_task(asyncio.to_thread(self._read))
+
+        await asyncio.shield(self._loading)
+
+    def _write(self, documents: list[dict[str, typing.Any]]) -> bool:
+        if (db := self._db()) is None:
+            return True
+
+        try:
+            db.replace_documents(documents)
+        except PyMongoError as exc:
+            logger.warning(f"Project cache not saved: {exc!r}")
+            return False
+
+        return True
+
+    async def get(
+        self, resource: str, project: projections.Project
+    ) -> list[dict] | None:
+        """
+        Cached JSON items of `resource` for `project`, or None if the project has
+        changed since they were fetched.
+        """
+        await self._load()
+
+        entry = self._entries.get(ProjectCache._key(resource, project.guid))
+        version = ProjectCache._version(project)
+
+        if (
+            entry is None
+            or version is None
+            or entry["version"] != version
+            or time.time() - entry["fetched"] > MAX_AGE_SECONDS
+        ):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry["items"]
+
+    def put(
+        self, resource: str, project: projections.Project, items: list[dict]
+    ) -> None:
+        if (version := ProjectCache._version(project)) is None:
+            return
+
+        key = ProjectCache._key(resource, project.guid)
+
+        self._entries[key] = {
+            "_id": key,
+            "resource": resource,
+            "project": project.guid,
+            "version": version,
+            "fetched": time.time(),
+            "items": items,
+        }
+        self._dirty.add(key)
+
+    async def save(self) -> None:
+        """
+        Write the entries changed since the previous save. Entries put while
+        saving are left for the next save.
+        """
+        logger.info(
+            f"Project cache: {self.hits} hits, {self.misses} misses, "
+            f"saving {len(self._dirty)} entries."
+        )
+
+        if not self._dirty:
+            return
+
+        keys, self._dirty = self._dirty, set()
+
+        if not await asyncio.to_thread(
+            self._write, [self._entries[key] for key in keys]
+        ):
+            self._dirty |= keys
+
+
+@functools.cache
+def get_project_cache() -> ProjectCache:
+    """
+    The project cache shared by the clients of the process.
+    """
+    return ProjectCache(settings.mongo_base)
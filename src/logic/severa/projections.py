@@ -0,0 +1,186 @@
+"""
+Slim projections of the Severa models in src.logic.severa.models, with only the
+fields the KPI pipeline reads. Unknown fields are ignored instead of being kept,
+so parsing is much cheaper than with the full generated models.
+
+Set SEVERA_VALIDATE_FULL_MODELS to also validate every payload against the full
+model, for debugging schema changes.
+"""
+
+import datetime
+import functools
+import typing
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+
+from src.config import settings
+from src.logic.severa import models
+
+
+class Slim(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+
+class Ref(Slim):
+    guid: str | None = None
+
+
+class Money(Slim):
+    amount: float | None = None
+
+
+class Named(Slim):
+    name: str | None = None
+
+
+class Person(Slim):
+    guid: str | None = None
+    firstName: str | None = None
+
+
+class UserWorkContract(Slim):
+    dailyHours: float | None = None
+    hourCost: Money | None = None
+
+
+class User(Slim):
+    guid: str | None = None
+    firstName: str | None = None
+    lastName: str | None = None
+    businessUnit: Ref | None = None
+    workContract: UserWorkContract | None = None
+
+
+class WorkContract(Slim):
+    startDate: datetime.date
+    endDate: datetime.date | None = None
+    dailyHours: float | None = None
+    hourCost: Money | None = None
+
+
+class WorkHour(Slim):
+    guid: str | None = None
+    eventDate: datetime.date
+    quantity: float | None = None
+    isProductive: bool | None = None
+    user: Ref | None = None
+    project: Ref | None = None
+    phase: Ref | None = None
+
+
+class AllocationProject(Slim):
+    guid: str | None = None
+    isInternal: bool | None = None
+
+
+class ResourceAllocation(Slim):
+    guid: str | None = None
+    calculatedAllocationHours: float | None = None
+    derivedStartDate: datetime.date | None = None
+    derivedEndDate: datetime.date | None = None
+    user: Ref | None = None
+    project: AllocationProject | None = None
+    phase: Ref | None = None
+
+
+class Activity(Slim):
+    guid: str | None = None
+    startDateTime: datetime.datetime
+    endDateTime: datetime.datetime | None = None
+    isAllDay: bool | None = None
+    activityType: Ref
+    ownerUser: Ref
+
+
+class Invoice(Slim):
+    guid: str | None = None
+    date: datetime.date | None = None
+    status: Ref | None = None
+    projects: list[Ref] | None = None
+    totalExcludingTax: Money | None = None
+
+
+class ProjectForecast(Slim):
+    guid: str
+    year: int
+    month: int
+    project: Ref | None = None
+    billingForecast: Money | None = None
+    expenseForecast: Money | None = None
+    revenueForecast: Money | None = None
+    laborExpenseForecast: Money | None = None
+
+
+class Phase(Slim):
+    guid: str | None = None
+    name: str
+    startDate: datetime.date | None = None
+    deadline: datetime.date | None = None
+    workHoursEstimate: float | None = None
+    hasChildren: bool | None = None
+    project: Ref | None = None
+
+
+class SalesStatus(Slim):
+    guid: str | None = None
+    salesStatusTypeGuid: str | None = None
+
+
+class Project(Slim):
+    guid: str
+    name: str
+    isClosed: bool | None = None
+    isInternal: bool | None = None
+    projectOwner: Person
+    salesPerson: Person | None = None
+    businessUnit: Ref | None = None
+    salesStatus: SalesStatus | None = None
+    probability: int | None = None
+    expectedOrderDate: datetime.date | None = None
+    expectedValue: Money | None = None
+    deadline: datetime.date | None = None
+    keywords: list[Named] | None = None
+    lastUpdatedDateTime: datetime.datetime | None = None
+
+
+# The full model of each projection, for validate_full_models
+FULL_MODELS: dict[type[Slim], type[models.Parent]] = {
+    User: models.UserOutputModel,
+    WorkContract: models.WorkContractOutputModel,
+    WorkHour: models.WorkHourOutputModel,
+    ResourceAllocation: models.ResourceAllocationOutputModel,
+    Activity: models.ActivityModel,
+    Invoice: models.InvoiceOutputModel,
+    ProjectForecast: models.ProjectForecastOutputModel,
+    Phase: models.PhaseModelWithHierarchyInfo,
+    Project: models.ProjectOutputModel,
+}
+
+S = typing.TypeVar("S", bound=Slim)
+
+
+@functools.cache
+def _list_adapter(model: type[S]) -> TypeAdapter[list[S]]:
+    return TypeAdapter(list[model])  # type: ignore[valid-type]
+
+
+def parse(model: type[S], json: dict) -> S:
+    """
+    Parse one Severa JSON object into the projection `model`.
+    """
+    if settings.severa_validate_full_models:
+        FULL_MODELS[model].model_validate(json)
+
+    return model.model_validate(json)
+
+
+def parse_all(model: type[S], items: typing.Iterable[dict]) -> list[S]:
+    """
+    Parse a list of Severa JSON objects in one go.
+    """
+    items = list(items)
+
+    if settings.severa_validate_full_models:
+        _list_adapter(FULL_MODELS[model]).validate_python(items)
+
+    return _list_adapter(model).validate_python(items)
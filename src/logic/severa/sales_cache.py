@@ -0,0 +1,105 @@
+"""
+Process-wide cache of the sales pipeline result (the sales DataFrame and the
+invalid sales report), shared by all the clients. Stale values are served while
+a refresh runs in the background, and only one refresh runs at a time per key.
+"""
+
+import asyncio
+import datetime
+import functools
+import time
+import typing
+
+import pandas as pd
+from loguru import logger
+
+SalesKey = tuple[str, ...]
+FetchSales = typing.Callable[[], typing.Awaitable[tuple[pd.DataFrame, dict[str, list]]]]
+
+
+class CachedSales(typing.NamedTuple):
+    sales: pd.DataFrame
+    invalid_sales: dict[str, list]
+    generation: int
+    fetched: datetime.datetime
+    fetched_monotonic: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_monotonic
+
+
+class SalesCache:
+    """
+    Results by key, i.e. the filtered keywords of the fetch. `generation` grows
+    by one with every completed refresh.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[SalesKey, CachedSales] = {}
+        self._refreshing: dict[SalesKey, asyncio.Task] = {}
+        self.generation = 0
+
+    def peek(self, key: SalesKey) -> CachedSales | None:
+        return self._entries.get(key)
+
+    def is_refreshing(self, key: SalesKey) -> bool:
+        return key in self._refreshing
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def _refresh(self, key: SalesKey, fetch: FetchSales) -> CachedSales:
+        t0 = time.monotonic()
+        sales, invalid_sales = await fetch()
+
+        self.generation += 1
+        entry = self._entries[key] = CachedSales(
+            sales,
+            invalid_sales,
+            self.generation,
+            datetime.datetime.now(tz=datetime.UTC),
+            time.monotonic(),
+        )
+        logger.info(
+            f"Sales {key} refreshed to generation {entry.generation} "
+            f"in {entry.fetched_monotonic - t0:.2f}s."
+        )
+
+        return entry
+
+    def _start(self, key: SalesKey, fetch: FetchSales) -> asyncio.Task:
+        if (task := self._refreshing.get(key)) is not None:
+            return task
+
+        def done(task: asyncio.Task) -> None:
+            self._refreshing.pop(key, None)
+
+            if not task.cancelled() and (exc := task.exception()) is not None:
+                logger.error(f"Sales {key} refresh failed: {exc!r}")
+
+        task = self._refreshing[key] = asyncio.create_task(self._refresh(key, fetch))
+        task.add_done_callback(done)
+
+        return task
+
+    async def refresh(self, key: SalesKey, fetch: FetchSales) -> CachedSales:
+        """
+        Refresh and wait for the result. Joins the refresh in progress, if any.
+        """
+        # The refresh continues for the other waiters if this one is cancelled
+        return await asyncio.shield(self._start(key, fetch))
+
+    def revalidate(self, key: SalesKey, fetch: FetchSales) -> None:
+        """
+        Refresh in the background, unless a refresh is in progress already.
+        """
+        self._start(key, fetch)
+
+
+@functools.cache
+def get_sales_cache() -> SalesCache:
+    """
+    The sales cache shared by the clients of the process.
+    """
+    return SalesCache()
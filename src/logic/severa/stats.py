@@ -0,0 +1,231 @@
+"""
+Accounting of Severa API calls: counts, bytes, retries and latency histograms per
+endpoint template (e.g. 'users/{guid}/workhours'), attributed to the job or route
+that made the calls.
+"""
+
+import bisect
+import functools
+import re
+import typing
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+GUID_PATTERN = re.compile(
+    r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+)
+UNATTRIBUTED = "unattributed"
+
+# The job or route making the calls, nested jobs are joined with '/'
+current_job: ContextVar[str] = ContextVar("severa_job", default=UNATTRIBUTED)
+
+
+@contextmanager
+def job(name: str) -> typing.Iterator[str]:
+    """
+    Attribute the Severa calls made within the block to `name`. Nested jobs
+    get the parent's name as a prefix, e.g. 'database-save/hours'.
+    """
+    parent = current_job.get()
+    full_name = name if parent == UNATTRIBUTED else f"{parent}/{name}"
+
+    token = current_job.set(full_name)
+    try:
+        yield full_name
+    finally:
+        current_job.reset(token)
+
+
+def endpoint_template(endpoint: str) -> str:
+    """
+    Replace the guids and numeric ids in an endpoint with placeholders, so that
+    calls like 'users/<guid>/workhours' are counted together.
+    """
+    return "/".join(
+        ("{guid}" if GUID_PATTERN.match(part) else "{id}" if part.isdigit() else part)
+        for part in endpoint.strip("/").split("/")
+    )
+
+
+class LatencyHistogram:
+    """
+    Counts of latencies in fixed buckets, upper bounds in seconds.
+    """
+
+    BUCKETS: typing.ClassVar[tuple[float, ...]] = (
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+    )
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket containing the q-quantile (the maximum for
+        the overflow bucket).
+        """
+        if (count := self.count) == 0:
+            return 0.0
+
+        rank = q * count
+        cumulative = 0
+
+        for bound, bucket_count in zip(self.BUCKETS, self.counts, strict=False):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(bound, self.maximum)
+
+        return self.maximum
+
+    def as_dict(self) -> dict[str, typing.Any]:
+        return {
+            "buckets": {
+                **{
+                    f"<={bound}": count
+                    for bound, count in zip(self.BUCKETS, self.counts, strict=False)
+                },
+                f">{self.BUCKETS[-1]}": self.counts[-1],
+            },
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.maximum,
+        }
+
+
+class EndpointStats:
+    """
+    Totals for one endpoint template within one job.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.bytes = 0
+        self.latency = LatencyHistogram()
+
+    def as_dict(self) -> dict[str, typing.Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "errors": self.errors,
+            "coalesced": self.coalesced,
+            "bytes": self.bytes,
+            "seconds": round(self.latency.total, 3),
+            "latency": self.latency.as_dict(),
+        }
+
+
+class CallStats:
+    """
+    Severa call statistics of the process by job and endpoint template.
+    """
+
+    def __init__(self):
+        self._stats: dict[str, dict[str, EndpointStats]] = defaultdict(
+            lambda: defaultdict(EndpointStats)
+        )
+
+    def _current(self, endpoint: str) -> EndpointStats:
+        return self._stats[current_job.get()][endpoint_template(endpoint)]
+
+    def record_call(
+        self,
+        endpoint: str,
+        seconds: float,
+        num_bytes: int = 0,
+        retry: bool = False,
+        error: bool = False,
+    ) -> None:
+        """
+        Record one request attempt of the current job.
+        """
+        stats = self._current(endpoint)
+        stats.calls += 1
+        stats.retries += retry
+        stats.errors += error
+        stats.bytes += num_bytes
+        stats.latency.add(seconds)
+
+    def record_coalesced(self, endpoint: str) -> None:
+        """
+        Record a call that was served by an identical in-flight request.
+        """
+        self._current(endpoint).coalesced += 1
+
+    def reset(self, job_name: str | None = None) -> None:
+        """
+        Forget the statistics of `job_name` and its nested jobs, or of all jobs.
+        """
+        if job_name is None:
+            self._stats.clear()
+            return
+
+        for name in list(self._stats):
+            if name == job_name or name.startswith(f"{job_name}/"):
+                del self._stats[name]
+
+    def summary(self, job_name: str | None = None) -> dict[str, typing.Any]:
+        """
+        Statistics of `job_name` and its nested jobs (or of all jobs) by job and
+        endpoint template, the most called endpoints first.
+        """
+        return {
+            name: {
+                template: stats.as_dict()
+                for template, stats in sorted(
+                    endpoints.items(), key=lambda item: -item[1].calls
+                )
+            }
+            for name, endpoints in sorted(self._stats.items())
+            if job_name is None or name == job_name or name.startswith(f"{job_name}/")
+        }
+
+    def format_summary(self, job_name: str | None = None) -> str:
+        """
+        Summary as a table, one row per job and endpoint template.
+        """
+        header = (
+            f"{'job':<30} {'endpoint':<45} {'calls':>6} {'retry':>5} {'err':>4} "
+            f"{'coal':>5} {'kB':>8} {'sec':>8} {'p50':>6} {'p95':>6}"
+        )
+        rows = [header]
+
+        for name, endpoints in self.summary(job_name).items():
+            for template, stats in endpoints.items():
+                rows.append(
+                    f"{name:<30} {template:<45} {stats['calls']:>6} "
+                    f"{stats['retries']:>5} {stats['errors']:>4} "
+                    f"{stats['coalesced']:>5} {stats['bytes'] / 1000:>8.1f} "
+                    f"{stats['seconds']:>8.2f} {stats['latency']['p50']:>6.2f} "
+                    f"{stats['latency']['p95']:>6.2f}"
+                )
+
+        return "\n".join(rows)
+
+
+@functools.cache
+def get_call_stats() -> CallStats:
+    return CallStats()
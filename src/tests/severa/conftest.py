@@ -0,0 +1,84 @@
+import typing
+
+import httpx
+import pytest
+
+from src.logic.severa import base_client
+from src.logic.severa import client as severa_client
+from src.logic.severa.base_client import RateLimiter, TokenManager, Transport
+from src.logic.severa.dimensions import DimensionStore
+
+SeveraApi = typing.Callable[[httpx.Request], typing.Awaitable[httpx.Response]]
+
+
+async def not_found(request: httpx.Request) -> httpx.Response:  # noqa: ARG001
+    return httpx.Response(httpx.codes.NOT_FOUND)
+
+
+@pytest.fixture
+def severa_api() -> typing.Callable[[SeveraApi], httpx.MockTransport]:
+    """
+    Factory of HTTP transports to a mocked Severa API. The token endpoint is
+    served here, and the other requests by `api`.
+    """
+
+    def mock(api: SeveraApi) -> httpx.MockTransport:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/token"):
+                return httpx.Response(
+                    httpx.codes.OK,
+                    json={
+                        "access_token": "token",
+                        "access_token_type": "Bearer",
+                        "access_token_expires_in": 3600,
+                    },
+                )
+
+            response = await api(request)
+
+            # Streamed like a network response, so that httpx sets .elapsed
+            return httpx.Response(
+                response.status_code,
+                headers=response.headers,
+                stream=httpx.ByteStream(response.content),
+            )
+
+        return httpx.MockTransport(handler)
+
+    return mock
+
+
+@pytest.fixture
+def private_transports(monkeypatch) -> None:
+    """
+    Give new Transports an access token and a rate limiter of their own, instead
+    of the process-wide ones.
+    """
+    monkeypatch.setattr(base_client, "get_token_manager", TokenManager)
+    monkeypatch.setattr(base_client, "get_ratelimiter", lambda: RateLimiter(10, 1.0))
+
+
+@pytest.fixture
+def severa_transport(
+    severa_api, private_transports  # noqa: ARG001
+) -> typing.Callable[[SeveraApi], Transport]:
+    """
+    Factory of Transports to a mocked Severa API (see severa_api), by default
+    one without any resources.
+    """
+
+    def transport(api: SeveraApi = not_found) -> Transport:
+        return Transport(severa_api(api))
+
+    return transport
+
+
+@pytest.fixture
+def dimension_store(monkeypatch) -> DimensionStore:
+    """
+    An empty dimension store kept in memory, instead of the process-wide one.
+    """
+    store = DimensionStore()
+    monkeypatch.setattr(severa_client, "get_dimension_store", lambda: store)
+
+    return store
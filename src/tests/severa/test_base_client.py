@@ -0,0 +1,462 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from pytest import approx
+
+from src.logic.severa import base_client
+from src.logic.severa.base_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Client,
+    ConcurrencyLimiter,
+    Priority,
+    RateLimiter,
+    Request,
+    RequestQueue,
+    TokenManager,
+    backoff_delay,
+    get_ratelimiter,
+    parse_retry_after,
+    priority,
+)
+
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_burst_within_capacity_does_not_wait(self):
+        limiter = RateLimiter(5, 1.0)
+
+        t0 = time.monotonic()
+        for _ in range(5):
+            await limiter.wait()
+
+        assert time.monotonic() - t0 < 0.05
+
+    @pytest.mark.asyncio
+    async def test_waits_when_bucket_is_empty(self):
+        limiter = RateLimiter(2, 0.1)
+
+        t0 = time.monotonic()
+        for _ in range(3):
+            await limiter.wait()
+
+        assert time.monotonic() - t0 >= 0.04
+
+    def test_throttle_lowers_and_recover_raises_rate(self):
+        limiter = RateLimiter(10, 1.0)
+
+        limiter.throttle(0.0)
+        assert limiter.refill_rate == approx(5.0)
+
+        for _ in range(100):
+            limiter.recover()
+        assert limiter.refill_rate == approx(10.0)
+
+    def test_throttle_has_a_floor(self):
+        limiter = RateLimiter(10, 1.0)
+
+        for _ in range(20):
+            limiter.throttle(0.0)
+
+        assert limiter.refill_rate == approx(1.0)
+
+    def test_429_response_throttles(self):
+        limiter = RateLimiter(10, 1.0)
+
+        limiter.update_from_response(httpx.Response(429, headers={"Retry-After": "0"}))
+
+        assert limiter.refill_rate < 10.0
+
+    def test_shared_instance(self):
+        assert get_ratelimiter() is get_ratelimiter()
+
+
+class TestRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after(httpx.Headers({"Retry-After": "3"})) == approx(3.0)
+
+    def test_http_date_in_past(self):
+        headers = httpx.Headers({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        assert parse_retry_after(headers) == approx(0.0)
+
+    def test_missing_or_invalid(self):
+        assert parse_retry_after(httpx.Headers()) is None
+        assert parse_retry_after(httpx.Headers({"Retry-After": "soon"})) is None
+
+
+def token_client(calls: list[str], expires_in: int = 3600) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path.rsplit("/", 1)[-1])
+        return token_response(calls, expires_in)
+
+    return httpx.AsyncClient(
+        base_url="https://severa.invalid/", transport=httpx.MockTransport(handler)
+    )
+
+
+def token_response(calls: list[str], expires_in: int = 3600) -> httpx.Response:
+    return httpx.Response(
+        200,
+        json={
+            "access_token": f"token-{len(calls)}",
+            "access_token_type": "Bearer",
+            "access_token_expires_in": expires_in,
+            "refresh_token": "refresh",
+            "refresh_token_expires_in": 24 * 3600,
+        },
+    )
+
+
+class TestTokenManager:
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_authentication(self):
+        calls: list[str] = []
+        manager = TokenManager()
+
+        async with token_client(calls) as client:
+            results = await asyncio.gather(
+                *(manager.headers(client) for _ in range(50))
+            )
+
+        assert calls == ["token"]
+        assert {r["Authorization"] for r in results} == {"Bearer token-1"}
+
+    @pytest.mark.asyncio
+    async def test_unauthorized_reauthenticates_once(self):
+        calls: list[str] = []
+        manager = TokenManager()
+
+        async with token_client(calls) as client:
+            await manager.headers(client)
+            rejected = manager.generation
+
+            await asyncio.gather(
+                *(manager.invalidate(client, rejected) for _ in range(20))
+            )
+
+        assert calls == ["token", "token"]
+        assert manager.generation == rejected + 1
+
+    @pytest.mark.asyncio
+    async def test_refreshes_in_background_before_expiry(self):
+        calls: list[str] = []
+        manager = TokenManager()
+
+        async with token_client(
+            calls, expires_in=TokenManager.REFRESH_MARGIN_SECONDS - 1
+        ) as client:
+            first = await manager.headers(client)
+            second = await manager.headers(client)
+            await asyncio.sleep(0.01)
+
+        # The second call returned the still valid token without waiting
+        assert second == first
+        assert calls == ["token", "refreshtoken"]
+
+
+class TestRequestQueue:
+    @pytest.mark.asyncio
+    async def test_interactive_first_but_batch_progresses(self):
+        queue = RequestQueue()
+
+        with priority(Priority.BATCH):
+            for i in range(10):
+                await queue.put(Request(f"batch/{i}", {}, {}))
+
+        for i in range(10):
+            await queue.put(Request(f"interactive/{i}", {}, {}))
+
+        served = [(await queue.get()).endpoint for _ in range(10)]
+
+        assert served[:4] == [f"interactive/{i}" for i in range(4)]
+        assert served[4] == "batch/0"
+        assert sum(e.startswith("batch") for e in served) == 2
+
+    def test_priority_context_is_restored(self):
+        with priority(Priority.BATCH):
+            assert Request("a", {}, {}).priority is Priority.BATCH
+
+        assert Request("a", {}, {}).priority is Priority.INTERACTIVE
+
+
+class TestConcurrencyLimiter:
+    @pytest.mark.asyncio
+    async def test_limit_grows_while_latency_is_stable(self):
+        limiter = ConcurrencyLimiter(initial=2, maximum=8)
+
+        for _ in range(20):
+            await limiter.acquire()
+            limiter.release(0.1)
+
+        assert limiter.limit > 2
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_limit_is_cut_on_overload_and_latency_spike(self):
+        limiter = ConcurrencyLimiter(initial=8)
+
+        await limiter.acquire()
+        limiter.release(0.1)
+        await limiter.acquire()
+        limiter.release(0.1, overloaded=True)
+        assert limiter.limit == 4
+
+        limiter._last_decrease = 0.0
+        await limiter.acquire()
+        limiter.release(10.0)
+        assert limiter.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_a_free_slot(self):
+        limiter = ConcurrencyLimiter(initial=1)
+        await limiter.acquire()
+
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        limiter.release(0.1)
+        await asyncio.wait_for(waiter, 1.0)
+        assert limiter.in_flight == 1
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_fails_fast(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60.0)
+
+        for _ in range(3):
+            breaker.before_request()
+            breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+
+    def test_single_probe_closes_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.0)
+        breaker.record_failure()
+
+        breaker.before_request()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.before_request()
+
+    def test_failed_probe_opens_again(self):
+        breaker = CircuitBreaker(failure_threshold=5, reset_seconds=0.0)
+        for _ in range(5):
+            breaker.record_failure()
+
+        breaker.before_request()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_backoff_delay_is_bounded(self):
+        for retries in range(1, 20):
+            assert 0.0 <= backoff_delay(retries) <= 30.0
+
+
+class TestClientPages:
+    @pytest.mark.asyncio
+    async def test_prefetched_pages_arrive_in_order(self, severa_transport):
+        requested: list[int] = []
+
+        async def api(request: httpx.Request) -> httpx.Response:
+            page = int(request.url.params.get("pageToken", 0))
+            requested.append(page)
+            headers = {"NextPageToken": str(page + 1)} if page < 4 else {}
+
+            return httpx.Response(200, json=[{"page": page}], headers=headers)
+
+        pages = []
+        ahead = []
+
+        async with severa_transport(api) as transport:
+            async for page in Client(transport).get("users", prefetch=2):
+                pages.append(page)
+                await asyncio.sleep(0.05)
+                ahead.append(len(requested) - len(pages))
+
+        assert pages == [[{"page": page}] for page in range(5)]
+        assert requested == list(range(5))
+        # The following pages were fetched while the consumer was busy
+        assert max(ahead) >= 2
+
+    @pytest.mark.asyncio
+    async def test_error_on_later_page_reaches_consumer(self, severa_transport):
+        async def api(request: httpx.Request) -> httpx.Response:
+            page = int(request.url.params.get("pageToken", 0))
+
+            if page == 2:
+                return httpx.Response(404)
+
+            return httpx.Response(
+                200,
+                json=[{"guid": str(page)}],
+                headers={"NextPageToken": str(page + 1)},
+            )
+
+        records = []
+
+        async with severa_transport(api) as transport:
+            with pytest.raises(httpx.HTTPStatusError):
+                async for record in Client(transport).stream("users"):
+                    records.append(record)
+
+        assert records == [{"guid": "0"}, {"guid": "1"}]
+
+
+class TestCoalescing:
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_gets_share_one_request(self, severa_transport):
+        requested: list[str] = []
+        release = asyncio.Event()
+
+        async def api(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.path)
+            await release.wait()
+
+            return httpx.Response(200, json=[{"guid": "a"}])
+
+        async with severa_transport(api) as transport:
+            waiters = [
+                asyncio.create_task(transport.get_page("users", {"active": True}))
+                for _ in range(5)
+            ]
+            await asyncio.sleep(0.01)
+            # A waiter going away doesn't cancel the request of the others
+            waiters.pop().cancel()
+            release.set()
+            results = await asyncio.gather(*waiters)
+
+            assert len(requested) == 1
+            assert results == [([{"guid": "a"}], None)] * 4
+            assert transport.status()["coalesced_hits"] == 4
+            assert transport.status()["coalesced_misses"] == 1
+            assert transport.status()["inflight_pages"] == 0
+
+    @pytest.mark.asyncio
+    async def test_error_reaches_every_waiter(self, severa_transport):
+        requested: list[str] = []
+
+        async def api(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.path)
+            await asyncio.sleep(0.01)
+
+            return httpx.Response(404)
+
+        async with severa_transport(api) as transport:
+            results = await asyncio.gather(
+                *(transport.get_page("users", {}) for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        assert len(requested) == 1
+        assert all(isinstance(result, httpx.HTTPStatusError) for result in results)
+
+
+@pytest.fixture
+def backoff_sleeps(monkeypatch) -> list[float]:
+    """
+    Record the backoff sleeps instead of sleeping, with the full jitter ceiling
+    as the delay.
+    """
+    sleeps: list[float] = []
+    sleep = asyncio.sleep
+
+    async def record(delay: float) -> None:
+        sleeps.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(base_client.asyncio, "sleep", record)
+    monkeypatch.setattr(base_client.random, "uniform", lambda _, high: high)
+
+    return sleeps
+
+
+class TestRetries:
+    @pytest.mark.asyncio
+    async def test_network_errors_are_retried_with_backoff(
+        self, severa_transport, backoff_sleeps
+    ):
+        requested: list[str] = []
+
+        async def api(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.path)
+
+            if len(requested) < 3:
+                raise httpx.ConnectError("refused", request=request)
+
+            return httpx.Response(200, json=[])
+
+        async with severa_transport(api) as transport:
+            response = await transport.get_with_retries("users", {}, {})
+
+        assert response.status_code == 200
+        assert len(requested) == 3
+        assert backoff_sleeps == [approx(0.5), approx(1.0)]
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(
+        self, severa_transport, backoff_sleeps, monkeypatch
+    ):
+        requested: list[str] = []
+
+        async def api(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.path)
+            raise httpx.ConnectError("refused", request=request)
+
+        monkeypatch.setattr(base_client.settings, "severa_circuit_failure_threshold", 2)
+        monkeypatch.setattr(base_client.settings, "severa_circuit_reset_seconds", 60.0)
+
+        async with severa_transport(api) as transport:
+            with pytest.raises(CircuitOpenError):
+                await transport.get_with_retries("users", {}, {})
+
+            assert len(requested) == 2
+            sleeps = len(backoff_sleeps)
+
+            with pytest.raises(CircuitOpenError):
+                await transport.get_with_retries("users", {}, {})
+
+        assert len(requested) == 2
+        assert len(backoff_sleeps) == sleeps
+
+    @pytest.mark.asyncio
+    async def test_closed_client_is_not_a_severa_failure(self):
+        client = httpx.AsyncClient(base_url="https://severa.invalid/")
+        await client.aclose()
+        request = Request("users", {}, {})
+
+        assert await request.send(client) is None
+        with pytest.raises(RuntimeError):
+            await request.response()
+
+    @pytest.mark.asyncio
+    async def test_closed_client_keeps_the_concurrency_limit(self, severa_transport):
+        async def api(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused", request=request)
+
+        async with severa_transport(api) as transport:
+            limit = transport._concurrency.limit
+
+            await transport._concurrency.acquire()
+            await transport._send(Request("users", {}, {}))
+
+            # A network error is an overload
+            assert transport._concurrency.limit < limit
+
+            limit = transport._concurrency.limit
+
+        request = Request("users", {}, {})
+        await transport._concurrency.acquire()
+        await transport._send(request)
+
+        assert transport._concurrency.limit == limit
+        assert transport._concurrency.in_flight == 0
+        with pytest.raises(RuntimeError):
+            await request.response()
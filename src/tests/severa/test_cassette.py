@@ -0,0 +1,101 @@
+import gzip
+import json
+import time
+
+import arrow
+import httpx
+import pytest
+
+from src.logic.severa.base_client import Client, Transport
+from src.logic.severa.cassette import (
+    Cassette,
+    RecordingTransport,
+    interaction_key,
+    replay_transport,
+)
+
+PAGES = [[{"guid": "a"}, {"guid": "b"}], [{"guid": "c"}]]
+
+
+async def users_api(request: httpx.Request) -> httpx.Response:
+    page = int(request.url.params.get("pageToken", 0))
+    headers = {"NextPageToken": str(page + 1)} if page + 1 < len(PAGES) else {}
+
+    return httpx.Response(200, json=PAGES[page], headers=headers)
+
+
+async def record(path, severa_api) -> list:
+    transport = Transport(RecordingTransport(path, transport=severa_api(users_api)))
+
+    async with transport:
+        return await Client(transport).get_all("users")
+
+
+@pytest.mark.usefixtures("private_transports")
+class TestCassette:
+    @pytest.mark.asyncio
+    async def test_replay_matches_recording(self, tmp_path, severa_api):
+        path = tmp_path / "users.json.gz"
+        t0 = arrow.utcnow()
+        recorded = await record(path, severa_api)
+
+        http_transport = replay_transport(path)
+        transport = Transport(http_transport)
+        async with transport:
+            replayed = await Client(transport).get_all("users")
+
+        assert recorded == replayed == PAGES[0] + PAGES[1]
+        assert t0 <= http_transport.recorded <= arrow.utcnow()
+
+    def test_tokens_are_scrubbed(self, tmp_path):
+        path = tmp_path / "token.json.gz"
+        request = httpx.Request("POST", "https://severa.invalid/v1/token")
+        response = httpx.Response(
+            200,
+            json={
+                "access_token": "secret",
+                "access_token_type": "Bearer",
+                "refresh_token": "secret",
+            },
+        )
+
+        cassette = Cassette(path)
+        cassette.add(request, response)
+        cassette.save()
+
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            content = file.read()
+
+        assert "secret" not in content
+        assert "access_token_type" in content
+
+    @pytest.mark.asyncio
+    async def test_replay_latency(self, tmp_path, severa_api):
+        path = tmp_path / "users.json.gz"
+        await record(path, severa_api)
+
+        transport = Transport(replay_transport(path, latency=0.05))
+        async with transport:
+            t0 = time.monotonic()
+            await Client(transport).get_all("users")
+
+        # Two pages fetched one after another
+        assert time.monotonic() - t0 >= 0.1
+
+    def test_interaction_key_ignores_parameter_order(self):
+        first = httpx.Request("GET", "https://severa.invalid/v1/users?b=1&a=2")
+        second = httpx.Request("GET", "https://severa.invalid/v1/users?a=2&b=1")
+
+        assert interaction_key(first) == interaction_key(second)
+
+    @pytest.mark.asyncio
+    async def test_unrecorded_request_is_not_found(self, tmp_path):
+        path = tmp_path / "empty.json.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            json.dump({"version": 1, "interactions": []}, file)
+
+        response = await replay_transport(path).handle_async_request(
+            httpx.Request("GET", "https://severa.invalid/v1/users")
+        )
+
+        assert response.status_code == httpx.codes.NOT_FOUND
@@ -0,0 +1,115 @@
+import datetime
+
+import arrow
+
+from src.logic.severa import projections
+from src.logic.severa.catalog import ProjectCatalog
+from src.util.daterange import DateRange
+
+
+def project(
+    guid: str,
+    owner: str = "owner",
+    order_date: datetime.date | None = None,
+    updated: int = 1,
+) -> projections.Project:
+    return projections.Project(
+        guid=guid,
+        name=guid,
+        projectOwner={"guid": owner},
+        businessUnit={"guid": "unit"},
+        expectedOrderDate=order_date,
+        expectedValue={"amount": 100.0},
+        lastUpdatedDateTime=datetime.datetime(2024, 1, updated, tzinfo=datetime.UTC),
+    )
+
+
+PROJECTS = [
+    project("a", order_date=datetime.date(2024, 3, 1)),
+    project("b", owner="other", order_date=datetime.date(2024, 1, 31)),
+    project("c", order_date=datetime.date(2024, 2, 15)),
+    project("d"),
+]
+
+
+class TestProjectCatalog:
+    def test_lookup(self):
+        catalog = ProjectCatalog()
+        catalog.update("project", PROJECTS)
+
+        assert list(catalog.lookup(["b", "missing", "a"], "owner", "MISS")) == [
+            "other",
+            "MISS",
+            "owner",
+        ]
+        assert sorted(catalog.column("guid")[catalog.positions("owner", "owner")]) == [
+            "a",
+            "c",
+            "d",
+        ]
+
+    def test_ordered_in_span(self):
+        catalog = ProjectCatalog()
+        catalog.update("project", PROJECTS)
+        catalog.update(
+            "salescase", [project("e", order_date=datetime.date(2024, 2, 1))]
+        )
+
+        span = DateRange(arrow.get("2024-01-31"), arrow.get("2024-03-01"))
+
+        assert list(catalog.column("guid")[catalog.ordered_in(span)]) == [
+            "b",
+            "e",
+            "c",
+            "a",
+        ]
+        assert list(catalog.frame(catalog.ordered_in(span, "project"))["guid"]) == [
+            "b",
+            "c",
+            "a",
+        ]
+
+    def test_incremental_update(self):
+        catalog = ProjectCatalog()
+
+        assert catalog.update("project", PROJECTS) == len(PROJECTS)
+        assert catalog.update("project", PROJECTS) == 0
+        assert catalog.update("project", [*PROJECTS[:2], project("c", updated=2)]) == 2
+
+        assert sorted(catalog.projects("project")) == ["a", "b", "c"]
+        assert "d" not in catalog
+        assert len(catalog) == len(PROJECTS) - 1
+
+    def test_empty(self):
+        catalog = ProjectCatalog()
+
+        assert catalog.age("project") == float("inf")
+        assert list(catalog.lookup(["a"], "owner", "MISS")) == ["MISS"]
+        assert catalog.frame().empty
+
+    def test_project_in_several_groups(self):
+        span = DateRange(arrow.get("2024-01-31"), arrow.get("2024-03-01"))
+
+        for groups in (["project", "salescase"], ["salescase", "project"]):
+            catalog = ProjectCatalog()
+            for group in groups:
+                catalog.update(group, PROJECTS[:2])
+
+            for group in groups:
+                assert list(
+                    catalog.column("guid")[catalog.ordered_in(span, group)]
+                ) == [
+                    "b",
+                    "a",
+                ]
+            assert list(catalog.frame()["in_project"]) == [True, True]
+            assert list(catalog.frame()["in_salescase"]) == [True, True]
+
+        assert catalog.update("salescase", PROJECTS[1:2]) == 1
+        assert list(catalog.column("guid")[catalog.ordered_in(span, "project")]) == [
+            "b",
+            "a",
+        ]
+        assert list(
+            catalog.frame(catalog.members("salescase").nonzero()[0])["guid"]
+        ) == ["b"]
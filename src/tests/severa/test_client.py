@@ -1,3 +1,271 @@
+import asyncio
+
+import arrow
+import httpx
+import pandas as pd
+import pytest
+
+from src.logic.severa.base_client import Client as BaseClient
+from src.logic.severa import client as severa_client
+from src.logic.severa.client import BUSINESSUNIT_SHORTNAMES, BatchLoader, Client
+from src.logic.severa.month_cache import get_month_cache
+from src.util.daterange import DateRange
+
+USER_GUIDS = [f"00000000-0000-0000-0000-00000000000{i}" for i in range(3)]
+TIE = next(guid for guid, name in BUSINESSUNIT_SHORTNAMES.items() if name == "TIE")
+
+
+def users_json(guids: list[str]) -> list[dict]:
+    return [
+        {"guid": guid, "isActive": True, "businessUnit": {"guid": TIE}}
+        for guid in guids
+    ]
+
+
+class TestBatchLoader:
+    @pytest.mark.asyncio
+    async def test_keys_of_one_tick_are_batched(self):
+        batches: list[list[int]] = []
+
+        async def batch_fn(keys: list[int]) -> dict[int, int]:
+            batches.append(keys)
+            return {key: key * 10 for key in keys if key != 3}
+
+        loader = BatchLoader(batch_fn, -1, max_batch_size=2)
+        results = await asyncio.gather(*(loader.load(key) for key in [1, 2, 2, 3]))
+
+        assert results == [10, 20, 20, -1]
+        assert batches == [[1, 2], [3]]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_raised_to_every_caller(self):
+        async def batch_fn(keys: list[int]) -> dict[int, int]:
+            raise ValueError(keys)
+
+        loader = BatchLoader(batch_fn, 0)
+        results = await asyncio.gather(
+            loader.load(1), loader.load(2), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_per_key_fallback_is_bounded(self):
+        running = 0
+        max_running = 0
+
+        async def fetch(key: int) -> int:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return key
+
+        loader = BatchLoader(BatchLoader.per_key(fetch, max_concurrency=2), 0)
+        results = await asyncio.gather(*(loader.load(key) for key in range(6)))
+
+        assert results == list(range(6))
+        assert max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_user_workhours_are_fetched_with_one_call(
+    severa_transport, dimension_store  # noqa: ARG001
+):
+    paths: list[str] = []
+
+    async def api(request: httpx.Request) -> httpx.Response:
+        path = request.url.path.rsplit("/v1/", 1)[-1]
+        paths.append(path)
+
+        if path == "users":
+            return httpx.Response(200, json=users_json(USER_GUIDS))
+
+        return httpx.Response(
+            200,
+            json=[
+                {
+                    "guid": f"hour-{guid}",
+                    "user": {"guid": guid},
+                    "project": {"guid": "project"},
+                    "phase": {"guid": "phase"},
+                    "eventDate": "2024-01-02",
+                    "quantity": 7.5,
+                    "isProductive": True,
+                }
+                for guid in request.url.params.get_list("userGuids")
+            ],
+        )
+
+    async with severa_transport(api) as transport:
+        hours = await Client(transport).fetch_realized_workhours(DateRange(7))
+
+    assert paths == ["users", "workhours"]
+    assert sorted(hours["user"]) == USER_GUIDS
+
+
+class FakeSevera:
+    """
+    BaseClient stand-in serving users, business units and work contracts, and
+    keeping track of the concurrent work contract requests.
+    """
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.max_running = 0
+
+    async def __aenter__(self) -> "FakeSevera":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+    async def get_all(self, endpoint: str) -> list[dict]:
+        if endpoint == "users":
+            return users_json([str(i) for i in range(20)])
+
+        if endpoint == "businessunits":
+            return [
+                {"guid": "coded", "name": "Koodattu", "code": "KOO"},
+                {"guid": "uncoded", "name": "Koodaamaton", "code": None},
+            ]
+
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+
+        return [
+            {"startDate": "2024-01-01", "dailyHours": 7.5, "hourCost": {"amount": 50}}
+        ]
+
+
+@pytest.fixture
+def fake_severa(monkeypatch, dimension_store) -> FakeSevera:  # noqa: ARG001
+    """
+    The Severa of the clients created in the test, without a transport.
+    """
+    fake_severa = FakeSevera()
+    monkeypatch.setattr(severa_client, "BaseClient", lambda _=None: fake_severa)
+
+    return fake_severa
+
+
+@pytest.mark.asyncio
+async def test_businessunit_shortnames(fake_severa):  # noqa: ARG001
+    async with Client() as client:
+        # The names the KPIs and the UI group by
+        assert set(BUSINESSUNIT_SHORTNAMES.values()) == {
+            "TIE",
+            "BAD",
+            "HAL",
+            "JOH",
+            "LAH",
+            "SOV",
+            "VIS",
+        }
+        for guid in client.businessunits:
+            assert await client.businessunit_to_shortname(guid) in {"TIE", "BAD"}
+
+        assert await client.businessunit_to_shortname("coded") == "KOO"
+        assert await client.businessunit_to_shortname("uncoded") == "MUU"
+        assert await client.businessunit_to_shortname("unknown") == "MUU"
+
+
+@pytest.mark.asyncio
+async def test_work_contracts_are_fetched_at_most_8_at_a_time(fake_severa):
+    async with Client() as client:
+        info = await client.fetch_all_user_information()
+
+    assert len(info) == 2 * 20
+    assert fake_severa.max_running == 8
+
+
+def test_chunk_params():
+    chunks = BaseClient.chunk_params(
+        {"userGuids": ["a", "b", "a", "c"], "isActive": True, "ids": [1, 2]}, 2
+    )
+
+    assert chunks == [
+        {"userGuids": ["a", "b"], "isActive": True, "ids": [1, 2]},
+        {"userGuids": ["c"], "isActive": True, "ids": [1, 2]},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_long_guid_lists_are_chunked_and_deduplicated(
+    severa_transport, monkeypatch
+):
+    monkeypatch.setattr(BaseClient, "MAX_LIST_PARAM_LENGTH", 2)
+    requested: list[list[str]] = []
+
+    async def api(request: httpx.Request) -> httpx.Response:
+        guids = request.url.params.get_list("userGuids")
+        requested.append(guids)
+
+        # Every chunk also returns a shared record
+        return httpx.Response(
+            200, json=[{"guid": guid} for guid in guids] + [{"guid": "shared"}]
+        )
+
+    async with severa_transport(api) as transport:
+        records = await BaseClient(transport).get_all(
+            "activities", userGuids=["a", "b", "c", "d", "e"]
+        )
+
+    assert sorted(requested) == [["a", "b"], ["c", "d"], ["e"]]
+    assert [record["guid"] for record in records] == [
+        "a",
+        "b",
+        "shared",
+        "c",
+        "d",
+        "e",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fetch_by_month(severa_transport):
+    fetched: list[str] = []
+
+    async def fetch(span: DateRange) -> pd.DataFrame:
+        fetched.append(span["startDate"])
+
+        if span["startDate"] == "2024-02-01" and fetched.count("2024-02-01") == 1:
+            raise httpx.ConnectError("flaky")
+
+        # An allocation overlapping every month is returned for each of them
+        return pd.DataFrame({"internal_guid": [span["startDate"], "allocation"]})
+
+    get_month_cache().clear()
+    span = DateRange(arrow.get("2024-01-15"), arrow.get("2024-03-10"))
+
+    async with severa_transport() as transport:
+        result = await Client(transport).fetch_by_month("allocations", fetch, span)
+
+        assert sorted(fetched) == [
+            "2024-01-15",
+            "2024-02-01",
+            "2024-02-01",
+            "2024-03-01",
+        ]
+        assert sorted(result["internal_guid"]) == [
+            "2024-01-15",
+            "2024-02-01",
+            "2024-03-01",
+            "allocation",
+        ]
+
+        # The past months are cached for the other clients of the process
+        await Client(transport).fetch_by_month("allocations", fetch, span)
+        assert len(fetched) == 4
+
+        get_month_cache().clear()
+        await Client(transport).fetch_by_month("allocations", fetch, span)
+        assert len(fetched) == 7
+
+
 # class TestClient:
 #     @pytest.mark.asyncio
 #     async def test_hours_return_types(self):
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+import typing
+
+import pytest
+
+from src.logic.severa import dimensions
+from src.logic.severa.dimensions import DimensionStore
+
+BUSINESSUNITS = [
+    {"guid": "tie", "name": "Tietotekniikka", "code": "TIE"},
+    {"guid": "other", "name": "Muu yksikkö", "code": None},
+]
+
+
+class FakeClient:
+    def __init__(self, name: str = "client") -> None:
+        self.name = name
+        self.calls: list[str] = []
+
+    async def __aenter__(self) -> "FakeClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+    async def get_all(self, endpoint: str) -> list[dict]:
+        self.calls.append(endpoint)
+        await asyncio.sleep(0)
+
+        if endpoint == "businessunits":
+            return BUSINESSUNITS
+
+        return [{"guid": f"{self.name}-{endpoint}-{len(self.calls)}"}]
+
+
+class FakeBase:
+    """
+    Collection recording the threads of its calls, to check that the blocking
+    Mongo I/O isn't done on the event loop.
+    """
+
+    created: typing.ClassVar[list["FakeBase"]] = []
+
+    def __init__(self, base: str, collection: str, **client_options) -> None:
+        self.name = f"{base}.{collection}"
+        self.options = client_options
+        self.documents = [{"_id": "users", "fetched": time.time(), "items": []}]
+        self.threads: set[int] = set()
+        FakeBase.created.append(self)
+
+    def find_documents(self) -> list[dict]:
+        self.threads.add(threading.get_ident())
+        return self.documents
+
+    def replace_documents(self, documents: list[dict]) -> None:
+        self.threads.add(threading.get_ident())
+        self.documents.extend(documents)
+
+
+class TestDimensionStore:
+    @pytest.mark.asyncio
+    async def test_fetched_once(self):
+        store = DimensionStore()
+        client = FakeClient()
+
+        results = await asyncio.gather(*(store.users(client) for _ in range(3)))
+        await store.work_contracts(client, "user")
+        await store.work_contracts(client, "user")
+
+        assert client.calls == ["users", "users/user/workcontracts"]
+        assert all(result == [{"guid": "client-users-1"}] for result in results)
+
+    @pytest.mark.asyncio
+    async def test_stale_entries_are_refreshed_in_background(self, monkeypatch):
+        store = DimensionStore()
+        client = FakeClient()
+        background_client = FakeClient("background")
+        monkeypatch.setattr(dimensions, "BaseClient", lambda: background_client)
+
+        first = await store.users(client)
+        monkeypatch.setattr(dimensions, "MAX_AGE_SECONDS", -1)
+
+        assert await store.users(client) == first
+        await asyncio.sleep(0.01)
+
+        assert background_client.calls == ["users"]
+        assert await store.users(client) == [{"guid": "background-users-1"}]
+
+    @pytest.mark.asyncio
+    async def test_one_mongo_handle_off_the_event_loop(self, monkeypatch):
+        monkeypatch.setattr(dimensions, "Base", FakeBase)
+        monkeypatch.setattr(FakeBase, "created", [])
+        store = DimensionStore("base")
+        client = FakeClient()
+
+        await asyncio.gather(
+            store.users(client),
+            store.work_contracts(client, "a"),
+            store.work_contracts(client, "b"),
+        )
+
+        (db,) = FakeBase.created
+        assert db.name == "base.dimensions"
+        assert db.options == {"serverSelectionTimeoutMS": 2000}
+        assert [document["_id"] for document in db.documents] == [
+            "users",
+            "workcontracts/a",
+            "workcontracts/b",
+        ]
+        assert db.threads
+        assert threading.get_ident() not in db.threads
+        # The users were loaded from Mongo instead of fetched
+        assert client.calls == ["users/a/workcontracts", "users/b/workcontracts"]
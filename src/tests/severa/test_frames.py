@@ -0,0 +1,107 @@
+import pandas as pd
+
+from src.logic.severa.client import allocations_frame, workhours_frame
+from src.logic.severa.frames import FrameBuilder
+
+INVOICES = [
+    {
+        "guid": "invoice-1",
+        "date": "2024-01-02",
+        "totalExcludingTax": {"amount": 100.0},
+        "projects": [{"guid": "project-1"}, {"guid": "project-2"}],
+    },
+    {
+        "guid": "invoice-2",
+        "date": None,
+        "totalExcludingTax": None,
+        "projects": [],
+    },
+]
+
+
+def invoice_builder() -> FrameBuilder:
+    return FrameBuilder(
+        {
+            "internal_guid": ("guid", "string"),
+            "value": ("totalExcludingTax.amount", "float"),
+            "project": ("projects.0.guid", "string"),
+            "date": ("date", "datetime"),
+        },
+        constants={"id": "billing"},
+    )
+
+
+def test_columns_by_path():
+    frame = invoice_builder().extend(INVOICES).build()
+
+    assert frame["internal_guid"].tolist() == ["invoice-1", "invoice-2"]
+    assert frame["value"].iloc[0] == 100.0
+    assert frame["value"].isna().iloc[1]
+    assert frame["project"].iloc[0] == "project-1"
+    assert frame["project"].isna().iloc[1]
+    assert frame["date"].iloc[0] == pd.Timestamp("2024-01-02", tz="utc")
+    assert frame["id"].tolist() == ["billing", "billing"]
+
+
+def test_dtypes():
+    frame = invoice_builder().extend(INVOICES).build()
+
+    assert frame.dtypes.to_dict() == {
+        "internal_guid": "string",
+        "value": "Float64",
+        "project": "string",
+        "date": "datetime64[ns, UTC]",
+        "id": "string",
+    }
+
+
+def test_empty_frame_has_columns_and_dtypes():
+    builder = invoice_builder()
+    frame = builder.build()
+
+    assert not builder
+    assert frame.empty
+    assert list(frame.columns) == ["internal_guid", "value", "project", "date", "id"]
+    assert frame["date"].dtype == "datetime64[ns, UTC]"
+
+
+def test_workhours_and_allocations_frames():
+    workhours = workhours_frame(
+        [
+            {
+                "guid": "hour",
+                "eventDate": "2024-01-02",
+                "quantity": 7.5,
+                "isProductive": True,
+                "user": {"guid": "user"},
+                "project": {"guid": "project"},
+                "phase": {"guid": "phase"},
+            }
+        ]
+    )
+    allocations = allocations_frame(
+        [
+            {
+                "guid": "allocation",
+                "calculatedAllocationHours": 10,
+                "derivedStartDate": "2024-01-01",
+                "derivedEndDate": "2024-01-31",
+                "user": {"guid": "user"},
+                "project": {"guid": "project", "isInternal": True},
+                "phase": {"guid": "phase"},
+            }
+        ]
+    )
+
+    assert workhours.iloc[0].to_dict() == {
+        "user": "user",
+        "value": 7.5,
+        "date": pd.Timestamp("2024-01-02", tz="utc"),
+        "project": "project",
+        "phase": "phase",
+        "productive": True,
+        "internal_guid": "hour",
+        "id": "workhours",
+    }
+    assert not allocations["productive"].iloc[0]
+    assert allocations["end_date"].iloc[0] == pd.Timestamp("2024-01-31", tz="utc")
@@ -0,0 +1,138 @@
+import asyncio
+
+import arrow
+import httpx
+import pytest
+
+from src.logic.severa import mirror
+from src.logic.severa.mirror import MirrorClient, MirrorStore
+from src.util.daterange import DateRange
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents: dict[str, dict] = {}
+        self.writes: list[list[str]] = []
+
+    def find_documents(self, query=None, projection=None):  # noqa: ARG002
+        return [
+            doc
+            for key, doc in self.documents.items()
+            if "_id" not in (query or {}) or query["_id"] == key
+        ]
+
+    def replace_documents(self, documents):
+        self.writes.append([doc["_id"] for doc in documents])
+        self.documents |= {doc["_id"]: doc for doc in documents}
+
+    def delete(self, query):
+        assert list(query) == ["_sync"]
+        keep = query["_sync"]["$ne"]
+        self.documents = {k: v for k, v in self.documents.items() if v["_sync"] == keep}
+
+
+class FakeStore(MirrorStore):
+    def __init__(self):
+        super().__init__()
+        self.collections: dict[str, FakeCollection] = {}
+
+    def _db(self, collection):
+        return self.collections.setdefault(collection, FakeCollection())
+
+
+def workhours_api(requests: list[httpx.Request], workhours: list[dict]):
+    async def api(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=workhours)
+
+    return api
+
+
+@pytest.mark.asyncio
+async def test_sync_moves_the_watermark(severa_transport):
+    requests: list[httpx.Request] = []
+    workhours = [{"guid": "a", "eventDate": "2024-01-02"}]
+    store = FakeStore()
+
+    async with severa_transport(workhours_api(requests, workhours)) as transport:
+        client = MirrorClient(transport, store)
+
+        assert not store.is_fresh("workhours")
+        assert await client.sync("workhours") == 1
+        assert store.is_fresh("workhours")
+
+        # The first sync fetches everything
+        assert "changedSince" not in requests[0].url.params
+
+        workhours[:] = [{"guid": "b", "eventDate": "2024-01-03"}]
+        await client.sync("workhours")
+
+        second_since = arrow.get(requests[1].url.params["changedSince"])
+        assert second_since > arrow.utcnow().shift(minutes=-10)
+        assert set(store.collections["workhours"].documents) == {"a", "b"}
+
+        # Full sync drops the entities that are gone from Severa
+        await client.sync("workhours", full=True)
+        assert "changedSince" not in requests[2].url.params
+        assert set(store.collections["workhours"].documents) == {"b"}
+
+    document = store.collections["workhours"].documents["b"]
+    assert document["_date"] == arrow.get(2024, 1, 3).datetime
+    # The fetched JSON is shared with other readers and left as it was
+    assert workhours == [{"guid": "b", "eventDate": "2024-01-03"}]
+
+
+@pytest.mark.asyncio
+async def test_freshness_is_checked_once_per_client(severa_transport):
+    store = FakeStore()
+    checks: list[str] = []
+    is_fresh = store.is_fresh
+
+    def count_checks(name: str) -> bool:
+        checks.append(name)
+        return is_fresh(name)
+
+    store.is_fresh = count_checks
+    store.find = lambda name, query: [{"guid": name}]  # noqa: ARG005
+    store.finish("workhours", "sync", arrow.utcnow())
+
+    async with severa_transport() as transport:
+        client = MirrorClient(transport, store)
+
+        results = [
+            await client._workhours_json(
+                ["u"], DateRange(arrow.get(2024, 1, 1), arrow.get(2024, 1, 31))
+            )
+            for _ in range(3)
+        ]
+
+    assert checks == ["workhours"]
+    assert results == [[{"guid": "workhours"}]] * 3
+
+
+@pytest.mark.asyncio
+async def test_sync_writes_in_batches(severa_transport, monkeypatch):
+    monkeypatch.setattr(mirror, "SYNC_BATCH_SIZE", 2)
+    workhours = [{"guid": guid, "eventDate": "2024-01-02"} for guid in "abcde"]
+    store = FakeStore()
+
+    async with severa_transport(workhours_api([], workhours)) as transport:
+        assert await MirrorClient(transport, store).sync("workhours") == 5
+
+    assert store.collections["workhours"].writes == [["a", "b"], ["c", "d"], ["e"]]
+
+
+@pytest.mark.asyncio
+async def test_syncs_of_an_entity_take_turns(severa_transport):
+    requests: list[httpx.Request] = []
+    store = FakeStore()
+    workhours = [{"guid": "a", "eventDate": "2024-01-02"}]
+
+    async with severa_transport(workhours_api(requests, workhours)) as transport:
+        client = MirrorClient(transport, store)
+
+        await asyncio.gather(client.sync("workhours"), client.sync("workhours"))
+
+    # The second sync started from the watermark of the first one
+    assert "changedSince" not in requests[0].url.params
+    assert "changedSince" in requests[1].url.params
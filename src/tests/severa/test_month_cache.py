@@ -0,0 +1,26 @@
+import arrow
+import pandas as pd
+
+from src.logic.severa import month_cache
+from src.logic.severa.month_cache import MonthCache
+from src.util.daterange import DateRange
+
+
+class TestMonthCache:
+    def test_current_months_expire_sooner(self, monkeypatch):
+        now = 1000.0
+        monkeypatch.setattr(month_cache.time, "monotonic", lambda: now)
+
+        cache = MonthCache()
+        past = DateRange(arrow.get("2024-01-01"), arrow.get("2024-01-31"))
+        current = DateRange(arrow.utcnow().floor("month"), arrow.utcnow().ceil("month"))
+        cache.put(("past",), past, pd.DataFrame({"value": [1]}))
+        cache.put(("current",), current, pd.DataFrame({"value": [2]}))
+
+        now += month_cache.CURRENT_MONTH_MAX_AGE_SECONDS + 1
+        assert cache.get(("past",)) is not None
+        assert cache.get(("current",)) is None
+
+        now += month_cache.PAST_MONTH_MAX_AGE_SECONDS
+        assert cache.get(("past",)) is None
+        assert len(cache) == 0
@@ -0,0 +1,102 @@
+import asyncio
+import datetime
+import threading
+import typing
+
+import pytest
+
+from src.logic.severa import project_cache, projections
+from src.logic.severa.project_cache import ProjectCache
+
+
+def project(updated: datetime.datetime | None) -> projections.Project:
+    return projections.Project.model_construct(
+        guid="project", lastUpdatedDateTime=updated
+    )
+
+
+class FakeBase:
+    """
+    Collection recording its handles and the threads of its calls.
+    """
+
+    created: typing.ClassVar[list["FakeBase"]] = []
+
+    def __init__(self, base: str, collection: str, **client_options) -> None:
+        self.name = f"{base}.{collection}"
+        self.options = client_options
+        self.documents: list[dict] = []
+        self.threads: set[int] = set()
+        self.fail = False
+        FakeBase.created.append(self)
+
+    def find_documents(self) -> list[dict]:
+        self.threads.add(threading.get_ident())
+        return self.documents
+
+    def replace_documents(self, documents: list[dict]) -> None:
+        self.threads.add(threading.get_ident())
+
+        if self.fail:
+            raise project_cache.PyMongoError("unavailable")
+
+        self.documents.extend(documents)
+
+
+class TestProjectCache:
+    @pytest.mark.asyncio
+    async def test_reused_until_project_changes(self):
+        cache = ProjectCache()
+        first = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+
+        assert await cache.get("phases", project(first)) is None
+        cache.put("phases", project(first), [{"guid": "phase"}])
+
+        assert await cache.get("phases", project(first)) == [{"guid": "phase"}]
+        assert await cache.get("projectforecasts", project(first)) is None
+        assert await cache.get("phases", project(first.replace(day=2))) is None
+        assert (cache.hits, cache.misses) == (1, 3)
+
+    @pytest.mark.asyncio
+    async def test_not_cached_without_timestamp(self):
+        cache = ProjectCache()
+
+        cache.put("phases", project(None), [{"guid": "phase"}])
+
+        assert await cache.get("phases", project(None)) is None
+
+    @pytest.mark.asyncio
+    async def test_save_without_database(self):
+        cache = ProjectCache()
+        cache.put("phases", project(datetime.datetime(2024, 1, 1)), [])
+
+        await cache.save()
+
+        assert await cache.get("phases", project(datetime.datetime(2024, 1, 1))) == []
+
+    @pytest.mark.asyncio
+    async def test_one_mongo_handle_off_the_event_loop(self, monkeypatch):
+        monkeypatch.setattr(project_cache, "Base", FakeBase)
+        monkeypatch.setattr(FakeBase, "created", [])
+        cache = ProjectCache("base")
+        updated = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+
+        await asyncio.gather(*(cache.get("phases", project(updated)) for _ in range(3)))
+        cache.put("phases", project(updated), [{"guid": "phase"}])
+        (db,) = FakeBase.created
+        db.fail = True
+        await cache.save()
+
+        assert db.documents == []
+
+        db.fail = False
+        await cache.save()
+        await cache.save()
+
+        assert FakeBase.created == [db]
+        assert db.name == "base.project_cache"
+        assert db.options == {"serverSelectionTimeoutMS": 2000}
+        # The entry that failed to save was saved by the next save, and only once
+        assert [document["_id"] for document in db.documents] == ["phases/project"]
+        assert db.threads
+        assert threading.get_ident() not in db.threads
@@ -0,0 +1,48 @@
+import datetime
+
+import pydantic
+import pytest
+
+from src.config import settings
+from src.logic.severa import projections
+
+WORKHOUR = {
+    "guid": "hour",
+    "eventDate": "2024-01-02",
+    "quantity": 7.5,
+    "isProductive": True,
+    "user": {"guid": "user", "firstName": "Matti"},
+    "project": {"guid": "project", "name": "Project"},
+    "phase": {"guid": "phase"},
+    "description": "Not part of the projection",
+}
+
+
+def test_unused_fields_are_dropped():
+    hour = projections.parse(projections.WorkHour, WORKHOUR)
+
+    assert hour.eventDate == datetime.date(2024, 1, 2)
+    assert hour.project.guid == "project"
+    assert "description" not in hour.model_dump()
+
+
+def test_parse_all():
+    hours = projections.parse_all(projections.WorkHour, [WORKHOUR] * 3)
+
+    assert [hour.quantity for hour in hours] == [7.5] * 3
+
+
+def test_projections_are_subsets_of_the_full_models():
+    for model, full_model in projections.FULL_MODELS.items():
+        assert set(model.model_fields) <= set(full_model.model_fields), model
+
+
+def test_full_validation_is_opt_in(monkeypatch):
+    # The full model requires the guid of the user
+    without_user_guid = WORKHOUR | {"user": {"firstName": "Matti"}}
+
+    assert projections.parse_all(projections.WorkHour, [without_user_guid])
+
+    monkeypatch.setattr(settings, "severa_validate_full_models", True)
+    with pytest.raises(pydantic.ValidationError):
+        projections.parse_all(projections.WorkHour, [without_user_guid])
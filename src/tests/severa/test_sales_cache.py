@@ -0,0 +1,64 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from src.logic.severa.sales_cache import SalesCache
+
+
+def counting_fetch(calls: list[int], delay: float = 0.0):
+    async def fetch() -> tuple[pd.DataFrame, dict[str, list]]:
+        calls.append(len(calls))
+        await asyncio.sleep(delay)
+        return pd.DataFrame({"value": [len(calls)]}), {"Vaihe puuttuu": []}
+
+    return fetch
+
+
+class TestSalesCache:
+    @pytest.mark.asyncio
+    async def test_concurrent_refreshes_are_joined(self):
+        cache = SalesCache()
+        calls: list[int] = []
+
+        entries = await asyncio.gather(
+            *(cache.refresh((), counting_fetch(calls, 0.01)) for _ in range(3))
+        )
+
+        assert len(calls) == 1
+        assert {entry.generation for entry in entries} == {1}
+        assert cache.peek(()) is entries[0]
+        assert not cache.is_refreshing(())
+
+    @pytest.mark.asyncio
+    async def test_revalidate_keeps_serving_the_old_value(self):
+        cache = SalesCache()
+        calls: list[int] = []
+
+        first = await cache.refresh(("keyword",), counting_fetch(calls))
+        cache.revalidate(("keyword",), counting_fetch(calls, 0.01))
+        cache.revalidate(("keyword",), counting_fetch(calls, 0.01))
+
+        assert cache.peek(("keyword",)) is first
+        assert cache.is_refreshing(("keyword",))
+
+        await asyncio.sleep(0.05)
+
+        assert len(calls) == 2
+        assert cache.peek(("keyword",)).generation == 2
+        assert cache.peek(()) is None
+
+    @pytest.mark.asyncio
+    async def test_failed_revalidation_keeps_the_old_value(self):
+        cache = SalesCache()
+        first = await cache.refresh((), counting_fetch([]))
+
+        async def failing_fetch():
+            raise ValueError("Severa is down")
+
+        cache.revalidate((), failing_fetch)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        assert cache.peek(()) is first
+        assert not cache.is_refreshing(())
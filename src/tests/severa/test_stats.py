@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from src.logic.severa.stats import (
+    CallStats,
+    LatencyHistogram,
+    current_job,
+    endpoint_template,
+    job,
+)
+
+GUID = "04a8c06b-bddb-ed4f-586a-0a2098587633"
+
+
+def test_endpoint_template():
+    assert endpoint_template(f"users/{GUID}/workhours") == "users/{guid}/workhours"
+    assert endpoint_template("/salescases/12") == "salescases/{id}"
+    assert endpoint_template("users") == "users"
+
+
+def test_nested_jobs():
+    with job("database-save"):
+        with job("hours") as name:
+            assert name == "database-save/hours"
+        assert current_job.get() == "database-save"
+
+
+@pytest.mark.asyncio
+async def test_calls_are_attributed_to_the_job():
+    call_stats = CallStats()
+
+    async def fetch(name: str, count: int):
+        with job(name):
+            for _ in range(count):
+                await asyncio.sleep(0)
+                call_stats.record_call(f"users/{GUID}/workhours", 0.2, 100)
+
+    await asyncio.gather(fetch("a", 3), fetch("b", 1))
+    call_stats.record_coalesced("users")
+
+    summary = call_stats.summary()
+    assert summary["a"]["users/{guid}/workhours"]["calls"] == 3
+    assert summary["a"]["users/{guid}/workhours"]["bytes"] == 300
+    assert summary["b"]["users/{guid}/workhours"]["calls"] == 1
+    assert summary["unattributed"]["users"]["coalesced"] == 1
+
+    call_stats.reset("a")
+    assert "a" not in call_stats.summary()
+    assert "users/{guid}/workhours" in call_stats.format_summary("b")
+
+
+def test_histogram_quantiles():
+    histogram = LatencyHistogram()
+    for seconds in [0.01] * 90 + [3.0] * 10:
+        histogram.add(seconds)
+
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 0.05
+    assert histogram.quantile(0.95) == 3.0
+    assert histogram.as_dict()["max"] == 3.0
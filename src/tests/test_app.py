@@ -0,0 +1,60 @@
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from loguru import logger
+
+from src.logic.severa import base_client
+from src.ui import routes
+
+
+@pytest.fixture
+def app(monkeypatch):
+    import main
+
+    # main logs errors to Slack, keep the tests off it
+    logger.remove()
+    logger.add(sys.stderr)
+
+    async def run_cronjob(*args) -> None:
+        pass
+
+    monkeypatch.setattr(routes, "run_cronjob", run_cronjob)
+
+    return main.app
+
+
+@pytest.fixture
+def transports(app) -> list[base_client.Transport | None]:
+    """
+    The transports handed to the requests of a route added for the test.
+    """
+    transports: list[base_client.Transport | None] = []
+
+    async def severa_transport(transport: routes.SeveraTransportDep) -> dict:
+        transports.append(transport)
+        return {"open": transport is not None and transport.is_open}
+
+    app.add_api_route("/test/severa_transport", severa_transport)
+    route = app.router.routes[-1]
+
+    yield transports
+
+    app.router.routes.remove(route)
+
+
+class TestLifespan:
+    def test_requests_share_the_transport_of_the_lifespan(self, app, transports):
+        with TestClient(app) as client:
+            shared = base_client.get_shared_transport()
+
+            for _ in range(2):
+                response = client.get("/test/severa_transport")
+
+                assert response.json() == {"open": True}
+
+            assert shared is not None
+            assert transports == [shared, shared]
+
+        assert not shared.is_open
+        assert base_client.get_shared_transport() is None
@@ -0,0 +1,245 @@
+import asyncio
+
+import arrow
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.logic.kpi import kpi
+from src.logic.kpi.cube import KpiCube, KpiCubeCache
+from src.util.daterange import DateRange
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(
+        {
+            "user": ["a", "a", "b", "b", "c", None],
+            "first_name": ["Aino", "Aino", "Bertta", "Bertta", "Cecilia", "Eetu"],
+            "business_unit_name": ["TIE", "TIE", "TIE", "TIE", "MUU", "TIE"],
+            "id": ["workhours", "workhours", "billing", "workhours", "workhours", "x"],
+            "date": pd.to_datetime(
+                [
+                    "2024-01-01",
+                    "2024-01-01",
+                    "2024-01-03",
+                    "2024-01-09",
+                    "2024-02-01",
+                    "2024-01-01",
+                ],
+                utc=True,
+            ),
+            "value": [1.0, 2.0, 10.0, 4.0, 8.0, 100.0],
+        }
+    )
+
+
+@pytest.fixture
+def cube(data):
+    return KpiCube.from_frame(data)
+
+
+class TestKpiCube:
+    def test_from_frame_matches_pivot_table(self, data, cube):
+        assert cube.shape == (2, 3, 32)
+        assert list(cube.metrics) == ["billing", "workhours"]
+        assert list(cube.users["business_unit_name"]) == ["TIE", "TIE", "MUU"]
+
+        pivoted = data.dropna(subset=["user"]).pivot_table(
+            index="date", columns="id", values="value", aggfunc="sum"
+        )
+        by_date = cube.by_date()
+
+        assert (by_date.loc[pivoted.index, pivoted.columns] == pivoted.fillna(0)).all(
+            axis=None
+        )
+        assert by_date.to_numpy().sum() == 25.0
+
+    def test_select(self, cube):
+        january = DateRange(arrow.get("2024-01-02"), arrow.get("2024-01-31"))
+        selected = cube.select(january, business_units=["TIE"])
+
+        assert list(selected.users.index) == ["a", "b"]
+        assert len(selected.dates) == 30
+        assert selected.by_user().to_dict("index") == {
+            "a": {"billing": 0.0, "workhours": 0.0},
+            "b": {"billing": 10.0, "workhours": 4.0},
+        }
+
+        selected = cube.select(users=["a", "c"], metrics=["workhours", "unknown"])
+
+        assert list(selected.metrics) == ["workhours"]
+        assert selected.by_user()["workhours"].to_dict() == {"a": 3.0, "c": 8.0}
+
+    def test_rollup(self, cube):
+        weekly = cube.rollup("W")
+        monthly = cube.rollup("M")
+
+        assert weekly.dates[0] == pd.Timestamp("2024-01-01", tz="UTC")
+        assert list(weekly.by_date()["workhours"][:2]) == [3.0, 4.0]
+        assert list(monthly.dates) == list(
+            pd.to_datetime(["2024-01-01", "2024-02-01"], utc=True)
+        )
+        assert monthly["workhours"].tolist() == [[3.0, 0.0], [4.0, 0.0], [0.0, 8.0]]
+        np.testing.assert_array_equal(
+            monthly.by_user().to_numpy(), cube.by_user().to_numpy()
+        )
+
+    def test_frame(self, cube):
+        frame = cube.rollup("M").frame()
+
+        assert len(frame) == 4
+        assert frame[frame.user == "b"][["id", "value"]].to_numpy().tolist() == [
+            ["billing", 10.0],
+            ["workhours", 4.0],
+        ]
+        assert set(frame.columns) == {
+            "user",
+            "first_name",
+            "business_unit_name",
+            "id",
+            "date",
+            "value",
+        }
+
+    def test_empty(self, data):
+        cube = KpiCube.from_frame(data.iloc[:0])
+
+        assert cube.shape == (0, 0, 0)
+        assert cube.rollup("W").frame().empty
+        assert cube.by_user().empty
+
+
+class TestKpiCubeCache:
+    @pytest.mark.asyncio
+    async def test_cube_is_built_once_per_generation(self, cube):
+        cache = KpiCubeCache()
+        builds: list[int] = []
+
+        async def build() -> KpiCube:
+            builds.append(cache.generation)
+            await asyncio.sleep(0.01)
+            return cube
+
+        results = await asyncio.gather(*(cache.get("span", build) for _ in range(3)))
+        await cache.get("span", build)
+
+        assert builds == [0]
+        assert all(result is cube for result in results)
+
+        cache.invalidate()
+        await cache.get("span", build)
+        await cache.get("other span", build)
+
+        assert builds == [0, 1, 1]
+        assert len(cache) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_build_is_tried_again(self, cube):
+        cache = KpiCubeCache()
+        builds: list[int] = []
+
+        async def build() -> KpiCube:
+            builds.append(len(builds))
+            if len(builds) == 1:
+                raise ValueError("Severa is down")
+            return cube
+
+        with pytest.raises(ValueError, match="Severa is down"):
+            await cache.get("span", build)
+
+        assert await cache.get("span", build) is cube
+        assert builds == [0, 1]
+
+
+@pytest.fixture
+def kpi_cube(monkeypatch):
+    days = pd.to_datetime(["2024-01-01", "2024-01-02"], utc=True)
+    data = pd.DataFrame(
+        {
+            "user": ["a"] * 8 + ["b"] * 2,
+            "first_name": ["Aino"] * 8 + ["Bertta"] * 2,
+            "id": [
+                "workhours",
+                "workhours_productive",
+                "absences",
+                "maximum",
+                "maximum",
+                "hour_cost",
+                "hour_cost",
+                "billing",
+                "workhours",
+                "workhours_unproductive",
+            ],
+            "date": days[[0, 0, 0, 0, 1, 0, 1, 1, 0, 0]],
+            "value": [6.0, 6.0, 1.5, 7.5, 7.5, 40.0, 40.0, 1000.0, 3.0, 3.0],
+        }
+    )
+    cube = KpiCube.from_frame(data)
+
+    async def load_kpi_cube(span, transport=None):  # noqa: ARG001
+        return cube
+
+    monkeypatch.setattr(kpi, "load_kpi_cube", load_kpi_cube)
+    # The first day is realized, the second one is not
+    monkeypatch.setattr(kpi.arrow, "utcnow", lambda: arrow.get("2024-01-01T12:00"))
+
+
+class TestKpiTotals:
+    @pytest.mark.asyncio
+    async def test_hours_totals(self, kpi_cube):  # noqa: ARG002
+        totals = await kpi.hours_totals(
+            arrow.get("2024-01-01"), arrow.get("2024-01-02")
+        )
+
+        assert list(totals.columns) == [
+            "absences",
+            "maximum",
+            "workhours, unproductive",
+            "workhours, productive",
+        ]
+        assert totals.to_dict("index") == {
+            "Aino": {
+                "absences": 1.5,
+                "maximum": 15.0,
+                "workhours, productive": 6.0,
+                "workhours, unproductive": 0.0,
+            },
+            "Bertta": {
+                "absences": 0.0,
+                "maximum": 0.0,
+                "workhours, productive": 0.0,
+                "workhours, unproductive": 3.0,
+            },
+            "All": {
+                "absences": 1.5,
+                "maximum": 15.0,
+                "workhours, productive": 6.0,
+                "workhours, unproductive": 3.0,
+            },
+        }
+
+    @pytest.mark.asyncio
+    async def test_sales_margin_totals(self, kpi_cube):  # noqa: ARG002
+        totals = await kpi.sales_margin_totals(
+            arrow.get("2024-01-01"), arrow.get("2024-01-02")
+        )
+
+        # Realized hours on the first day, the maximum on the second one
+        aino_cost = (6.0 + 1.5) * 40.0 + 7.5 * 40.0
+
+        assert totals.to_dict("records") == [
+            {
+                "username": "Aino",
+                "billing": 1000.0,
+                "cost": aino_cost,
+                "All": 1000.0 + aino_cost,
+            },
+            {"username": "Bertta", "billing": 0.0, "cost": 0.0, "All": 0.0},
+            {
+                "username": "All",
+                "billing": 1000.0,
+                "cost": aino_cost,
+                "All": 1000.0 + aino_cost,
+            },
+        ]
@@ -46,3 +46,14 @@ class TestDateRange:
         a, b = span.cut(after)
         assert bool(b) == False
         assert a == span
+
+    def test_months(self):
+        span = DateRange(arrow.get("2023-01-15"), arrow.get("2023-03-10"))
+
+        assert span.months() == [
+            DateRange(arrow.get("2023-01-15"), arrow.get("2023-01-31")),
+            DateRange(arrow.get("2023-02-01"), arrow.get("2023-02-28")),
+            DateRange(arrow.get("2023-03-01"), arrow.get("2023-03-10")),
+        ]
+        assert sum(len(month) for month in span.months()) == len(span)
+        assert DateRange().months() == []
@@ -0,0 +1,99 @@
+import arrow
+import numpy as np
+import pandas as pd
+import pytest
+from pytest import approx
+
+from src.logic.processing import ProcessHours
+from src.util.intervals import aggregate
+from src.util.unravel import unravel
+
+START = pd.Timestamp("2023-12-01", tz="UTC")
+END = pd.Timestamp("2024-01-31", tz="UTC")
+
+
+@pytest.fixture
+def spans():
+    return pd.DataFrame(
+        {
+            "user": ["a", "a", "b", "b", "b"],
+            "id": ["absences", "workhours", "workhours", "workhours", "workhours"],
+            "start_date": pd.to_datetime(
+                ["2023-12-22", "2023-11-15", "2024-01-30", "2024-01-06", None],
+                utc=True,
+            ),
+            "end_date": pd.to_datetime(
+                ["2023-12-27", "2024-03-01", "2024-01-30", "2024-01-07", "2024-01-01"],
+                utc=True,
+            ),
+            "value": [6.0, 100.0, 8.0, 16.0, 1.0],
+        }
+    )
+
+
+def unravel_and_sum(data: pd.DataFrame, freq: str, **masks) -> pd.DataFrame:
+    unraveled = unravel(data, **masks)
+    unraveled = unraveled[unraveled.date.between(START, END)].copy()
+    unraveled["date"] = (
+        unraveled["date"].dt.tz_localize(None).dt.to_period(freq).dt.start_time
+    ).dt.tz_localize("UTC")
+
+    return unraveled.groupby(["user", "id", "date"])["value"].sum().reset_index()
+
+
+@pytest.mark.parametrize("freq", ["D", "W", "M"])
+def test_aggregate_equals_unravel_and_sum(spans, freq):
+    masks = {
+        "zero_on_holidays": (spans.id == "absences").to_numpy(),
+        "scale_with_days": (spans.id == "absences").to_numpy(),
+        "scale_with_workdays": (spans.id == "workhours").to_numpy(),
+    }
+    expected = unravel_and_sum(spans, freq, **masks)
+    result = aggregate(spans, ["user", "id"], START, END, freq, **masks)
+
+    assert result[["user", "id", "date"]].equals(expected[["user", "id", "date"]])
+    assert list(result["value"]) == approx(list(expected["value"]))
+
+
+def test_aggregate_infinite_and_dated_values(spans):
+    # The one day span has no working days, and no days to scale with
+    spans["date"] = pd.to_datetime([None, None, None, None, "2024-01-01"], utc=True)
+    result = aggregate(
+        spans,
+        ["user"],
+        START,
+        END,
+        "M",
+        spans=spans.date.isna(),
+        zero_on_holidays=spans.id == "absences",
+        scale_with_days=True,
+    )
+
+    assert list(result["user"]) == ["a", "a", "b"]
+    assert list(result["value"]) == approx(
+        [6.0 / 5 * 2 + 100.0 / 107 * 31, 100.0 / 107 * 31, np.inf]
+    )
+
+
+def test_aggregate_empty(spans):
+    later = pd.Timestamp("2025-01-01", tz="UTC")
+    result = aggregate(spans, ["user"], later, later + pd.Timedelta(days=1))
+
+    assert result.empty
+    assert list(result.columns) == ["user", "date", "value"]
+
+
+def test_process_hours_totals(spans):
+    spans["date"] = pd.NaT
+    start = arrow.get("2023-12-01").datetime
+    end = arrow.get("2024-01-31").datetime
+
+    processed = ProcessHours(spans.copy()).process(start, end).unraveled
+    expected = processed.groupby(["user", "id", "date"], observed=True)["value"].sum()
+
+    totals = ProcessHours(spans.copy()).totals(start, end, ["user", "id"]).unraveled
+
+    assert len(totals) == len(expected)
+    assert list(totals.set_index(["user", "id", "date"])["value"]) == approx(
+        list(expected)
+    )
@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import arrow
+import numpy as np
+import pandas as pd
+import pytest
+from pytest import approx
+
+from src.logic.processing import ProcessBilling
+from src.util.unravel import count_days, unravel, utc_days
+
+
+@pytest.fixture
+def christmas():
+    # Friday to Wednesday, with the weekend and two holidays in between
+    return pd.DataFrame(
+        {
+            "id": ["christmas", "missing"],
+            "start_date": pd.to_datetime(["2023-12-22", None], utc=True),
+            "end_date": pd.to_datetime(["2023-12-27", "2023-12-27"], utc=True),
+            "value": [10.0, 10.0],
+        }
+    )
+
+
+def test_count_days(christmas):
+    start = utc_days(christmas["start_date"])
+    end = utc_days(christmas["end_date"])
+
+    assert list(count_days(start, end)) == [5, 0]
+
+
+def test_unravel(christmas):
+    result = unravel(christmas)
+
+    assert len(result) == 6
+    assert (result["id"] == "christmas").all()
+    assert result["date"].dt.tz is not None
+    assert list(result["date"].dt.day) == [22, 23, 24, 25, 26, 27]
+    assert list(result["value"]) == [10.0] * 6
+
+
+def test_unravel_scaled_to_workdays(christmas):
+    result = unravel(christmas, zero_on_holidays=True, scale_with_workdays=True)
+
+    assert list(result["value"]) == approx([5.0, 0, 0, 0, 0, 5.0])
+    assert result["value"].sum() == approx(10.0)
+
+
+def test_unravel_masks(christmas):
+    data = pd.concat([christmas.iloc[:1]] * 2, ignore_index=True)
+    result = unravel(
+        data,
+        zero_on_holidays=np.array([False, True]),
+        scale_with_days=pd.Series([True, False]),
+    )
+
+    assert list(result["value"][:6]) == approx([2.0] * 6)
+    assert list(result["value"][6:]) == approx([10.0, 0, 0, 0, 0, 10.0])
+
+
+def test_unravel_empty(christmas):
+    result = unravel(christmas.iloc[1:], scale_with_workdays=True)
+
+    assert result.empty
+    assert list(result.columns) == [*christmas.columns, "date"]
+
+
+def test_unravel_within_bounds(christmas):
+    earliest = pd.Series(
+        pd.to_datetime(["2023-12-24 12:00", "2023-01-01 00:00"], utc=True)
+    )
+    latest = pd.Timestamp("2023-12-26", tz="UTC")
+
+    masks = {"zero_on_holidays": True, "scale_with_workdays": True}
+    everything = unravel(christmas, **masks)
+    result = unravel(christmas, earliest=earliest, latest=latest, **masks)
+
+    assert list(result["date"].dt.day) == [25, 26]
+    assert result.equals(everything.iloc[3:5].reset_index(drop=True))
+    assert unravel(christmas, latest=pd.Timestamp("2023-01-01", tz="UTC")).empty
+
+
+def test_process_billing_unravels_only_the_span():
+    data = pd.DataFrame(
+        {
+            "user": "user",
+            "id": "billing",
+            "value": [540.0, 10.0],
+            "start_date": pd.to_datetime(["2023-06-01", "2020-01-01"], utc=True),
+            "end_date": pd.to_datetime(["2024-11-21", "2020-01-31"], utc=True),
+            "forecast_date": pd.Timestamp("2023-06-01", tz="UTC"),
+        }
+    )
+    start = arrow.get("2023-12-01").datetime
+    end = arrow.get("2023-12-31").datetime
+
+    expected = unravel(data, ["value"], zero_on_holidays=True, scale_with_workdays=True)
+    expected = expected[expected.date.between(start, end)]
+
+    with patch("arrow.utcnow", return_value=arrow.get("2023-12-15")):
+        result = ProcessBilling(data.copy()).process(start, end).unraveled
+
+    assert list(result["date"]) == list(expected["date"].iloc[14:])
+    assert list(result["value"]) == approx(list(expected["value"].iloc[14:]))
@@ -0,0 +1,80 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from workalendar.europe import Finland
+
+from src.util.workdays import WorkdayCalendar
+
+
+def days(*values: str | None) -> np.ndarray:
+    return np.array(values, dtype="datetime64[D]")
+
+
+def test_is_working_day():
+    calendar = WorkdayCalendar(2023, 2023)
+
+    assert list(calendar.is_working_day(days("2023-12-22", "2023-12-25", None))) == [
+        True,
+        False,
+        False,
+    ]
+    assert calendar.is_working_day(days()).shape == (0,)
+
+
+def test_count_matches_workalendar():
+    calendar = WorkdayCalendar(2023, 2024)
+    rng = np.random.default_rng(0)
+
+    start = np.datetime64("2023-01-01") + rng.integers(0, 700, 200)
+    end = start + rng.integers(-30, 90, 200)
+
+    expected = [
+        Finland().get_working_days_delta(
+            s.astype(datetime.date), e.astype(datetime.date), include_start=True
+        )
+        for s, e in zip(start, end, strict=True)
+        if s != e
+    ]
+
+    assert list(calendar.count(start, end)[start != end]) == expected
+    assert list(
+        calendar.count(days("2023-12-22", None), days("2023-12-27", "2023-12-27"))
+    ) == [2, 0]
+
+
+def test_range_is_widened():
+    calendar = WorkdayCalendar(2023, 2023)
+
+    assert list(calendar.count(days("2020-12-31"), days("2030-01-02"))) == [
+        Finland().get_working_days_delta(
+            datetime.date(2020, 12, 31), datetime.date(2030, 1, 2), include_start=True
+        )
+    ]
+    assert calendar.years == (2020, 2030)
+
+
+def test_concurrent_lookups():
+    calendar = WorkdayCalendar(2023, 2023)
+    christmases = [days(f"{year}-12-25", f"{year}-12-27") for year in range(2000, 2040)]
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(calendar.is_working_day, christmases))
+
+    assert all(not result[0] for result in results)
+    assert calendar.years == (2000, 2039)
+
+
+def test_days_outside_the_limits():
+    calendar = WorkdayCalendar(2023, 2023, min_year=2022, max_year=2024)
+
+    assert list(
+        calendar.is_working_day(days("9999-12-31", "1000-01-02", "2024-12-31"))
+    ) == [False, False, True]
+    assert list(
+        calendar.count(
+            days("2024-12-30", "1000-01-01", "2025-01-01", "1000-01-01"),
+            days("9999-12-31", "2022-01-04", "9999-12-31", "1001-01-01"),
+        )
+    ) == [2, 2, 0, 0]
+    assert calendar.years == (2022, 2024)
@@ -24,9 +24,11 @@ import src.util.stable_hash
 from src.config import settings
 from src.database.database import Base
 from src.logic.kpi import kpi
+from src.logic.kpi.cube import get_kpi_cube_cache
 from src.logic.pressure.pressure import fetch_pressure
-from src.logic.severa import base_client
+from src.logic.severa import base_client, stats
 from src.logic.severa.client import Client as SeveraClient
+from src.logic.severa.mirror import MirrorClient
 from src.logic.slack.client import Client as SlackClient
 from src.logic.slack.client import (
     send_weekly_slack_update,
@@ -51,6 +53,18 @@ def pre(text: str, request: Request):
     )
 
 
+def get_severa_transport(request: Request) -> base_client.Transport | None:
+    """
+    The pooled Severa transport opened in the app lifespan.
+    """
+    return getattr(request.app.state, "severa_transport", None)
+
+
+SeveraTransportDep = Annotated[
+    base_client.Transport | None, Depends(get_severa_transport)
+]
+
+
 @default_router.get("/favicon.ico", include_in_schema=False)
 async def favicon():
     return FileResponse("favicon.ico")
@@ -94,7 +108,8 @@ async def save_sparse():
             t0 = time.monotonic()
 
             try:
-                data = await kpi_iter.get(client, kpi_iter.span)
+                with stats.job(kpi_iter.id):
+                    data = await kpi_iter.get(client, kpi_iter.span)
             except Exception as e:
                 logger.exception(e)
             else:
@@ -107,6 +122,24 @@ async def save_sparse():
         inv_collection.create_index(23 * 60 * 60)
         inv_collection.upsert(client.get_invalid_sales())
 
+    # The KPI cubes read the latest forecasts saved above
+    get_kpi_cube_cache().invalidate()
+
+
+async def sync_severa_mirror(full: bool = False):
+    async with MirrorClient() as client:
+        synced = await client.sync_all(full=full)
+
+    if any(synced.values()):
+        get_kpi_cube_cache().invalidate()
+
+
+async def full_sync_severa_mirror():
+    """
+    Full sync also removes the entities deleted in Severa from the mirror.
+    """
+    await sync_severa_mirror(full=True)
+
 
 async def save_only_invalid_salescase_info() -> pd.DataFrame:
     async with SeveraClient() as client:
@@ -131,7 +164,8 @@ async def read_save_sparse(
     username: Annotated[str, Depends(get_current_username)],
 ) -> None:
     logger.debug(f"/save_sparse request from {request.client.host}")
-    await save_sparse()
+    with base_client.priority(base_client.Priority.BATCH):
+        await save_sparse()
 
 
 @default_router.get("/load/{base}/{collection}")
@@ -151,8 +185,9 @@ async def read(
     endpoint: str,
     request: Request,
     username: Annotated[str, Depends(get_current_username)],
+    transport: SeveraTransportDep,
 ):
-    async with base_client.Client() as client:
+    async with base_client.Client(transport) as client:
         return await client.get_all(
             endpoint,
             params={
@@ -161,6 +196,34 @@ async def read(
         )
 
 
+@default_router.get("/severa_status")
+async def severa_status(
+    request: Request,
+    username: Annotated[str, Depends(get_current_username)],  # noqa: ARG001
+    transport: SeveraTransportDep,
+):
+    """
+    State of the shared Severa transport: queue depth, coalesced requests etc.
+    """
+    if transport is None:
+        return pre("Severa transport is not open.", request)
+
+    return pre(json.dumps(transport.status(), indent=4), request)
+
+
+@default_router.get("/severa_stats")
+async def severa_stats(
+    request: Request,
+    username: Annotated[str, Depends(get_current_username)],  # noqa: ARG001
+    job: str | None = None,
+):
+    """
+    Severa calls, bytes, retries and latencies by job or route and endpoint.
+    Cronjobs show their latest run, routes everything since startup.
+    """
+    return pre(stats.get_call_stats().format_summary(job), request)
+
+
 class Cronjob:
     def __init__(self, endpoint: typing.Coroutine, cron: str, name: str):
         self.name = name
@@ -214,7 +277,7 @@ def get_cronjobs(manager: CronjobManager = CronjobManager()):  # noqa: B008
 
 
 async def run_cronjob(timing: Cronjob, app: FastAPI):
-    with logger.contextualize(source=timing.name):
+    with logger.contextualize(source=timing.name), stats.job(timing.name):
         while True:
             timing.try_advance()
             delay = timing.time_to_next().total_seconds()
@@ -226,6 +289,7 @@ async def run_cronjob(timing: Cronjob, app: FastAPI):
             await anyio.sleep(max(delay, 0))
 
             logger.debug(f"Cronjob '{timing.name}' task is called.")
+            stats.get_call_stats().reset(timing.name)
 
             if isinstance(timing.endpoint, str):
                 async with httpx.AsyncClient(
@@ -245,11 +309,16 @@ async def run_cronjob(timing: Cronjob, app: FastAPI):
                         logger.exception(e)
             else:
                 try:
-                    await timing.endpoint()
+                    with base_client.priority(base_client.Priority.BATCH):
+                        await timing.endpoint()
                 except Exception as e:
                     logger.critical(f"Cronjob '{timing.name}' failed with exception:")
                     logger.exception(e)
 
+            logger.info(
+                f"Severa calls of cronjob '{timing.name}':\n"
+                f"{stats.get_call_stats().format_summary(timing.name)}"
+            )
             logger.debug(f"Cronjob '{timing.name}' task is done.")
 
 
@@ -394,8 +463,9 @@ async def severa_endpoint(
     endpoint: str,
     request: Request,
     username: Annotated[str, Depends(get_current_username)],  # noqa: ARG001
+    transport: SeveraTransportDep,
 ):
-    async with base_client.Client() as client:
+    async with base_client.Client(transport) as client:
         return pre(
             json.dumps(
                 await client.get_all(
@@ -553,45 +623,86 @@ async def get_history(request: Request):
 
 
 @kpi_router.get("/totals")
-async def totals(span: DatespanDep):
+async def totals(span: DatespanDep, transport: SeveraTransportDep):
     logger.debug(f"/totals: {DateRange(span.start, span.end)}")
     data = await src.logic.processing.load_and_merge(
-        DateRange(span.start, span.end), forecasts_from_database=True
+        DateRange(span.start, span.end),
+        forecasts_from_database=True,
+        transport=transport,
     )
     return data.to_dict(orient="records")
 
 
+@kpi_router.get("/cube.json")
+async def get_cube_data(
+    span: DatespanDep,
+    transport: SeveraTransportDep,
+    freq: typing.Literal["D", "W", "M"] = "W",
+    business_unit: str | None = None,
+):
+    """
+    KPI totals by user, id and day, week or month.
+    """
+    cube = await src.logic.processing.load_kpi_cube(
+        DateRange(span.start, span.end), transport
+    )
+    if business_unit is not None:
+        cube = cube.select(business_units=[business_unit])
+
+    return cube.rollup(freq).frame().to_dict(orient="records")
+
+
+@kpi_router.get("/cube_totals.json")
+async def get_cube_totals(
+    span: DatespanDep, transport: SeveraTransportDep, business_unit: str | None = None
+):
+    """
+    KPI totals of the span by user.
+    """
+    cube = await src.logic.processing.load_kpi_cube(
+        DateRange(span.start, span.end), transport
+    )
+    if business_unit is not None:
+        cube = cube.select(business_units=[business_unit])
+
+    return cube.by_user().join(cube.users).reset_index().to_dict(orient="records")
+
+
 @kpi_router.get("/billing_history")
-async def billing_history(span: DatespanDep):
+async def billing_history(span: DatespanDep, transport: SeveraTransportDep):
     logger.debug(f"/billing_history: {DateRange(span.start, span.end)}")
-    data = await src.logic.processing.load_merge_billing_forecast_history()
+    data = await src.logic.processing.load_merge_billing_forecast_history(transport)
     return data.to_dict(orient="records")
 
 
 @kpi_router.get("/billing")
-async def billing(span: DatespanDep):
+async def billing(span: DatespanDep, transport: SeveraTransportDep):
     logger.debug(f"/billing: {DateRange(span.start, span.end)}")
-    data = await src.logic.processing.load_merge_billing()
+    data = await src.logic.processing.load_merge_billing(transport)
     return data.to_dict(orient="records")
 
 
 @kpi_router.get("/dbg_hours")
-async def dbg_hours(span: DatespanDep):
-    data = await kpi.hours_totals(span.start, span.end)
+async def dbg_hours(span: DatespanDep, transport: SeveraTransportDep):
+    data = await kpi.hours_totals(span.start, span.end, transport)
     logger.debug("\n" + str(data))
     return data.to_dict(orient="records")
 
 
 @kpi_router.get("/salesmargin.json")
-async def get_salesmargin_data(request: Request, span: DatespanDep):  # noqa: ARG001
-    data = await kpi.sales_margin(span.start, span.end)
+async def get_salesmargin_data(
+    request: Request, span: DatespanDep, transport: SeveraTransportDep  # noqa: ARG001
+):
+    data = await kpi.sales_margin(span.start, span.end, transport)
     json = data.to_dict(orient="records")
     return json
 
 
 @kpi_router.get("/hours.json")
-async def get_hours_data(request: Request, span: DatespanDep):  # noqa: ARG001
-    return (await kpi.hours(span.start, span.end)).to_dict(orient="records")
+async def get_hours_data(
+    request: Request, span: DatespanDep, transport: SeveraTransportDep  # noqa: ARG001
+):
+    return (await kpi.hours(span.start, span.end, transport)).to_dict(orient="records")
 
 
 default_router.include_router(kpi_router)
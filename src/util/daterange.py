@@ -142,6 +142,23 @@ class DateRange:
 
         return DateRange(self.start, date), DateRange(date.shift(days=1), self.end)
 
+    def months(self) -> list["DateRange"]:
+        """
+        Split the range into calendar months, the first and the last of which
+        may be partial.
+        """
+        if not self:
+            return []
+
+        result = []
+        start = self.start
+
+        while start <= self.end:
+            result.append(DateRange(start, min(start.ceil("month"), self.end)))
+            start = start.floor("month").shift(months=1)
+
+        return result
+
     def __and__(self, other: "DateRange") -> "DateRange":
         # Intersection of two ranges
         return self.intersection(other)
@@ -0,0 +1,198 @@
+"""
+Totals of spans by group and period without unraveling them into daily rows.
+
+A row with a 'start_date'..'end_date' span adds the same (scaled) value to each
+of its days, so it is kept as an interval: its value is added at the first day
+and subtracted after the last one in a difference array of its group, and the
+daily values are the cumulative sums of the arrays. Values zeroed on holidays go
+to an array of their own that is multiplied with the working day mask. The
+daily values are then summed into periods.
+
+The result equals unraveling the rows with src.util.unravel.unravel, keeping the
+days from `earliest` to `latest` and summing by the group columns and the period
+of the day, up to floating point rounding. The work is linear in the number of
+rows plus the number of groups times the days from `earliest` to `latest`.
+"""
+
+import typing
+
+import numpy as np
+import pandas as pd
+
+from src.util.unravel import (
+    DAY,
+    NS_PER_DAY,
+    Mask,
+    expand,
+    kept_offsets,
+    nanoseconds,
+    pre_scales,
+    row_mask,
+    utc_timestamps,
+)
+from src.util.workdays import get_workday_calendar
+
+
+def period_starts(days: np.ndarray, freq: str) -> tuple[np.ndarray, pd.DatetimeIndex]:
+    """
+    Positions where a new period of `freq` starts in the consecutive days, and
+    the starting times of those periods in UTC.
+    """
+    periods = pd.DatetimeIndex(days).to_period(freq)
+    starts = np.flatnonzero(np.concatenate([[True], periods[1:] != periods[:-1]]))
+
+    return starts, periods[starts].start_time.tz_localize("UTC")
+
+
+def group_codes(data: pd.DataFrame, by: typing.Sequence[str]) -> np.ndarray:
+    """
+    Number of the group of each row by the `by` columns, NA being a value too.
+    """
+    if not by:
+        return np.zeros(len(data), dtype=int)
+
+    return (
+        data.groupby(list(by), dropna=False, sort=False, observed=True)
+        .ngroup()
+        .to_numpy()
+    )
+
+
+def totals_frame(  # noqa: PLR0913
+    data: pd.DataFrame,
+    by: typing.Sequence[str],
+    date_column: str,
+    value_columns: typing.Sequence[str],
+    *,
+    rows: np.ndarray | None = None,
+    dates: pd.DatetimeIndex | None = None,
+    totals: np.ndarray | None = None,
+) -> pd.DataFrame:
+    """
+    The `by` columns of the data at `rows` (first of their group), the dates
+    and the totals of the value columns. Empty by default.
+    """
+    if rows is None:
+        rows = np.array([], dtype=int)
+        dates = pd.DatetimeIndex([], tz="UTC")
+        totals = np.zeros((0, len(value_columns)))
+
+    result = data.iloc[rows][list(by)].reset_index(drop=True)
+    result[date_column] = dates
+
+    for i, column in enumerate(value_columns):
+        result[column] = totals[:, i]
+
+    return result
+
+
+def aggregate(  # noqa: PLR0913, PLR0917
+    data: pd.DataFrame,
+    by: typing.Sequence[str],
+    earliest: typing.Any,
+    latest: typing.Any,
+    freq: str = "D",
+    value_columns: typing.Sequence[str] = ("value",),
+    *,
+    spans: Mask = True,
+    zero_on_holidays: Mask = False,
+    scale_with_days: Mask = False,
+    scale_with_workdays: Mask = False,
+    date_column: str = "date",
+) -> pd.DataFrame:
+    """
+    Sums of the value columns by the `by` columns and the `freq` periods (e.g.
+    "D", "W" or "M") of the days, with the start of the period in
+    `date_column`. The rows where `spans` is set are spread over their spans
+    like in src.util.unravel.unravel, and the others are taken on their
+    `date_column`. Only the days from `earliest` to `latest`, timestamps or
+    Series of one per row, are counted. There is a row for every group and
+    period with at least one day, even if its values sum to zero.
+    """
+    length = len(data)
+    calendar = get_workday_calendar()
+    codes = group_codes(data, by)
+
+    earliest = nanoseconds(earliest, length)
+    latest = nanoseconds(latest, length)
+    values = data[list(value_columns)].to_numpy(dtype=float, na_value=np.nan)
+    spans = row_mask(spans, length)
+    zeroed = row_mask(zero_on_holidays, length)
+
+    missing = pd.Series(pd.NaT, index=data.index)
+    start = utc_timestamps(data.get("start_date", missing))
+    end = utc_timestamps(data.get("end_date", missing))
+    first, last, is_span = kept_offsets(start, end, earliest, latest)
+    is_span &= spans
+
+    # The kept days as days since the epoch
+    day = start.astype(np.int64) // NS_PER_DAY
+    first_day, last_day = day + first, day + last
+
+    pre_scale = pre_scales(start, end, scale_with_days, scale_with_workdays)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = values / pre_scale[:, np.newaxis]
+
+    # Spans with an infinite daily value can't be added up, take them day by day
+    by_day = is_span & np.isinf(rates).any(axis=1)
+    is_span &= ~by_day
+    expanded, expanded_days = expand(np.flatnonzero(by_day), first_day, last_day)
+
+    dates = utc_timestamps(data.get(date_column, missing))
+    date_rows = np.flatnonzero(~spans & (earliest <= dates) & (dates <= latest))
+    span_rows = np.flatnonzero(is_span)
+
+    # Single days: the rows with a date and the days of the expanded spans
+    day_rows = np.concatenate([date_rows, expanded])
+    days_of_rows = np.concatenate(
+        [dates[date_rows].astype(np.int64) // NS_PER_DAY, expanded_days]
+    )
+
+    if not len(span_rows) and not len(day_rows):
+        return totals_frame(data, by, date_column, value_columns)
+
+    origin = np.concatenate([first_day[span_rows], days_of_rows]).min()
+    days = np.concatenate([last_day[span_rows], days_of_rows]).max() - origin + 1
+    day_range = np.datetime64(int(origin), "D") + np.arange(days) * DAY
+    is_working = calendar.is_working_day(day_range)
+
+    # Difference arrays of the spans by group, the second one for the values
+    # zeroed on holidays
+    difference = np.zeros((2, codes.max() + 1, days + 1, values.shape[1]))
+    present = np.zeros((codes.max() + 1, days + 1), dtype=int)
+
+    for day_of_rows, sign in ((first_day, 1), (last_day + 1, -1)):
+        index = (codes[span_rows], day_of_rows[span_rows] - origin)
+        np.add.at(
+            difference,
+            (zeroed[span_rows].astype(int), *index),
+            sign * np.nan_to_num(rates[span_rows], nan=0.0),
+        )
+        np.add.at(present, index, sign)
+
+    cumulative = difference.cumsum(axis=2)[:, :, :days]
+    daily = cumulative[0] + cumulative[1] * is_working[:, np.newaxis]
+    present = present.cumsum(axis=1)[:, :days]
+
+    expanded_values = rates[expanded]
+    expanded_values[zeroed[expanded] & ~is_working[expanded_days - origin]] = 0.0
+    day_values = np.concatenate([values[date_rows], expanded_values])
+
+    index = (codes[day_rows], days_of_rows - origin)
+    np.add.at(daily, index, np.where(np.isnan(day_values), 0.0, day_values))
+    np.add.at(present, index, 1)
+
+    starts, labels = period_starts(day_range, freq)
+    totals = np.add.reduceat(daily, starts, axis=1)
+    group, period = np.nonzero(np.add.reduceat(present, starts, axis=1))
+
+    return totals_frame(
+        data,
+        by,
+        date_column,
+        value_columns,
+        rows=np.unique(codes, return_index=True)[1][group],
+        dates=labels[period],
+        totals=totals[group, period],
+    )
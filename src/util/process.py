@@ -4,7 +4,10 @@ from itertools import product
 
 import arrow
 import pandas as pd
-from workalendar.europe import Finland
+
+from src.util.unravel import unravel as unravel_spans
+from src.util.unravel import utc_days
+from src.util.workdays import get_workday_calendar
 
 
 def sanitize_dates(data: pd.DataFrame, date_columns: list[str]) -> pd.DataFrame:
@@ -27,31 +30,13 @@ def unravel_subset(data_subset: pd.DataFrame) -> pd.DataFrame:
     if len(data) < 1:
         return data_subset
 
-    # Calculate dates and workdays
-    calendar = Finland()
-    data.loc[:, "date"] = data.loc[:, :].apply(
-        lambda x: pd.date_range(start=x["start_date"], end=x["end_date"]), axis=1
-    )
-
-    data.loc[:, "_num_workdays"] = data.loc[:, :].apply(
-        lambda x: calendar.get_working_days_delta(
-            x["start_date"].date(), x["end_date"].date(), include_start=True
-        ),
-        axis=1,
-    )
-
-    # Unravel daterange into rows
-    unraveled = data.explode("date").reset_index(drop=True)
-    unraveled["_is_workday"] = unraveled.date.map(calendar.is_working_day).map(int)
-
-    # Scale values to workdays
-    unraveled["value"] = (
-        unraveled["value"] / unraveled["_num_workdays"] * unraveled["_is_workday"]
+    unraveled = unravel_spans(
+        data, zero_on_holidays=True, scale_with_workdays=True, date_column="date"
     )
 
     return pd.concat(
         [
-            unraveled.drop(["_num_workdays", "_is_workday"], axis=1),
+            unraveled,
             data_subset[~mask],
         ],
         ignore_index=True,
@@ -90,16 +75,11 @@ def unravel(
     data_view.loc[data_view.id == "maximum", "start_date"] = pd.Timestamp(min_date)
     data_view.loc[data_view.id == "maximum", "end_date"] = pd.Timestamp(max_date)
 
-    calendar = Finland()
-    data_view.loc[data_view.id == "maximum", "value"] = data_view.loc[
-        data_view.id == "maximum", :
-    ].apply(
-        lambda x: x["value"]
-        * calendar.get_working_days_delta(
-            x["start_date"].date(), x["end_date"].date(), include_start=True
-        ),
-        axis=1,
+    maximums = data_view.loc[data_view.id == "maximum", :]
+    workdays = get_workday_calendar().count(
+        utc_days(maximums["start_date"]), utc_days(maximums["end_date"])
     )
+    data_view.loc[data_view.id == "maximum", "value"] = maximums["value"] * workdays
 
     return unravel_subset(data_view).convert_dtypes()
 
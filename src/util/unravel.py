@@ -0,0 +1,185 @@
+"""
+Vectorized unravel of rows with a 'start_date'..'end_date' span into one row per
+day. The number of days of each row is computed at once for all the rows, the
+rows are repeated with np.repeat, and the dates are the start dates plus day
+offsets. Scaling of the values by the number of (work)days in the span and the
+zeroing of holidays are applied as masks over the whole result.
+"""
+
+import typing
+
+import numpy as np
+import pandas as pd
+
+from src.util.workdays import get_workday_calendar
+
+DAY = np.timedelta64(1, "D")
+NS_PER_DAY = DAY.astype("timedelta64[ns]").astype(np.int64)
+
+Mask = bool | pd.Series | np.ndarray
+
+
+def utc_timestamps(values: typing.Any) -> np.ndarray:
+    """
+    Timezone-naive datetime64[ns] array of the values as UTC.
+    """
+    return (
+        pd.DatetimeIndex(pd.to_datetime(values, utc=True))
+        .tz_localize(None)
+        .to_numpy("datetime64[ns]")
+    )
+
+
+def nanoseconds(values: typing.Any, length: int) -> np.ndarray:
+    """
+    datetime64[ns] array of `length` in UTC of a timestamp or of the values.
+    """
+    if np.ndim(values) == 0:
+        return np.broadcast_to(utc_timestamps([values]), (length,))
+
+    return utc_timestamps(values)
+
+
+def utc_days(values: typing.Any) -> np.ndarray:
+    """
+    datetime64[D] array of the UTC dates of the values.
+    """
+    return utc_timestamps(values).astype("datetime64[D]")
+
+
+def count_days(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """
+    Number of whole days from start to end (as Timedelta.days), 0 with NaT.
+    """
+    valid = ~(np.isnat(start) | np.isnat(end))
+    result = np.zeros(len(start), dtype=int)
+    result[valid] = (end[valid] - start[valid]) // DAY
+
+    return result
+
+
+def kept_offsets(
+    start: np.ndarray,
+    end: np.ndarray,
+    earliest: np.ndarray | None = None,
+    latest: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The first and the last k of the days start + k days up to end that are from
+    `earliest` to `latest` (datetime64[ns], unbounded if None), and whether the
+    row has any such days.
+    """
+    s = start.astype(np.int64)
+    first = np.zeros(len(start), dtype=np.int64)
+    last = count_days(start, end)
+
+    if earliest is not None:
+        first = np.maximum(first, -((s - earliest.astype(np.int64)) // NS_PER_DAY))
+
+    if latest is not None:
+        last = np.minimum(last, (latest.astype(np.int64) - s) // NS_PER_DAY)
+
+    valid = ~(np.isnat(start) | np.isnat(end)) & (end >= start) & (first <= last)
+
+    return first, last, valid
+
+
+def expand(
+    rows: np.ndarray, first: np.ndarray, last: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The rows repeated for each integer from their first to their last, and the
+    integers.
+    """
+    counts = last[rows] - first[rows] + 1
+    repeated = np.repeat(rows, counts)
+    offsets = np.arange(len(repeated)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    return repeated, first[repeated] + offsets
+
+
+def row_mask(mask: Mask, length: int) -> np.ndarray:
+    """
+    A bool or a (nullable) boolean Series as a bool array, with NA as False.
+    """
+    if isinstance(mask, pd.Series):
+        return mask.fillna(False).to_numpy(dtype=bool)
+
+    return np.broadcast_to(np.asarray(mask, dtype=bool), (length,))
+
+
+def pre_scales(
+    start: np.ndarray,
+    end: np.ndarray,
+    scale_with_days: Mask = False,
+    scale_with_workdays: Mask = False,
+) -> np.ndarray:
+    """
+    The number of days (as in Timedelta.days) or working days in the span of each
+    row where the masks are set, otherwise 1. Working days take precedence.
+    """
+    pre_scale = np.ones(len(start))
+    scale_with_days = row_mask(scale_with_days, len(start))
+    scale_with_workdays = row_mask(scale_with_workdays, len(start))
+
+    if scale_with_days.any():
+        pre_scale[scale_with_days] = count_days(start, end)[scale_with_days]
+
+    if scale_with_workdays.any():
+        pre_scale[scale_with_workdays] = get_workday_calendar().count(start, end)[
+            scale_with_workdays
+        ]
+
+    return pre_scale
+
+
+def unravel(  # noqa: PLR0913
+    data: pd.DataFrame,
+    value_columns: typing.Iterable[str] = ("value",),
+    *,
+    zero_on_holidays: Mask = False,
+    scale_with_days: Mask = False,
+    scale_with_workdays: Mask = False,
+    earliest: typing.Any = None,
+    latest: typing.Any = None,
+    date_column: str = "date",
+) -> pd.DataFrame:
+    """
+    Repeat each row of `data` for every day from 'start_date' to 'end_date', with
+    the day in `date_column`. Values are divided by the number of days (as in
+    Timedelta.days) or working days in the span of the row where the masks are
+    set, and set to zero on non-working days where `zero_on_holidays` is set.
+    Rows without a start or an end produce no rows. If given, only the days from
+    `earliest` to `latest` (timestamps or Series of one per row) are produced,
+    the values still scaled by the whole span.
+    """
+    length = len(data)
+    start = utc_timestamps(data["start_date"])
+    end = utc_timestamps(data["end_date"])
+
+    # Only the days within the bounds are produced, but scaled by the whole span
+    first, last, valid = kept_offsets(
+        start,
+        end,
+        None if earliest is None else nanoseconds(earliest, length),
+        None if latest is None else nanoseconds(latest, length),
+    )
+    rows, offsets = expand(np.flatnonzero(valid), first, last)
+    dates = start[rows] + offsets * DAY
+
+    pre_scale = pre_scales(start, end, scale_with_days, scale_with_workdays)
+
+    with np.errstate(divide="ignore"):
+        factor = 1.0 / pre_scale[rows]
+
+    if (zero_on_holidays := row_mask(zero_on_holidays, length)).any():
+        holiday = zero_on_holidays[rows] & ~get_workday_calendar().is_working_day(dates)
+        factor[holiday] = 0.0
+
+    result = data.iloc[rows].reset_index(drop=True)
+    result[date_column] = pd.DatetimeIndex(dates).tz_localize("UTC")
+
+    for column in value_columns:
+        result[column] = result[column] * factor
+
+    return result
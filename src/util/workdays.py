@@ -0,0 +1,174 @@
+"""
+Precomputed calendar of the Finnish working days. The working days of a range of
+years are looked up from workalendar once, and kept as a boolean array together
+with its cumulative sum. Whether a day is a working day, and the number of
+working days between two days, are then array lookups for any number of days.
+
+    calendar = get_workday_calendar()
+    is_workday = calendar.is_working_day(days)
+    workdays = calendar.count(start_days, end_days)
+"""
+
+import functools
+import threading
+import typing
+
+import numpy as np
+from workalendar.europe import Finland
+
+DAY = np.timedelta64(1, "D")
+
+# Years precomputed by default, widened on demand for days outside of them
+FIRST_YEAR = 2015
+LAST_YEAR = 2035
+# The range is never widened beyond these years, and the days outside of them are
+# never working days, so that e.g. a sentinel 9999-12-31 doesn't hang the lookup
+MIN_YEAR = 1990
+MAX_YEAR = 2100
+
+
+class Tables(typing.NamedTuple):
+    first: np.datetime64
+    is_working: np.ndarray
+    # Number of working days before each day, and in total as the last item
+    cumulative: np.ndarray
+
+
+class WorkdayCalendar:
+    """
+    Working days from the start of `first_year` to the end of `last_year`. The
+    arrays are built on first use, and extended by the missing years if asked
+    about a day outside of them, up to `max_year` (or down to `min_year`). Days
+    are given as datetime64[D] arrays (or anything convertible to one), and NaT
+    or a day outside of the limits is never a working day.
+    """
+
+    def __init__(
+        self,
+        first_year: int = FIRST_YEAR,
+        last_year: int = LAST_YEAR,
+        min_year: int = MIN_YEAR,
+        max_year: int = MAX_YEAR,
+    ):
+        self._lock = threading.Lock()
+        self._years = (first_year, last_year)
+        self._limits = (
+            np.datetime64(f"{min_year}-01-01", "D"),
+            np.datetime64(f"{max_year}-12-31", "D"),
+        )
+        self._tables: Tables | None = None
+
+    @property
+    def years(self) -> tuple[int, int]:
+        return self._years
+
+    @staticmethod
+    def _working_days(first_year: int, last_year: int) -> np.ndarray:
+        days = np.arange(
+            np.datetime64(f"{first_year}-01-01", "D"),
+            np.datetime64(f"{last_year + 1}-01-01", "D"),
+            DAY,
+        )
+        calendar = Finland()
+
+        return np.array(
+            [calendar.is_working_day(day) for day in days.astype(object)], dtype=bool
+        )
+
+    def _build(self, first_year: int, last_year: int) -> Tables:
+        """
+        Tables from `first_year` to `last_year`, reusing the current tables for
+        the years they already cover.
+        """
+        if self._tables is None:
+            is_working = WorkdayCalendar._working_days(first_year, last_year)
+        else:
+            built_first, built_last = self._years
+            is_working = np.concatenate(
+                [
+                    WorkdayCalendar._working_days(first_year, built_first - 1),
+                    self._tables.is_working,
+                    WorkdayCalendar._working_days(built_last + 1, last_year),
+                ]
+            )
+
+        return Tables(
+            np.datetime64(f"{first_year}-01-01", "D"),
+            is_working,
+            np.concatenate([[0], np.cumsum(is_working)]),
+        )
+
+    def _within_limits(self, days: np.ndarray) -> np.ndarray:
+        return (days >= self._limits[0]) & (days <= self._limits[1])
+
+    def _lookup(self, days: np.ndarray) -> tuple[np.ndarray, np.ndarray, Tables]:
+        """
+        The valid (not NaT and within the limits) days, their offsets from the
+        first day of the tables, and the tables, which are extended to cover all
+        the valid days if necessary.
+        """
+        valid = ~np.isnat(days) & self._within_limits(days)
+
+        with self._lock:
+            first_year, last_year = self._years
+
+            if valid.any():
+                years = days[valid].astype("datetime64[Y]").astype(int) + 1970
+                first_year = min(first_year, int(years.min()))
+                last_year = max(last_year, int(years.max()))
+
+            if self._tables is None or (first_year, last_year) != self._years:
+                self._tables = self._build(first_year, last_year)
+                self._years = (first_year, last_year)
+
+            # A later rebuild replaces the tables, these stay consistent
+            tables = self._tables
+
+        return valid, (days[valid] - tables.first).astype(int), tables
+
+    def is_working_day(self, days: np.ndarray) -> np.ndarray:
+        """
+        Whether each of the days is a working day.
+        """
+        days = np.asarray(days, dtype="datetime64[D]")
+        valid, offsets, tables = self._lookup(days.reshape(-1))
+
+        result = np.zeros(valid.shape, dtype=bool)
+        result[valid] = tables.is_working[offsets]
+
+        return result.reshape(days.shape)
+
+    def count(self, start_days: np.ndarray, end_days: np.ndarray) -> np.ndarray:
+        """
+        Number of working days from start to end, both included, for each pair of
+        days, in either order. Pairs with NaT have none, and only the days within
+        the limits are counted.
+        """
+        start_days = np.asarray(start_days, dtype="datetime64[D]").reshape(-1)
+        end_days = np.asarray(end_days, dtype="datetime64[D]").reshape(-1)
+
+        # NaT propagates through minimum, maximum and clip
+        first = np.minimum(start_days, end_days)
+        last = np.maximum(start_days, end_days)
+        valid = (
+            ~np.isnat(first) & (last >= self._limits[0]) & (first <= self._limits[1])
+        )
+        first, last = np.clip(first, *self._limits), np.clip(last, *self._limits)
+
+        _, offsets, tables = self._lookup(np.concatenate([first[valid], last[valid]]))
+        first_offsets, last_offsets = np.split(offsets, 2)
+
+        result = np.zeros(len(first), dtype=int)
+        result[valid] = (
+            tables.cumulative[last_offsets + 1] - tables.cumulative[first_offsets]
+        )
+
+        return result
+
+
+@functools.cache
+def get_workday_calendar() -> WorkdayCalendar:
+    """
+    The working day calendar shared by the whole process.
+    """
+    return WorkdayCalendar()